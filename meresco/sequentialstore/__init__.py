@@ -42,8 +42,13 @@ except RuntimeError as e:
 
 from .__version__ import VERSION
 from .adddeletetomultisequential import AddDeleteToMultiSequential
+from .garbagecollector import GarbageCollector
+from .memorybudget import MemoryBudget
 from .multisequentialstorage import MultiSequentialStorage
+from .reactorfutures import ReactorFutures
+from .replication import ReplicationLeader, ReplicationFollower
 from .sequentialstorage import SequentialStorage
+from .shardedsequentialstorage import ShardedSequentialStorage
 from .storagecomponentadapter import StorageComponentAdapter
 
 from . import export
@@ -23,19 +23,108 @@
 #
 ## end license ##
 
+from time import time
+
 from meresco.core import Transparent
 
 
 class AddDeleteToMultiSequential(Transparent):
-    """Provided for 'backwards' compatibility to allow MultiSequentialStorage to be passed 'add' and 'delete' messages by older components (in Meresco DNA)."""
+    """Provided for 'backwards' compatibility to allow MultiSequentialStorage to be passed 'add' and 'delete' messages by older components (in Meresco DNA).
+
+    With batchSize, add and delete messages are collected per part, the last one per identifier winning, and passed on
+    through deleteMultipleData and addMultipleData: when batchSize messages are pending, when the oldest is maxDelay
+    seconds old (checked with every message, or by a timer with reactor), on flush, and before any other message is
+    passed on (commit, getData, ...), so everything read through this component includes the messages before it."""
+
+    def __init__(self, batchSize=None, maxDelay=None, reactor=None, **kwargs):
+        Transparent.__init__(self, **kwargs)
+        self._batchSize = batchSize
+        self._maxDelay = maxDelay
+        self._reactor = reactor
+        self._timer = None
+        self._deletes = {}  # identifier: None, deletes from all parts
+        self._parts = {}  # partname: {identifier: data, or None to delete from that part only}
+        self._pendingCount = 0
+        self._pendingSince = None
+
     def add(self, identifier, partname, data):
         if not type(data) is bytes:
             data = bytes(data, encoding="utf-8")
-        self.call.addData(identifier=identifier, name=partname, data=data)
+        if self._batchSize is None:
+            self.call.addData(identifier=identifier, name=partname, data=data)
+            return
+        self._pending(partname)[identifier] = data
+        self._added()
         return
         yield
 
     def delete(self, identifier):
-        self.call.deleteData(identifier=identifier)
+        if self._batchSize is None:
+            self.call.deleteData(identifier=identifier)
+            return
+        for changes in self._parts.values():
+            changes.pop(identifier, None)
+        self._deletes[identifier] = None
+        self._added()
         return
         yield
+
+    def flush(self):
+        """Passes on the pending add and delete messages; deletes from all parts go first, as they precede the pending adds.
+        Messages are only dropped once passed on: when that fails, the rest stays pending for the next flush."""
+        if self._timer is not None:
+            self._reactor.removeTimer(self._timer)
+            self._timer = None
+        if self._deletes:
+            self.call.deleteMultipleData(identifiers=list(self._deletes))
+            self._deletes = {}
+        for partname, changes in list(self._parts.items()):
+            partDeletes = [identifier for identifier, data in changes.items() if data is None]
+            if partDeletes:
+                self.call.deleteMultipleData(identifiers=partDeletes, name=partname)
+                for identifier in partDeletes:
+                    del changes[identifier]
+            if changes:
+                self.call.addMultipleData(name=partname, items=list(changes.items()))
+            del self._parts[partname]
+        self._pendingCount = 0
+        self._pendingSince = None
+
+    def all_unknown(self, message, *args, **kwargs):
+        self._flushPending()
+        return Transparent.all_unknown(self, message, *args, **kwargs)
+
+    def any_unknown(self, message, *args, **kwargs):
+        self._flushPending()
+        return Transparent.any_unknown(self, message, *args, **kwargs)
+
+    def do_unknown(self, message, *args, **kwargs):
+        self._flushPending()
+        return Transparent.do_unknown(self, message, *args, **kwargs)
+
+    def call_unknown(self, message, *args, **kwargs):
+        self._flushPending()
+        return Transparent.call_unknown(self, message, *args, **kwargs)
+
+    def _pending(self, partname):
+        changes = self._parts.get(partname)
+        if changes is None:
+            self._parts[partname] = changes = {}
+        return changes
+
+    def _added(self):
+        self._pendingCount += 1
+        if self._pendingSince is None:
+            self._pendingSince = time()
+            if self._reactor is not None and self._maxDelay is not None:
+                self._timer = self._reactor.addTimer(self._maxDelay, self._onTimer)
+        if self._pendingCount >= self._batchSize or (self._maxDelay is not None and time() - self._pendingSince >= self._maxDelay):
+            self.flush()
+
+    def _onTimer(self):
+        self._timer = None
+        self.flush()
+
+    def _flushPending(self):
+        if self._pendingCount:
+            self.flush()
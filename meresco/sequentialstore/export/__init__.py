@@ -22,4 +22,4 @@
 #
 ## end license ##
 
-from .export import Export
\ No newline at end of file
+from .export import Export, printProgress
\ No newline at end of file
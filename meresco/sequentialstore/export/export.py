@@ -26,77 +26,201 @@
 #
 ## end license ##
 
+
 import sys
-from zlib import compressobj, decompressobj
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import chain, islice
+from json import dumps, loads
+from multiprocessing import get_context
+from os.path import getsize, isfile
+from time import time
+from zlib import compress, crc32, decompressobj
+
+from meresco.sequentialstoreexport.blocks import readBlock, parseBlock, RECORD, TOMBSTONE, RECORD_HEADER, BLOCK_HEADER, BLOCK_CHECKSUM, INDEX_ENTRY, TRAILER
 
 
 class Export(object):
-    """Transfer mechanism to migrate data from older SequentialStore versions to newer ones (newer Lucene or indexed in another way)."""
+    """Transfer mechanism to migrate data from older SequentialStore versions to newer ones (newer Lucene or indexed in another way).
+
+    Format version 2: a version line and a JSON header line, followed by independently zlib compressed blocks of
+    records. Each block is preceded by its compressed length and record count, and followed by the crc32 of the
+    compressed data (when the header says checksum crc32); each record is preceded by its type and the lengths of
+    identifier and data. An empty block header ends the blocks; then follows the block index (offset and record count
+    per block) and a trailer pointing to that index. Files in format version 1 can still be imported.
+
+    The header holds untilKey, the newest sequence key of the exported store. An incremental export (header sinceKey)
+    holds the records added after sinceKey and tombstone records for the identifiers deleted since.
+
+    Progress is reported by calling progress with a dict: records, bytes (read or written so far), seconds,
+    recordsPerSecond and bytesPerSecond; for imports of format version 2 also blocks and totalBlocks."""
 
-    version = '1'
+    version = '2'
     VERSION_LINE = 'Export format version: %s\n' % version
 
-    def __init__(self, path):
+    def __init__(self, path, blockSize=None):
         self._path = path
+        self._blockSize = DEFAULT_BLOCK_SIZE if blockSize is None else blockSize
         self._openFile = None
-        self._compress = None
+        self._readVersion = None
 
     def close(self):
         if not self._openFile is None:
             self._openFile.close()
             self._openFile = None
 
-    def export(self, seqStorage):
-        self._openFile = open(self._path, 'wb')
-        self._openFile.write(self.VERSION_LINE.encode())
-        self._compress = compressobj()
+    def export(self, seqStorage, shards=1, sinceKey=None, progress=None):
+        """With shards > 1, the files <path>.0 .. <path>.<shards - 1> are written concurrently, each from its own range of
+        the store; progress is then called from those threads, with the shard number added. With sinceKey only the
+        changes after that key are exported, in a single file. Returns the untilKey of the export."""
+        if sinceKey is not None:
+            untilKey = seqStorage.newestKey()
+            self._exportFile(self._path, seqStorage.changesSince(sinceKey), dict(sinceKey=sinceKey, untilKey=untilKey), progress)
+            return untilKey
         size = len(seqStorage)
-        self._openFile.write(('%s\n' % size).encode())
-        for i, (identifier, data) in enumerate(seqStorage.iteritems()):
-            if i % 1000 == 0:
-                print('exporting item %s (%s%%)' % (i, (i * 100 / size)))
-                sys.stdout.flush()
-            self._writeItem(identifier, data)
-        self._openFile.write(self._compress.flush())
-        self._compress = None
-        self.close()
-
-    def importInto(self, seqStorage):
-        self._openFile = open(self._path, 'rb')
+        untilKey = seqStorage.newestKey()
+        if shards == 1:
+            self._exportFile(self._path, seqStorage.iteritems(), dict(size=size, untilKey=untilKey), progress)
+            return untilKey
+        with ThreadPoolExecutor(max_workers=shards, initializer=_attachCurrentThread) as executor:
+            futures = [
+                executor.submit(self._exportFile, '%s.%s' % (self._path, i), items, dict(size=size, untilKey=untilKey, shard=i, shards=shards),
+                    None if progress is None else (lambda stats, shard=i: progress(dict(stats, shard=shard))))
+                for i, items in enumerate(seqStorage.iteritemsPartitioned(shards))
+            ]
+            for future in futures:
+                future.result()
+        return untilKey
+
+    def importInto(self, seqStorage, workers=1, bulk=False, progress=None, skipBlocks=0, checkpoint=None):
+        """Imports <path>, or when it does not exist the shards <path>.0, <path>.1, ... With workers > 1 the blocks are
+        decompressed and parsed in that many processes. Records are added to seqStorage in batches (in the original
+        order); with bulk seqStorage is filled through its bulkLoad instead, one call per BULK_ROUND_BLOCKS blocks (or
+        batches), each of which ends with a commit. The changes of an incremental export are applied with their deletes.
+
+        Format version 2 is imported block by block, checking the checksums: skipBlocks resumes an interrupted import
+        and checkpoint is called with the number of blocks done before each block is handed to seqStorage."""
+        incremental = 'sinceKey' in self.header()
+        batches = self._iterbatches(workers, skipBlocks, progress)
+        if bulk:
+            for first in batches:
+                seqStorage.bulkLoad(_checkpointed(chain([first], islice(batches, BULK_ROUND_BLOCKS - 1)), checkpoint))
+            return
+        for blocksDone, batch in batches:
+            if checkpoint is not None and blocksDone is not None:
+                checkpoint(blocksDone)
+            if incremental:
+                seqStorage.applyChanges(batch)
+            else:
+                seqStorage.addMultiple(batch)
+
+    def shardPaths(self):
+        if isfile(self._path):
+            return [self._path]
+        paths = []
+        while isfile('%s.%s' % (self._path, len(paths))):
+            paths.append('%s.%s' % (self._path, len(paths)))
+        return paths or [self._path]
+
+    def header(self):
+        "The header of <path>, or of its first shard."
+        self._openFile = open(self.shardPaths()[0], 'rb')
+        try:
+            return self._readHeader()
+        finally:
+            self.close()
+
+    def blocks(self):
+        "The block index: (offset, record count) per block. Only for format version 2."
+        size = getsize(self._path)
+        with open(self._path, 'rb') as fp:
+            fp.seek(max(0, size - TRAILER.size))
+            trailer = fp.read(TRAILER.size)
+            indexOffset, blockCount = TRAILER.unpack(trailer) if len(trailer) == TRAILER.size else (0, 0)
+            if indexOffset + blockCount * INDEX_ENTRY.size + TRAILER.size != size:
+                raise ValueError("The SequentialStore export file %s is truncated or corrupt." % self._path)
+            fp.seek(indexOffset)
+            index = fp.read(blockCount * INDEX_ENTRY.size)
+        return [INDEX_ENTRY.unpack_from(index, i * INDEX_ENTRY.size) for i in range(blockCount)]
+
+    def _exportFile(self, path, items, header, progress=None):
+        meter = _ProgressMeter(progress)
+        count = 0
+        with open(path, 'wb') as openFile:
+            writer = _BlockWriter(openFile, self._blockSize, header)
+            for count, (identifier, data) in enumerate(items, 1):
+                if data is None:
+                    writer.add(TOMBSTONE, identifier, b'')
+                else:
+                    writer.add(RECORD, identifier, data)
+                if count % PROGRESS_INTERVAL == 0:
+                    meter.report(records=count, bytes=openFile.tell())
+            writer.finish()
+            meter.report(records=count, bytes=openFile.tell())
+        return count
+
+    def _iterbatches(self, workers, skipBlocks, progress):
+        "Yields (blocks done, records) per block, or (None, records) per batch for format version 1."
+        meter = _ProgressMeter(progress)
+        paths = self.shardPaths()
+        if not all(Export(path)._formatVersion() == self.version for path in paths):
+            for path in paths:
+                yield from self._iterbatchesVersion1(path, meter)
+            return
+        blocks = []
+        for path in paths:
+            checksum = Export(path).header().get('checksum') == 'crc32'
+            blocks.extend((path, offset, checksum) for offset, count in Export(path).blocks())
+        records = bytesRead = 0
+        for i, (blockBytes, block) in enumerate(_readBlocks(blocks[skipBlocks:], workers), skipBlocks + 1):
+            yield i, [(identifier, _dataOrNone(recordType, data)) for recordType, identifier, data in block]
+            records += len(block)
+            bytesRead += blockBytes
+            meter.report(records=records, bytes=bytesRead, blocks=i, totalBlocks=len(blocks))
+
+    def _iterbatchesVersion1(self, path, meter):
+        self._openFile = open(path, 'rb')
+        try:
+            self._readHeader()
+            items = self._iteritemsVersion1()
+            records = 0
+            while True:
+                batch = list(islice(items, IMPORT_BATCH_SIZE))
+                if not batch:
+                    break
+                yield None, batch
+                records += len(batch)
+                meter.report(records=records, bytes=self._openFile.tell())
+        finally:
+            self.close()
+
+    def _formatVersion(self):
+        self.header()
+        return self._readVersion
+
+    def _readHeader(self):
         versionLine = self._openFile.readline().decode()
+        if versionLine == VERSION_1_LINE:
+            self._readVersion = '1'
+            return dict(size=int(self._openFile.readline()))
         assert self.VERSION_LINE == versionLine, "The SequentialStore export file does not match the expected version %s (%s)." % (self.version, repr(versionLine[:len(self.VERSION_LINE)]))
-        size = int(self._openFile.readline())
-        for i, (identifier, data) in enumerate(self._iteritems()):
-            if i % 1000 == 0:
-                print('importing item %s (%s%%)' % (i, (i * 100 / size)))
-                sys.stdout.flush()
-            seqStorage.add(identifier, data)
-        self.close()
-
-    def _writeItem(self, identifier, data):
-        if '\n' in identifier:
-            raise RuntimeError("Unexpectedly encountered \n character as part of the identifier '%s'." % identifier)
-        bIdentifier = identifier.encode()
-        if BOUNDARY_SENTINEL in bIdentifier:
-            raise RuntimeError("Internal boundary sentinel unexpectedly appears as part of the identifier '%s'." % identifier)
-        if BOUNDARY_SENTINEL in data:
-            raise RuntimeError("Internal boundary sentinel unexpectedly appears as part of the record data for identifier '%s'." % identifier)
-        self._openFile.write(self._compress.compress(bIdentifier + b'\n'))
-        self._openFile.write(self._compress.compress(data))
-        self._openFile.write(self._compress.compress(BOUNDARY_SENTINEL))
-
-    def _iteritems(self):
-        def fixRecord(identifier, data):
-            return identifier.decode(), data
-        data = b''
+        self._readVersion = self.version
+        return loads(self._openFile.readline())
+
+    def _iteritemsVersion1(self):
+        buffer = bytearray()
+        searchFrom = 0
         for s in self._decompress():
-            data += s
+            buffer += s
             while True:
-                record, sep, rest = data.partition(BOUNDARY_SENTINEL)
-                if not sep:
+                end = buffer.find(BOUNDARY_SENTINEL, searchFrom)
+                if end == -1:
+                    searchFrom = max(0, len(buffer) - len(BOUNDARY_SENTINEL) + 1)
                     break
-                yield fixRecord(*record.split(b'\n', 1))
-                data = rest
+                identifier, data = bytes(buffer[:end]).split(b'\n', 1)
+                del buffer[:end + len(BOUNDARY_SENTINEL)]
+                searchFrom = 0
+                yield identifier.decode(), data
 
     def _decompress(self):
         decompress = decompressobj()
@@ -105,4 +229,120 @@ class Export(object):
         yield decompress.flush()
 
 
+class _BlockWriter(object):
+    def __init__(self, openFile, blockSize, header):
+        self._openFile = openFile
+        self._blockSize = blockSize
+        self._openFile.write(Export.VERSION_LINE.encode())
+        self._openFile.write(('%s\n' % dumps(dict(header, checksum='crc32'), sort_keys=True)).encode())
+        self._parts = []
+        self._partsSize = 0
+        self._count = 0
+        self._index = []
+
+    def add(self, recordType, identifier, data):
+        bIdentifier = identifier.encode()
+        self._parts.append(RECORD_HEADER.pack(recordType, len(bIdentifier), len(data)))
+        self._parts.append(bIdentifier)
+        self._parts.append(data)
+        self._partsSize += RECORD_HEADER.size + len(bIdentifier) + len(data)
+        self._count += 1
+        if self._partsSize >= self._blockSize:
+            self._flushBlock()
+
+    def finish(self):
+        self._flushBlock()
+        self._openFile.write(BLOCK_HEADER.pack(0, 0))
+        indexOffset = self._openFile.tell()
+        for offset, count in self._index:
+            self._openFile.write(INDEX_ENTRY.pack(offset, count))
+        self._openFile.write(TRAILER.pack(indexOffset, len(self._index)))
+
+    def _flushBlock(self):
+        if self._count == 0:
+            return
+        compressed = compress(b''.join(self._parts))
+        self._index.append((self._openFile.tell(), self._count))
+        self._openFile.write(BLOCK_HEADER.pack(len(compressed), self._count))
+        self._openFile.write(compressed)
+        self._openFile.write(BLOCK_CHECKSUM.pack(crc32(compressed)))
+        self._parts = []
+        self._partsSize = 0
+        self._count = 0
+
+
+class _ProgressMeter(object):
+    def __init__(self, progress):
+        self._progress = progress
+        self._start = time()
+
+    def report(self, **stats):
+        if self._progress is None:
+            return
+        seconds = time() - self._start
+        self._progress(dict(stats,
+            seconds=seconds,
+            recordsPerSecond=stats['records'] / seconds if seconds else None,
+            bytesPerSecond=stats['bytes'] / seconds if seconds else None))
+
+
+def _readBlocks(blocks, workers):
+    """Yields readBlock for each block in order. With more than one worker the blocks are read in processes started
+    with spawn (not forked from this process, which runs a JVM), at most WINDOW_PER_WORKER per worker at a time, so
+    parsed blocks do not pile up when the store is slower than the workers. Spawned processes import the main module
+    (not as __main__) and readBlock's module, which needs no JVM; a main module that initializes the JVM or imports
+    meresco.sequentialstore should only do so under if __name__ == '__main__', as the bin scripts do."""
+    if workers < 2:
+        yield from map(readBlock, blocks)
+        return
+    with ProcessPoolExecutor(max_workers=workers, mp_context=get_context('spawn')) as executor:
+        pending = deque()
+        blocks = iter(blocks)
+        for block in islice(blocks, workers * WINDOW_PER_WORKER):
+            pending.append(executor.submit(readBlock, block))
+        while pending:
+            result = pending.popleft().result()
+            for block in islice(blocks, 1):
+                pending.append(executor.submit(readBlock, block))
+            yield result
+
+
+def printProgress(stats, _last=[0]):
+    "A progress callback printing at most once per second."
+    if time() - _last[0] < 1:
+        return
+    _last[0] = time()
+    print('%s%s records, %.1f MB%s; %.0f records/s, %.1f MB/s' % (
+        '' if stats.get('shard') is None else 'shard %s: ' % stats['shard'],
+        stats['records'],
+        stats['bytes'] / MB,
+        '' if stats.get('totalBlocks') is None else ' (block %s of %s)' % (stats['blocks'], stats['totalBlocks']),
+        stats['recordsPerSecond'] or 0,
+        (stats['bytesPerSecond'] or 0) / MB))
+    sys.stdout.flush()
+
+
+def _checkpointed(batches, checkpoint):
+    "The records of the batches, calling checkpoint before each block like importInto does."
+    for blocksDone, batch in batches:
+        if checkpoint is not None and blocksDone is not None:
+            checkpoint(blocksDone)
+        yield from batch
+
+def _dataOrNone(recordType, data):
+    return None if recordType == TOMBSTONE else data
+
+def _attachCurrentThread():
+    from lucene import getVMEnv
+    getVMEnv().attachCurrentThread()
+
+
+MB = 1024 * 1024
+DEFAULT_BLOCK_SIZE = MB
+IMPORT_BATCH_SIZE = 1000
+BULK_ROUND_BLOCKS = 256  # blocks per bulkLoad, and so per commit a bulk import can resume from
+PROGRESS_INTERVAL = 1000
+WINDOW_PER_WORKER = 2  # blocks submitted to the workers ahead of the one being imported
+
+VERSION_1_LINE = 'Export format version: 1\n'
 BOUNDARY_SENTINEL = b'\n=>> [{]} SequentialStore export record boundary {[}] <<=\n'  # Note: clearly this exact string must NEVER appear inside actual record data...
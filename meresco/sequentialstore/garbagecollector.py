@@ -0,0 +1,91 @@
+## begin license ##
+#
+# "Meresco SequentialStore" contains components facilitating efficient sequentially ordered storing and retrieval.
+#
+# Copyright (C) 2026 Seecr (Seek You Too B.V.) https://seecr.nl
+#
+# This file is part of "Meresco SequentialStore"
+#
+# "Meresco SequentialStore" is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# "Meresco SequentialStore" is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with "Meresco SequentialStore"; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+#
+## end license ##
+
+from sys import stderr
+from threading import Thread, Event
+from time import time, localtime
+
+from lucene import getVMEnv
+
+from .mergeplan import selectByDeletes, reclaimableBytes
+
+
+class GarbageCollector(object):
+    """Reclaims the space of deleted records incrementally, instead of rewriting the whole store like gc() does.
+
+    Segments with more than deletesPctThreshold percent deleted records are merged with gcDeletes (Lucene's
+    forceMergeDeletes), most deletes first. Per run (every interval seconds) at most maxBytesPerRun segment bytes are
+    selected: a byte count per run, not a rate limit; the write rate of the merges is capped with the storage's
+    setMergeThrottle(maxMergeMBPerSec=...). Runs reclaiming less than minReclaimBytes are skipped. No merges are started during quietHours, a (start, end)
+    pair of local hours (end exclusive, may wrap around midnight)."""
+
+    def __init__(self, storage, interval=3600, deletesPctThreshold=20.0, minReclaimBytes=0, maxBytesPerRun=None, quietHours=None):
+        self._storage = storage
+        self._interval = interval
+        self._deletesPctThreshold = deletesPctThreshold
+        self._minReclaimBytes = minReclaimBytes
+        self._maxBytesPerRun = maxBytesPerRun
+        self._quietHours = quietHours
+        self._stopped = Event()
+        self._thread = None
+
+    def collect(self, now=None):
+        "Returns the deletesPctAllowed passed to gcDeletes, or None if no merge was started."
+        if self._isQuiet(time() if now is None else now):
+            return None
+        selected, deletesPctAllowed = selectByDeletes(self._storage.segments(), self._deletesPctThreshold, maxBytes=self._maxBytesPerRun, atLeastOne=True)
+        if not selected or sum(reclaimableBytes(segment) for segment in selected) < self._minReclaimBytes:
+            return None
+        self._storage.gcDeletes(deletesPctAllowed=deletesPctAllowed, doWait=False)
+        return deletesPctAllowed
+
+    def start(self):
+        self._stopped.clear()
+        self._thread = Thread(target=self._run, name='GarbageCollector', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        getVMEnv().attachCurrentThread()
+        while not self._stopped.wait(self._interval):
+            try:
+                self.collect()
+            except Exception as e:
+                stderr.write('GarbageCollector: %s\n' % e)
+                stderr.flush()
+
+    def _isQuiet(self, now):
+        if self._quietHours is None:
+            return False
+        start, end = self._quietHours
+        hour = localtime(now).tm_hour
+        if start <= end:
+            return start <= hour < end
+        return hour >= start or hour < end
+
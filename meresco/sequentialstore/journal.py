@@ -0,0 +1,179 @@
+## begin license ##
+#
+# "Meresco SequentialStore" contains components facilitating efficient sequentially ordered storing and retrieval.
+#
+# Copyright (C) 2026 Seecr (Seek You Too B.V.) https://seecr.nl
+#
+# This file is part of "Meresco SequentialStore"
+#
+# "Meresco SequentialStore" is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# "Meresco SequentialStore" is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with "Meresco SequentialStore"; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+#
+## end license ##
+
+from os import fsync, urandom
+from threading import Lock, Timer, current_thread
+from struct import Struct, error as StructError
+from time import time
+from zlib import crc32
+
+
+class Journal(object):
+    """Append-only write-ahead journal of modifications not yet committed to Lucene.
+
+    Entries are written (flushed to the operating system) immediately, so they survive a crash of the process, but
+    fsync'ed in groups: after syncCount entries, or syncInterval seconds after the first entry not synced yet (by a
+    timer, also when no more entries follow), whichever comes first. Entries that were not synced yet are lost when
+    the machine crashes; sync() can be called to force it.
+
+    The file starts with a random id, renewed by truncate(). Together with the number of entries (len) it identifies
+    a position in the journal, to be stored with the commit it is part of: see replay(skipEntries)."""
+
+    def __init__(self, path, syncCount=None, syncInterval=None):
+        self._path = path
+        self._syncCount = _DEFAULT_SYNC_COUNT if syncCount is None else syncCount
+        self._syncInterval = _DEFAULT_SYNC_INTERVAL if syncInterval is None else syncInterval
+        self._file = open(path, 'ab')
+        self._id = _readId(path)
+        if self._id is None:
+            self._newId()
+        self._entries = 0
+        self._unsynced = 0
+        self._lastSync = time()
+        self._lock = Lock()
+        self._timer = None
+
+    def __len__(self):
+        return self._entries
+
+    def id(self):
+        return self._id.hex()
+
+    def add(self, identifier, data):
+        self._append(_ADD, identifier, data)
+
+    def delete(self, identifier):
+        self._append(_DELETE, identifier, b'')
+
+    def sync(self):
+        with self._lock:
+            self._sync()
+
+    def truncate(self):
+        "Note: only to be called once the journalled modifications are committed to the Lucene index."
+        with self._lock:
+            self._cancelTimer()
+            self._file.flush()
+            self._file.truncate(0)
+            self._newId()
+            self._entries = 0
+            self._unsynced = 0
+            self._lastSync = time()
+
+    def replay(self, skipEntries=0):
+        """Yields (identifier, data) for all intact entries after the first skipEntries; data is None for deletes. A torn
+        tail (from a crash) is ignored."""
+        self._file.flush()
+        with open(self._path, 'rb') as fp:
+            fp.seek(_ID_SIZE)
+            while True:
+                entry = _readEntry(fp)
+                if entry is None:
+                    break
+                self._entries += 1
+                if self._entries > skipEntries:
+                    yield entry
+
+    def close(self):
+        with self._lock:
+            if self._file is None:
+                return
+            self._sync()
+            self._file.close()
+            self._file = None
+
+    def _append(self, operation, identifier, data):
+        bIdentifier = identifier.encode()
+        header = _HEADER.pack(operation, len(bIdentifier), len(data))
+        checksum = crc32(data, crc32(bIdentifier, crc32(header)))
+        with self._lock:
+            self._file.write(header + bIdentifier + data + _CHECKSUM.pack(checksum))
+            self._file.flush()
+            self._entries += 1
+            self._unsynced += 1
+            if self._unsynced >= self._syncCount or time() - self._lastSync >= self._syncInterval:
+                self._sync()
+            elif self._timer is None:
+                self._timer = Timer(self._syncInterval, self._timedSync)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def _timedSync(self):
+        with self._lock:
+            if self._timer is current_thread():
+                self._timer = None
+            if self._file is not None:
+                self._sync()
+
+    def _sync(self):
+        self._cancelTimer()
+        if self._unsynced == 0:
+            return
+        self._file.flush()
+        fsync(self._file.fileno())
+        self._unsynced = 0
+        self._lastSync = time()
+
+    def _newId(self):
+        # synced right away: entries must never end up on disk under an id that is not
+        self._id = urandom(_ID_SIZE)
+        self._file.write(self._id)
+        self._file.flush()
+        fsync(self._file.fileno())
+
+    def _cancelTimer(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+
+def _readId(path):
+    with open(path, 'rb') as fp:
+        journalId = fp.read(_ID_SIZE)
+    return journalId if len(journalId) == _ID_SIZE else None
+
+def _readEntry(fp):
+    header = fp.read(_HEADER.size)
+    try:
+        operation, identifierLength, dataLength = _HEADER.unpack(header)
+    except StructError:
+        return None
+    bIdentifier = fp.read(identifierLength)
+    data = fp.read(dataLength)
+    try:
+        checksum, = _CHECKSUM.unpack(fp.read(_CHECKSUM.size))
+    except StructError:
+        return None
+    if len(bIdentifier) != identifierLength or len(data) != dataLength or checksum != crc32(data, crc32(bIdentifier, crc32(header))):
+        return None
+    return bIdentifier.decode(), (None if operation == _DELETE else data)
+
+
+_DEFAULT_SYNC_COUNT = 100
+_DEFAULT_SYNC_INTERVAL = 0.1
+_ADD = 1
+_DELETE = 2
+_ID_SIZE = 16
+_HEADER = Struct('>BII')
+_CHECKSUM = Struct('>I')
@@ -0,0 +1,106 @@
+## begin license ##
+#
+# "Meresco SequentialStore" contains components facilitating efficient sequentially ordered storing and retrieval.
+#
+# Copyright (C) 2026 Seecr (Seek You Too B.V.) https://seecr.nl
+#
+# This file is part of "Meresco SequentialStore"
+#
+# "Meresco SequentialStore" is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# "Meresco SequentialStore" is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with "Meresco SequentialStore"; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+#
+## end license ##
+
+
+from threading import Lock
+
+
+class MemoryBudget(object):
+    """A limit on the memory used for buffered modifications, shared by the SequentialStorages it is passed to (e.g.
+    all parts of a MultiSequentialStorage): their IndexWriter RAM buffers and the pending modifications they keep.
+
+    Usage is computed every checkInterval writes (a batch counts once). When it exceeds maxBytes, the storages using
+    most are flushed (to new segments, without a commit) until usage would be within maxBytes again; on the thread of
+    the write that triggered the check, whichever storage that was, so idle storages release their memory too."""
+
+    def __init__(self, maxBytes, checkInterval=1000):
+        self.maxBytes = maxBytes
+        self._checkInterval = checkInterval
+        self._storages = []
+        self._flushing = set()
+        self._writes = 0
+        self._usedBytes = 0
+        self._flushCount = 0
+        self._flushedBytes = 0
+        self._lock = Lock()
+
+    def register(self, storage):
+        with self._lock:
+            self._storages.append(storage)
+
+    def unregister(self, storage):
+        with self._lock:
+            self._storages.remove(storage)
+
+    def written(self, storage):
+        "Called by storage after its writes; every checkInterval calls, see check."
+        with self._lock:
+            self._writes += 1
+            if self._writes < self._checkInterval:
+                return
+            self._writes = 0
+        self.check()
+
+    def check(self):
+        "Flushes the largest storages if needed; returns the bytes in use afterwards."
+        with self._lock:
+            toFlush = self._select()
+        for usage, storage in toFlush:
+            try:
+                storage.flush()
+            finally:
+                with self._lock:
+                    self._flushing.discard(storage)
+            with self._lock:
+                self._flushCount += 1
+                self._flushedBytes += usage
+        with self._lock:
+            if toFlush:
+                self._usedBytes = sum(storage.memoryUsage() for storage in self._storages)
+            return self._usedBytes
+
+    def stats(self):
+        "usedBytes as measured by the last check; flushing is the number of flushes in progress."
+        with self._lock:
+            return dict(
+                maxBytes=self.maxBytes,
+                usedBytes=self._usedBytes,
+                storages=len(self._storages),
+                flushCount=self._flushCount,
+                flushedBytes=self._flushedBytes,
+                flushing=len(self._flushing),
+            )
+
+    def _select(self):
+        usages = sorted(((storage.memoryUsage(), storage) for storage in self._storages), key=lambda usage: usage[0], reverse=True)
+        self._usedBytes = usedBytes = sum(usage for usage, storage in usages)
+        toFlush = []
+        for usage, storage in usages:
+            if usedBytes <= self.maxBytes:
+                break
+            usedBytes -= usage
+            if storage not in self._flushing:  # already being flushed by another thread's check
+                self._flushing.add(storage)
+                toFlush.append((usage, storage))
+        return toFlush
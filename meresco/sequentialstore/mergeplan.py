@@ -0,0 +1,79 @@
+## begin license ##
+#
+# "Meresco SequentialStore" contains components facilitating efficient sequentially ordered storing and retrieval.
+#
+# Copyright (C) 2026 Seecr (Seek You Too B.V.) https://seecr.nl
+#
+# This file is part of "Meresco SequentialStore"
+#
+# "Meresco SequentialStore" is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# "Meresco SequentialStore" is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with "Meresco SequentialStore"; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+#
+## end license ##
+
+def planMerge(segments, freeBytes, maxNumSegments=1, headroom=0.1):
+    """Estimates what merging down to maxNumSegments segments would need and gain, and whether it fits in freeBytes.
+
+    A merge temporarily needs room for the merged segments next to the originals, so the live (not deleted) bytes
+    of the merged segments must fit in freeBytes, minus a headroom fraction. If a full merge does not fit, a partial
+    one is planned: the segments with most deletes whose live bytes fit, to be merged with forceMergeDeletes using
+    deletesPctAllowed. The plan reports freeBytes, requiredBytes, reclaimableBytes and merge ('full', 'partial' or None)."""
+    plan = dict(
+        freeBytes=freeBytes,
+        requiredBytes=sum(liveBytes(segment) for segment in segments),
+        reclaimableBytes=sum(reclaimableBytes(segment) for segment in segments),
+        merge=None,
+        deletesPctAllowed=None)
+    if len(segments) <= maxNumSegments and plan['reclaimableBytes'] == 0:
+        return plan
+    availableBytes = freeBytes * (1.0 - headroom)
+    if plan['requiredBytes'] <= availableBytes:
+        plan['merge'] = 'full'
+        return plan
+    selected, deletesPctAllowed = selectByDeletes(segments, maxBytes=availableBytes, sizeOf=liveBytes)
+    if selected:
+        plan.update(
+            requiredBytes=sum(liveBytes(segment) for segment in selected),
+            reclaimableBytes=sum(reclaimableBytes(segment) for segment in selected),
+            merge='partial',
+            deletesPctAllowed=deletesPctAllowed)
+    return plan
+
+def selectByDeletes(segments, deletesPctThreshold=0.0, maxBytes=None, sizeOf=None, atLeastOne=False):
+    """Selects segments with more than deletesPctThreshold percent deletes, most deletes first, while their sizes add
+    up to at most maxBytes (the first one is always taken with atLeastOne). Returns the selection together with the
+    deletesPctAllowed for which forceMergeDeletes merges exactly these segments."""
+    sizeOf = sizeOf or (lambda segment: segment['sizeInBytes'])
+    candidates = sorted(
+        (segment for segment in segments if deletesPct(segment) > deletesPctThreshold),
+        key=deletesPct,
+        reverse=True)
+    selectedBytes = 0
+    deletesPctAllowed = deletesPctThreshold
+    for i, segment in enumerate(candidates):
+        if maxBytes is not None and selectedBytes + sizeOf(segment) > maxBytes and not (atLeastOne and i == 0):
+            deletesPctAllowed = deletesPct(segment)
+            break
+        selectedBytes += sizeOf(segment)
+    selected = [segment for segment in candidates if deletesPct(segment) > deletesPctAllowed]
+    return selected, deletesPctAllowed
+
+def deletesPct(segment):
+    return 0.0 if segment['maxDoc'] == 0 else 100.0 * segment['delCount'] / segment['maxDoc']
+
+def reclaimableBytes(segment):
+    return 0 if segment['maxDoc'] == 0 else segment['sizeInBytes'] * segment['delCount'] // segment['maxDoc']
+
+def liveBytes(segment):
+    return segment['sizeInBytes'] - reclaimableBytes(segment)
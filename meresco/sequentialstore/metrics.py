@@ -0,0 +1,59 @@
+## begin license ##
+#
+# "Meresco SequentialStore" contains components facilitating efficient sequentially ordered storing and retrieval.
+#
+# Copyright (C) 2026 Seecr (Seek You Too B.V.) https://seecr.nl
+#
+# This file is part of "Meresco SequentialStore"
+#
+# "Meresco SequentialStore" is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# "Meresco SequentialStore" is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with "Meresco SequentialStore"; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+#
+## end license ##
+
+from threading import Lock
+
+
+class LatencyHistogram(object):
+    """Counts durations in power-of-two microsecond buckets; cheap enough to record every single read, from any thread."""
+
+    def __init__(self):
+        self.count = 0
+        self.totalSeconds = 0.0
+        self._buckets = [0] * _BUCKETS
+        self._lock = Lock()
+
+    def record(self, seconds):
+        bucket = min(int(seconds * 1000000).bit_length(), _BUCKETS - 1)
+        with self._lock:
+            self.count += 1
+            self.totalSeconds += seconds
+            self._buckets[bucket] += 1
+
+    def percentile(self, pct):
+        "Upper bound in seconds of the bucket that holds the given percentile."
+        with self._lock:
+            count = self.count
+            buckets = list(self._buckets)
+        if count == 0:
+            return None
+        threshold = count * pct / 100.0
+        seen = 0
+        for i, n in enumerate(buckets):
+            seen += n
+            if seen >= threshold:
+                return (1 << i) / 1000000.0
+
+
+_BUCKETS = 40
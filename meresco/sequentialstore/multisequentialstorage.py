@@ -28,21 +28,52 @@
 #
 ## end license ##
 
-from os.path import join, isdir
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from os.path import join, isdir, isfile
 from os import listdir, makedirs
+from time import time
 from escaping import escapeFilename, unescapeFilename
 
-from .sequentialstorage import SequentialStorage
+from .sequentialstorage import SequentialStorage, CommittedReader, committedStats, snapshotCommitted, readExecutor, _attachCurrentThread, _SUMMED_STATS
 
 
 class MultiSequentialStorage(object):
-    def __init__(self, directory, name=None):
+    """Parts are opened on first use. With maxOpenParts, the least recently used parts are closed (and thereby
+    committed) when more parts are needed.
+
+    With sharedIndex all parts are stored in one SequentialStorage in directory itself, with one writer, reader and
+    commit: records are kept under the part name and identifier joined by PART_SEPARATOR, and indexed with their part.
+    By default an existing directory is opened the way it was created.
+
+    threads is the number of parts getParts, commit and close work on concurrently. memoryBudget, a MemoryBudget, limits
+    the memory for buffered modifications of all parts together (and possibly other storages). readThreads bounds the
+    threads doing the lookups of agetData and submitGetData, for all parts together. maxOpenReaders bounds the read-only
+    readers kept open for parts that are not open themselves (see deleteData)."""
+
+    def __init__(self, directory, name=None, maxOpenParts=None, sharedIndex=None, threads=1, memoryBudget=None, readThreads=4, maxOpenReaders=16):
         self._directory = directory
         self._name = name
+        self._maxOpenParts = maxOpenParts
+        self._maxOpenReaders = maxOpenReaders
+        self._memoryBudget = memoryBudget
+        self._threads = threads
+        self._executor = None
+        self._readThreads = readThreads
+        self._readExecutor = readExecutor(readThreads)
         isdir(self._directory) or makedirs(self._directory)
-        self._storage = {}
-        for name in listdir(directory):
-            self._getStorage(unescapeFilename(name))
+        isShared = isfile(join(directory, "sequentialstorage.version"))
+        if sharedIndex is None:
+            sharedIndex = isShared
+        assert sharedIndex or not isShared, "The %s directory holds a shared index." % directory
+        self._storage = OrderedDict()  # open parts, least recently used first
+        self._readers = OrderedDict()  # CommittedReaders of parts that are not open, least recently used first
+        self._shared = None
+        if sharedIndex:
+            self._shared = SequentialStorage(directory, memoryBudget=memoryBudget, readExecutor=self._readExecutor)
+            self._partNames = set(self._shared.parts())
+        else:
+            self._partNames = set(unescapeFilename(filename) for filename in listdir(directory))
 
     def observable_name(self):
         return self._name
@@ -51,15 +82,56 @@ class MultiSequentialStorage(object):
         self._getStorage(name, mayCreate=True).add(identifier, data)
 
     def deleteData(self, identifier, name=None):
+        """Without name, deletes from the parts that hold identifier; the other parts are checked without opening them
+        and are left untouched."""
         if name is None:
-            for storage in list(self._storage.values()):
-                storage.delete(identifier)
+            for name, _ in self._partsHolding([str(identifier)]):
+                self._getStorage(name).delete(identifier)
         else:
             self._getStorage(name).delete(identifier)
 
+    def addMultipleData(self, name, items):
+        "Adds (identifier, data) pairs to part name, with one commit check for the batch."
+        self._getStorage(name, mayCreate=True).addMultiple(items)
+
+    def deleteMultipleData(self, identifiers, name=None):
+        """Without name, deletes from the parts that hold the identifiers, checked per part in one call (see deleteData);
+        like deleteData, deleting from an unknown part raises KeyError."""
+        identifiers = [str(identifier) for identifier in identifiers]
+        if name is not None:
+            self._getStorage(name).applyChanges((identifier, None) for identifier in identifiers)
+            return
+        for name, present in self._partsHolding(identifiers):
+            self._getStorage(name).applyChanges((identifier, None) for identifier in present)
+
     def getData(self, identifier, name):
         return self._getStorage(name)[identifier]
 
+    def openRecord(self, identifier, name):
+        "A seekable, read-only file object over the data (see SequentialStorage.openRecord)."
+        return self._getStorage(name).openRecord(identifier)
+
+    async def agetData(self, identifier, name):
+        "Like getData, for asyncio: the lookup runs on the read threads."
+        data = await self._getStorage(name).aget(identifier)
+        if data is None:
+            raise KeyError(identifier)
+        return data
+
+    def submitGetData(self, identifier, name):
+        "A concurrent.futures.Future with the data of identifier in part name, or None; looked up on the read threads."
+        return self._getStorage(name).submitGet(identifier)
+
+    def hasPart(self, name):
+        "Whether part name exists, without opening it."
+        return name in self._partNames
+
+    def hasData(self, identifier, name):
+        "Answered from the identifier terms and live docs (and pending modifications), without loading the data."
+        if name not in self._partNames:
+            return False
+        return identifier in self._getStorage(name)
+
     def getMultipleData(self, name, identifiers, ignoreMissing=False):
         try:
             storage = self._getStorage(name)
@@ -67,27 +139,241 @@ class MultiSequentialStorage(object):
             if ignoreMissing:
                 return []
             raise
-        return storage.getMultiple(identifiers, ignoreMissing=ignoreMissing)
+        if self._maxOpenParts is None:
+            return storage.getMultiple(identifiers, ignoreMissing=ignoreMissing)
+        return self._getMultipleData(name, identifiers, ignoreMissing)
+
+    def getParts(self, identifiers, names):
+        """Returns (identifier, {name: data}) for each identifier, with those of the parts names that hold it. Every part
+        is looked up in one batch; with threads > 1 and all parts open at once, parts are looked up concurrently."""
+        identifiers = [str(identifier) for identifier in identifiers]
+        names = [name for name in names if name in self._partNames]
+        records = [(identifier, {}) for identifier in identifiers]
+        if self._shared is not None:
+            values = self._shared.getMany(name + PART_SEPARATOR + identifier for name in names for identifier in identifiers)
+            results = [(name, values[i * len(identifiers):(i + 1) * len(identifiers)]) for i, name in enumerate(names)]
+        elif self._threads > 1 and len(names) > 1 and (self._maxOpenParts is None or len(names) <= self._maxOpenParts):
+            storages = [(name, self._getStorage(name)) for name in names]
+            results = list(self._getExecutor().map(lambda item: (item[0], item[1].getMany(identifiers)), storages))
+        else:
+            results = [(name, self._getStorage(name).getMany(identifiers)) for name in names]
+        for name, values in results:
+            for (identifier, parts), data in zip(records, values):
+                if data is not None:
+                    parts[name] = data
+        return records
 
     def handleShutdown(self):
         print('handle shutdown: saving MultiSequentialStorage %s' % self._directory)
         from sys import stdout; stdout.flush()
-        self.close()
+        timings = self.close()
+        print('handle shutdown: saved MultiSequentialStorage %s in %.1f seconds (slowest part %.1f seconds)' % (
+            self._directory, timings['seconds'], max(timings['parts'].values(), default=0.0)))
+        stdout.flush()
 
     def close(self):
-        for storage in self._storage.values():
-            storage.close()
+        "Closes the open parts (see commit for the result)."
+        self._readExecutor.shutdown(wait=True)
+        while self._readers:
+            self._readers.popitem()[1].close()
+        timings = self._forOpenParts(lambda storage: storage.close())
+        self._storage.clear()
+        self._readExecutor = readExecutor(self._readThreads)
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        return timings
 
     def commit(self):
-        for storage in self._storage.values():
-            storage.commit()
+        """Commits the open parts, concurrently with threads > 1. Returns dict(seconds=<total>, parts={name: seconds});
+        parts is empty with a shared index, which is committed once."""
+        return self._forOpenParts(lambda storage: storage.commit())
+
+    def snapshot(self, targetDirectory):
+        "Snapshots the open parts (see SequentialStorage.snapshot), and copies the last commit of the others without opening them."
+        if self._shared is not None:
+            return self._shared.snapshot(targetDirectory)
+        result = dict(linked=0, copied=0, skipped=0, removed=0)
+        for name in sorted(self._partNames):
+            storage = self._storage.get(name)
+            partTarget = join(targetDirectory, escapeFilename(name))
+            if storage is None:
+                partResult = snapshotCommitted(join(self._directory, escapeFilename(name)), partTarget)
+            else:
+                partResult = storage.snapshot(partTarget)
+            for key, count in partResult.items():
+                result[key] += count
+        return result
+
+    def stats(self):
+        """Open parts have the stats of SequentialStorage, closed parts only those their last commit tells (see
+        committedStats); the sums are over both. With a shared index, the parts only have their numDocs (as of the last
+        commit)."""
+        if self._shared is not None:
+            result = self._shared.stats()
+            result['parts'] = dict((name, dict(numDocs=self._shared.partLength(name))) for name in sorted(self._partNames))
+        else:
+            parts = dict((name, storage.stats()) for name, storage in self._storage.items())
+            for name in sorted(self._partNames.difference(parts)):
+                parts[name] = committedStats(join(self._directory, escapeFilename(name)))
+            result = dict((key, sum(stats.get(key, 0) for stats in parts.values())) for key in _SUMMED_STATS)
+            result['parts'] = parts
+        if self._memoryBudget is not None:
+            result['memoryBudget'] = self._memoryBudget.stats()
+        return result
 
     def _getStorage(self, name, mayCreate=False):
         storage = self._storage.get(name)
-        if storage is None:
-            directory = join(self._directory, escapeFilename(name))
-            if isdir(directory) or mayCreate:
-                self._storage[name] = storage = SequentialStorage(directory)
-            else:
-                raise KeyError(name)
+        if storage is not None:
+            self._storage.move_to_end(name)
+            return storage
+        if not (name in self._partNames or mayCreate):
+            raise KeyError(name)
+        if self._shared is not None:
+            assert PART_SEPARATOR not in name, "Part name %s contains the part separator." % repr(name)
+            self._storage[name] = storage = _SharedPart(self._shared, name)
+            self._partNames.add(name)
+            return storage
+        reader = self._readers.pop(name, None)
+        if reader is not None:
+            reader.close()
+        self._storage[name] = storage = SequentialStorage(join(self._directory, escapeFilename(name)), memoryBudget=self._memoryBudget, readExecutor=self._readExecutor)
+        self._partNames.add(name)
+        self._closeIdleParts()
         return storage
+
+    def _forOpenParts(self, operation):
+        t0 = time()
+        if self._shared is not None:
+            operation(self._shared)
+            return dict(seconds=time() - t0, parts={})
+        storages = list(self._storage.items())
+        timed = lambda item: (item[0], _timed(operation, item[1]))
+        if self._threads > 1 and len(storages) > 1:
+            parts = dict(self._getExecutor().map(timed, storages))
+        else:
+            parts = dict(timed(item) for item in storages)
+        return dict(seconds=time() - t0, parts=parts)
+
+    def _getExecutor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self._threads, initializer=_attachCurrentThread)
+        return self._executor
+
+    def _closeIdleParts(self):
+        if self._maxOpenParts is None:
+            return
+        while len(self._storage) > self._maxOpenParts:
+            name, storage = self._storage.popitem(last=False)
+            storage.close()
+
+    def _partsHolding(self, identifiers):
+        "Returns [(name, identifiers present)]; open parts answer themselves, closed parts from their last commit."
+        result = []
+        for name in sorted(self._partNames):
+            storage = self._storage.get(name)
+            if storage is None and self._shared is not None:
+                storage = _SharedPart(self._shared, name)
+            checker = storage if storage is not None else self._getReader(name)
+            present = [identifier for identifier, exists in zip(identifiers, checker.existsMany(identifiers)) if exists]
+            if present:
+                result.append((name, present))
+        return result
+
+    def _getReader(self, name):
+        reader = self._readers.get(name)
+        if reader is not None:
+            self._readers.move_to_end(name)
+            return reader
+        self._readers[name] = reader = CommittedReader(join(self._directory, escapeFilename(name)))
+        while len(self._readers) > self._maxOpenReaders:
+            self._readers.popitem(last=False)[1].close()
+        return reader
+
+    def _getMultipleData(self, name, identifiers, ignoreMissing):
+        # the part may be closed in between results; look it up again for every identifier
+        for identifier in identifiers:
+            identifier = str(identifier)
+            try:
+                data = self._getStorage(name)[identifier]
+            except KeyError:
+                if ignoreMissing:
+                    continue
+                raise
+            yield identifier, data
+
+
+class _SharedPart(object):
+    "The SequentialStorage methods MultiSequentialStorage uses, for a part in a shared index."
+
+    def __init__(self, storage, name):
+        self._storage = storage
+        self._prefix = name + PART_SEPARATOR
+        self._name = name
+
+    def add(self, identifier, data):
+        self._storage.add(self._prefix + str(identifier), data, part=self._name)
+
+    def addMultiple(self, items):
+        self._storage.addMultiple(((self._prefix + str(identifier), data) for identifier, data in items), part=self._name)
+
+    def delete(self, identifier):
+        self._storage.delete(self._prefix + str(identifier))
+
+    def applyChanges(self, changes):
+        self._storage.applyChanges((self._prefix + str(identifier), data) for identifier, data in changes)
+
+    def __getitem__(self, identifier):
+        identifier = str(identifier)
+        try:
+            return self._storage[self._prefix + identifier]
+        except KeyError:
+            raise KeyError(identifier)
+
+    def openRecord(self, identifier):
+        identifier = str(identifier)
+        try:
+            return self._storage.openRecord(self._prefix + identifier)
+        except KeyError:
+            raise KeyError(identifier)
+
+    async def aget(self, identifier, default=None):
+        return await self._storage.aget(self._prefix + str(identifier), default)
+
+    def submitGet(self, identifier):
+        return self._storage.submitGet(self._prefix + str(identifier))
+
+    def __contains__(self, identifier):
+        return (self._prefix + str(identifier)) in self._storage
+
+    def existsMany(self, identifiers):
+        return self._storage.existsMany(self._prefix + str(identifier) for identifier in identifiers)
+
+    def getMany(self, identifiers):
+        return self._storage.getMany(self._prefix + str(identifier) for identifier in identifiers)
+
+    def getMultiple(self, identifiers, ignoreMissing=False):
+        for identifier in identifiers:
+            identifier = str(identifier)
+            try:
+                data = self[identifier]
+            except KeyError:
+                if ignoreMissing:
+                    continue
+                raise
+            yield identifier, data
+
+    def commit(self):
+        self._storage.commit()
+
+    def close(self):
+        pass
+
+
+def _timed(operation, storage):
+    t0 = time()
+    operation(storage)
+    return time() - t0
+
+
+PART_SEPARATOR = '\x1f'  # ASCII unit separator
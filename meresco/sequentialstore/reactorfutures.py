@@ -0,0 +1,82 @@
+## begin license ##
+#
+# "Meresco SequentialStore" contains components facilitating efficient sequentially ordered storing and retrieval.
+#
+# Copyright (C) 2026 Seecr (Seek You Too B.V.) https://seecr.nl
+#
+# This file is part of "Meresco SequentialStore"
+#
+# "Meresco SequentialStore" is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# "Meresco SequentialStore" is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with "Meresco SequentialStore"; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+#
+## end license ##
+
+
+from collections import deque
+from os import pipe, read, write, close
+
+from weightless.io import Suspend
+
+
+class ReactorFutures(object):
+    """Lets processes in the Weightless reactor wait for a concurrent.futures.Future, such as the asynchronous reads of
+    SequentialStorage (submitGet), without blocking the reactor. The threads completing the futures only wake the
+    reactor through a pipe; the processes are resumed in the reactor thread."""
+
+    def __init__(self, reactor):
+        self._reactor = reactor
+        self._done = deque()
+        self._waiting = 0
+        self._registered = False  # whether the pipe is registered with the reactor
+        self._readFd, self._writeFd = pipe()
+
+    def waitFor(self, future):
+        "Generator suspending the calling process until future is done; returns its result or raises its exception."
+        suspend = Suspend(doNext=lambda suspend: self._startWaiting(suspend, future))
+        yield suspend
+        return suspend.getResult()
+
+    def close(self):
+        if self._registered:
+            self._reactor.removeReader(self._readFd)
+            self._registered = False
+        close(self._readFd)
+        close(self._writeFd)
+
+    def _startWaiting(self, suspend, future):
+        if not self._registered:
+            self._reactor.addReader(self._readFd, self._resumeDone)
+            self._registered = True
+        self._waiting += 1
+        future.add_done_callback(lambda future: self._whenDone(suspend, future))
+
+    def _whenDone(self, suspend, future):
+        # In the thread that completed the future.
+        self._done.append((suspend, future))
+        write(self._writeFd, b'.')
+
+    def _resumeDone(self):
+        # A resumed process may wait again right away (from resume), while the pipe is still registered.
+        read(self._readFd, 4096)
+        while self._done:
+            suspend, future = self._done.popleft()
+            self._waiting -= 1
+            exception = future.exception()
+            if exception is None:
+                suspend.resume(future.result())
+            else:
+                suspend.throw(type(exception), exception, exception.__traceback__)
+        if self._waiting == 0 and self._registered:
+            self._reactor.removeReader(self._readFd)
+            self._registered = False
@@ -0,0 +1,95 @@
+## begin license ##
+#
+# "Meresco SequentialStore" contains components facilitating efficient sequentially ordered storing and retrieval.
+#
+# Copyright (C) 2026 Seecr (Seek You Too B.V.) https://seecr.nl
+#
+# This file is part of "Meresco SequentialStore"
+#
+# "Meresco SequentialStore" is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# "Meresco SequentialStore" is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with "Meresco SequentialStore"; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+#
+## end license ##
+
+
+from io import RawIOBase, SEEK_SET, SEEK_CUR, SEEK_END
+
+
+class RecordStream(RawIOBase):
+    """Read-only, seekable file object over the data of one record, kept in the JVM by a RecordReader: every read only
+    copies the requested range to Python. The record is not streamed from disk: Lucene reads a stored field as a
+    whole, so the JVM holds all of it while the stream is open."""
+
+    def __init__(self, recordReader):
+        RawIOBase.__init__(self)
+        self._recordReader = recordReader
+        self._size = recordReader.length()
+        self._position = 0
+
+    @property
+    def size(self):
+        return self._size
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def read(self, size=-1):
+        if self.closed:
+            raise ValueError('I/O operation on closed file.')
+        if size is None or size < 0:
+            size = self._size - self._position
+        data = _toBytes(self._recordReader.read(self._position, min(size, max(0, self._size - self._position))))
+        self._position += len(data)
+        return data
+
+    readall = read
+
+    def seek(self, offset, whence=SEEK_SET):
+        if whence == SEEK_SET:
+            position = offset
+        elif whence == SEEK_CUR:
+            position = self._position + offset
+        elif whence == SEEK_END:
+            position = self._size + offset
+        else:
+            raise ValueError('invalid whence (%r, should be 0, 1 or 2)' % whence)
+        if position < 0:
+            raise ValueError('negative seek position %r' % position)
+        self._position = position
+        return position
+
+    def tell(self):
+        return self._position
+
+    def close(self):
+        self._recordReader = None
+        RawIOBase.close(self)
+
+
+def _toBytes(bytesRef):
+    "The bytes of a Lucene BytesRef, copied out of the JVM in one step."
+    if bytesRef is None:
+        return None
+    data = bytesRef.bytes.string_
+    if bytesRef.offset == 0 and bytesRef.length == len(data):
+        return data
+    return data[bytesRef.offset:bytesRef.offset + bytesRef.length]
@@ -0,0 +1,206 @@
+## begin license ##
+#
+# "Meresco SequentialStore" contains components facilitating efficient sequentially ordered storing and retrieval.
+#
+# Copyright (C) 2026 Seecr (Seek You Too B.V.) https://seecr.nl
+#
+# This file is part of "Meresco SequentialStore"
+#
+# "Meresco SequentialStore" is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# "Meresco SequentialStore" is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with "Meresco SequentialStore"; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+#
+## end license ##
+
+
+from json import dumps, loads
+from socket import AF_UNIX, SOCK_STREAM, socket, create_connection
+from socketserver import StreamRequestHandler, ThreadingTCPServer, ThreadingUnixStreamServer
+from struct import Struct
+from sys import stderr
+from threading import Thread, Event
+
+from lucene import getVMEnv
+
+from .export.export import RECORD, TOMBSTONE
+
+
+class ReplicationLeader(object):
+    """Serves the committed changes of a SequentialStorage to followers, over TCP (address a (host, port) tuple; port 0
+    picks a free one, see address) or a Unix domain socket (address a path).
+
+    A follower writes a JSON request line {"sinceKey": ..., "maxCount": ...}; the answer is a JSON line with count and
+    committedKey, followed by count changes in key order, each a CHANGE_HEADER (key, type, identifier length, data
+    length), the identifier and the data. A connection may be used for any number of requests."""
+
+    def __init__(self, storage, address, maxCount=1000):
+        self._storage = storage
+        self._maxCount = maxCount
+        serverClass = ThreadingUnixStreamServer if isinstance(address, str) else ThreadingTCPServer
+        self._server = serverClass(address, self._handlerClass(), bind_and_activate=False)
+        self._server.daemon_threads = True
+        self._server.allow_reuse_address = True
+        self._server.server_bind()
+        self._server.server_activate()
+        self._thread = None
+
+    @property
+    def address(self):
+        return self._server.server_address
+
+    def start(self):
+        self._thread = Thread(target=self._server.serve_forever, name='ReplicationLeader', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._server.server_close()
+
+    def _handlerClass(self):
+        leader = self
+        class Handler(StreamRequestHandler):
+            def handle(self):
+                getVMEnv().attachCurrentThread()
+                for line in self.rfile:
+                    request = loads(line)
+                    changes, committedKey = leader._storage.committedChanges(request['sinceKey'], min(request.get('maxCount', leader._maxCount), leader._maxCount))
+                    self.wfile.write(('%s\n' % dumps(dict(count=len(changes), committedKey=committedKey))).encode())
+                    for key, identifier, data in changes:
+                        bIdentifier = identifier.encode()
+                        self.wfile.write(CHANGE_HEADER.pack(key, RECORD if data is not None else TOMBSTONE, len(bIdentifier), 0 if data is None else len(data)))
+                        self.wfile.write(bIdentifier)
+                        if data is not None:
+                            self.wfile.write(data)
+                    self.wfile.flush()
+        return Handler
+
+
+class ReplicationFollower(object):
+    """Applies the changes served by a ReplicationLeader to a SequentialStorage, in batches of at most batchSize.
+
+    The position, the leader's key up to which changes are applied, is kept with the store as its importedKey, so a
+    follower can also start from a full import of an export of the leader. Lag is measured in sequence keys: the
+    committed key of the leader minus the position."""
+
+    def __init__(self, storage, address, batchSize=1000, interval=1.0):
+        self._storage = storage
+        self._address = address
+        self._batchSize = batchSize
+        self._interval = interval
+        self._position = storage.importedKey() or 0
+        self._leaderKey = None
+        self._connection = None
+        self._stopped = Event()
+        self._thread = None
+
+    def position(self):
+        return self._position
+
+    def lag(self):
+        "In sequence keys, as of the last poll; None before the first."
+        return None if self._leaderKey is None else max(0, self._leaderKey - self._position)
+
+    def poll(self):
+        "Fetches and applies one batch of changes; returns the number of changes applied."
+        changes, self._leaderKey = self._request(self._position)
+        if not changes:
+            return 0
+        self._position = changes[-1][0]
+        self._storage.setImportedKey(self._position)
+        self._storage.applyChanges((identifier, data) for key, identifier, data in changes)
+        return len(changes)
+
+    def catchUp(self):
+        "Polls until there are no more committed changes, then commits; returns the number of changes applied."
+        applied = 0
+        while True:
+            count = self.poll()
+            applied += count
+            if count < self._batchSize:
+                break
+        if applied:
+            self._storage.commit()
+        return applied
+
+    def start(self):
+        self._stopped.clear()
+        self._thread = Thread(target=self._run, name='ReplicationFollower', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.close()
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def _run(self):
+        getVMEnv().attachCurrentThread()
+        while not self._stopped.is_set():
+            try:
+                self.catchUp()
+            except Exception as e:
+                stderr.write('ReplicationFollower: %s\n' % e)
+                stderr.flush()
+                self.close()
+            self._stopped.wait(self._interval)
+
+    def _request(self, sinceKey):
+        if self._connection is None:
+            self._connection = _connect(self._address)
+        sock, rfile = self._connection
+        try:
+            sock.sendall(('%s\n' % dumps(dict(sinceKey=sinceKey, maxCount=self._batchSize))).encode())
+            response = loads(rfile.readline())
+            changes = []
+            for i in range(response['count']):
+                key, changeType, identifierLength, dataLength = CHANGE_HEADER.unpack(_readExactly(rfile, CHANGE_HEADER.size))
+                identifier = _readExactly(rfile, identifierLength).decode()
+                data = _readExactly(rfile, dataLength)
+                changes.append((key, identifier, None if changeType == TOMBSTONE else data))
+        except Exception:
+            self.close()
+            raise
+        return changes, response['committedKey']
+
+
+class _Connection(tuple):
+    def close(self):
+        sock, rfile = self
+        rfile.close()
+        sock.close()
+
+def _connect(address):
+    if isinstance(address, str):
+        sock = socket(AF_UNIX, SOCK_STREAM)
+        sock.connect(address)
+    else:
+        sock = create_connection(address)
+    return _Connection((sock, sock.makefile('rb')))
+
+def _readExactly(rfile, size):
+    data = rfile.read(size)
+    if len(data) != size:
+        raise IOError('Connection to replication leader closed')
+    return data
+
+
+CHANGE_HEADER = Struct('>QBII')
@@ -28,53 +28,114 @@
 #
 ## end license ##
 
-from os import getenv, makedirs, listdir
+from asyncio import get_running_loop
+from concurrent.futures import Future, ThreadPoolExecutor
+from heapq import merge
+from io import BytesIO
+from itertools import islice, takewhile
+from json import dumps, loads
+from os import getenv, makedirs, listdir, remove
 from os.path import join, isdir, isfile, getsize
+from shutil import disk_usage, rmtree
+from tempfile import mkdtemp
+from threading import Lock, Thread
+from time import time
 from warnings import warn
 
 from .export import Export
+from .journal import Journal
+from .mergeplan import planMerge
+from .recordstream import RecordStream, _toBytes
+from .metrics import LatencyHistogram
+from .snapshot import copySnapshot
+from .tombstones import Tombstones, copyTombstones
 
 try:
-    from org.meresco.sequentialstore import StoreLucene
-    from lucene import JArray, JavaError
+    from org.meresco.sequentialstore import StoreLucene, StoreReader
+    from lucene import JArray, JavaError, getVMEnv
     from org.apache.lucene.util import BytesRef
 except ImportError:
     raise ImportError("initVM() not called: please add to your project: 'from lucene import initVM; initVM(); from meresco_sequentialstore import initVM; initVM()'")
 
 class SequentialStorage(object):
-    version = '5'
+    # Version 6 no longer stores the key (it is only kept as docvalues) and keeps the identifier as sorted instead of
+    # binary docvalues (see StoreLucene). A store of an older version can not be upgraded in place: export it with the
+    # release that wrote it (bin/sequentialstore-export) and import the export with this one (bin/sequentialstore-import).
+    version = '6'
 
-    def __init__(self, directory, maxModifications=None):
+    def __init__(self, directory, maxModifications=None, journal=False, maxJournalModifications=None, directoryType=None, preload=False, warmup=False, memoryBudget=None, readExecutor=None):
+        """directoryType: None (Lucene's choice), 'mmap' or 'nio'; preload maps all files into memory (mmap only).
+        warmup: touch the identifier terms and keys in a background thread, to be served at full speed sooner after opening.
+        memoryBudget: a MemoryBudget shared with other storages, which has the largest users flush when exceeded.
+        readExecutor: the executor doing the lookups of aget, agetMultiple and submitGet, possibly shared with other storages
+        (its threads attached to the JVM, see readExecutor); by default one of 4 threads of this storage's own."""
+        if directoryType not in _DIRECTORY_TYPES:
+            raise ValueError('directoryType should be one of %s' % ', '.join(repr(t) for t in _DIRECTORY_TYPES))
         self._directory = directory
         if not isdir(directory):
             makedirs(directory)
         self._versionFormatCheck()
+        for filename in listdir(directory):
+            if filename.startswith(_BULKLOAD_PREFIX) and isdir(join(directory, filename)):
+                rmtree(join(directory, filename))  # left behind by a bulkLoad that crashed
         self._maxModifications = _DEFAULT_MAX_MODIFICATIONS if maxModifications is None else maxModifications
-        self._luceneStore = StoreLucene(directory)
+        self._maxJournalModifications = _DEFAULT_MAX_JOURNAL_MODIFICATIONS if maxJournalModifications is None else maxJournalModifications
+        self._luceneStore = StoreLucene(directory, directoryType or 'default', preload)
         self._latestModifications = {}
+        self._modificationsLock = Lock()  # a MemoryBudget may flush, and so reopen, this storage from another thread
+        self._segments = None
+        self._commitCount = 0
+        self._lastCommitDuration = None
+        self._lastReopenDuration = None
+        self._readLatency = LatencyHistogram()
+        self._pendingBytes = 0
+        self._memoryBudget = memoryBudget
+        if memoryBudget is not None:
+            self._luceneStore.setRAMBufferSizeMB(min(_DEFAULT_RAM_BUFFER_MB, memoryBudget.maxBytes / (1024 * 1024)))
+            memoryBudget.register(self)
+        newestKey = max(self._luceneStore.getNewestKey(), int(self._luceneStore.getCommitValue(_NEWEST_KEY) or 0))
+        self._tombstones = Tombstones(join(directory, "sequentialstorage.tombstones"), untilKey=newestKey)
+        self._luceneStore.setNewestKey(newestKey)
+        self._journal = None
+        self._openJournal(journal)
+        self._committedLock = Lock()  # the committed key and reader change together, see committedChanges
+        self._luceneStore.keepCommittedReader()
+        self._committedKey = self._luceneStore.getNewestKey()
+        self._readExecutor = readExecutor
+        self._ownsReadExecutor = readExecutor is None
+        self._warmupThread = None
+        if warmup:
+            self._warmupThread = Thread(target=_warmup, args=(self._luceneStore,), name='SequentialStorageWarmup', daemon=True)
+            self._warmupThread.start()
 
-    def add(self, identifier, data):
-        if identifier is None:
-            raise ValueError('identifier should not be None')
-        if data is None:
-            raise ValueError('data should not be None')
-        if not isinstance(data, bytes):
-            raise TypeError('data should be bytes')
-        identifier = str(identifier)
-        self._luceneStore.add(identifier, BytesRef(JArray('byte')(data)))
-        self._latestModifications[identifier] = data
+    def add(self, identifier, data, part=None):
+        "part: an optional name indexed with the record, see parts and partLength (not with journal)."
+        self._add(identifier, data, part)
         self._maybeCommit()
 
     __setitem__ = add
 
+    def addMultiple(self, items, part=None):
+        "Adds (identifier, data) pairs, considering a commit once per batch instead of per record."
+        for identifier, data in items:
+            self._add(identifier, data, part)
+        self._maybeCommit()
+
     def delete(self, identifier):
-        identifier = str(identifier)
-        self._luceneStore.delete(identifier)
-        self._latestModifications[identifier] = _DELETED_RECORD
+        self._delete(str(identifier))
         self._maybeCommit()
 
     __delitem__ = delete
 
+    def applyChanges(self, changes):
+        "Applies (identifier, data) pairs in order, where data None means a delete; as read from an incremental export."
+        for identifier, data in changes:
+            if data is None:
+                self._delete(str(identifier))
+            else:
+                self._add(identifier, data)
+        self._maybeCommit()
+
     def __getitem__(self, identifier):
         identifier = str(identifier)
         value = self._latestModifications.get(identifier)
@@ -87,6 +148,26 @@ class SequentialStorage(object):
             raise KeyError(identifier)
         return data
 
+    def __contains__(self, identifier):
+        "Cheaper than a lookup of the data: pending modifications first, then only the identifier terms of the index."
+        identifier = str(identifier)
+        value = self._latestModifications.get(identifier)
+        if value is not None:
+            return value is not _DELETED_RECORD
+        return self._luceneStore.exists(identifier)
+
+    exists = __contains__
+
+    def existsMany(self, identifiers):
+        "Like exists for each identifier; those without pending modifications are checked in one call."
+        identifiers = [str(identifier) for identifier in identifiers]
+        result = [self._latestModifications.get(identifier) for identifier in identifiers]
+        lookups = [i for i, value in enumerate(result) if value is None]
+        if lookups:
+            for i, exists in zip(lookups, self._luceneStore.existsMultiple(JArray('string')([identifiers[i] for i in lookups]))):
+                result[i] = exists
+        return [value if isinstance(value, bool) else value is not _DELETED_RECORD for value in result]
+
     def get(self, identifier, default=None):
         try:
             return self[identifier]
@@ -104,11 +185,87 @@ class SequentialStorage(object):
                 raise
             yield identifier, data
 
+    def getMany(self, identifiers):
+        "The data for each identifier, None when missing; the identifiers without pending modifications are looked up in one call."
+        identifiers = [str(identifier) for identifier in identifiers]
+        result = [self._latestModifications.get(identifier) for identifier in identifiers]
+        lookups = [i for i, value in enumerate(result) if value is None]
+        if lookups:
+            for i, data in zip(lookups, self._getDataMultiple([identifiers[i] for i in lookups])):
+                result[i] = data
+        return [None if value is _DELETED_RECORD else value for value in result]
+
+    async def aget(self, identifier, default=None):
+        "Like get, for asyncio: the lookup in the index runs on a bounded pool of threads, so a cold read does not block the event loop."
+        identifier = str(identifier)
+        value = self._latestModifications.get(identifier)
+        if not value is None:
+            return default if value is _DELETED_RECORD else value
+        data = await get_running_loop().run_in_executor(self._getReadExecutor(), self._getData, identifier)
+        return default if data is None else data
+
+    async def agetMultiple(self, identifiers, ignoreMissing=False):
+        "Like getMultiple, for asyncio, as a list of (identifier, data); the lookups in the index are done in one call on the read threads."
+        identifiers = [str(identifier) for identifier in identifiers]
+        result = [self._latestModifications.get(identifier) for identifier in identifiers]
+        lookups = [i for i, value in enumerate(result) if value is None]
+        if lookups:
+            found = await get_running_loop().run_in_executor(self._getReadExecutor(), self._getDataMultiple, [identifiers[i] for i in lookups])
+            for i, data in zip(lookups, found):
+                result[i] = data
+        items = []
+        for identifier, data in zip(identifiers, result):
+            if data is None or data is _DELETED_RECORD:
+                if ignoreMissing:
+                    continue
+                raise KeyError(identifier)
+            items.append((identifier, data))
+        return items
+
+    def submitGet(self, identifier):
+        """A concurrent.futures.Future with the data (or None) of identifier, looked up on the read threads.
+        For callers with an event loop of their own, like the Weightless reactor (see StorageComponentAdapter)."""
+        identifier = str(identifier)
+        value = self._latestModifications.get(identifier)
+        if not value is None:
+            future = Future()
+            future.set_result(None if value is _DELETED_RECORD else value)
+            return future
+        return self._getReadExecutor().submit(self._getData, identifier)
+
+    def openRecord(self, identifier):
+        """A seekable, read-only file object over the data. A committed record is read from the index as a whole and held
+        in the JVM (not in Python) while open; reads copy only the ranges asked for (see RecordStream)."""
+        identifier = str(identifier)
+        value = self._latestModifications.get(identifier)
+        if not value is None:
+            if value is _DELETED_RECORD:
+                raise KeyError(identifier)
+            return BytesIO(value)
+        recordReader = self._luceneStore.openRecord(identifier)
+        if recordReader is None:
+            raise KeyError(identifier)
+        return RecordStream(recordReader)
+
+    def getRange(self, identifier, offset, length):
+        "At most length bytes of the data, starting at offset."
+        with self.openRecord(identifier) as stream:
+            stream.seek(offset)
+            return stream.read(length)
+
     def __len__(self):
         "Note: must not be called in inner loop of bulk processing, because of commit"
         self.commit()  # not found a sure way yet to prevent this necessity
         return self._luceneStore.numDocs()
 
+    def parts(self):
+        "The part names records were added with, as of the last commit."
+        return list(self._luceneStore.parts())
+
+    def partLength(self, part):
+        "The number of records added with part, as of the last commit."
+        return self._luceneStore.partNumDocs(part)
+
     def iterkeys(self):
         self.commit()
         return self._luceneStore.iterkeys()
@@ -122,57 +279,416 @@ class SequentialStorage(object):
     def itervalues(self):
         return (_toBytes(item.data) for item in self._luceneStore.iteritems())
 
+    def iteritemsPartitioned(self, count):
+        "Splits iteritems in count iterators over disjoint ranges of documents, which may be consumed concurrently (from JVM attached threads)."
+        self.commit()
+        maxDoc = self._luceneStore.readerMaxDoc()
+        bounds = [maxDoc * i // count for i in range(count + 1)]
+        return [
+            ((item.identifier, _toBytes(item.data)) for item in self._luceneStore.iteritems(bounds[i], bounds[i + 1]))
+            for i in range(count)
+        ]
+
+    def newestKey(self):
+        "The sequence key of the latest add or delete; changesSince this key will be empty."
+        self.commit()
+        return self._luceneStore.getNewestKey()
+
+    def changesSince(self, sinceKey):
+        """Yields (identifier, data) for the records added and (identifier, None) for the records deleted after sinceKey.
+        Deletes come first: a record that is still present was added after any delete of its identifier."""
+        self.commit()
+        for key, identifier in self._tombstones.since(sinceKey):
+            yield identifier, None
+        for item in self._luceneStore.iteritemsSince(sinceKey):
+            yield item.identifier, _toBytes(item.data)
+
+    def committedKey(self):
+        "The newest key of the last commit."
+        return self._committedKey
+
+    def committedChanges(self, sinceKey, maxCount=1000):
+        """Returns up to maxCount (key, identifier, data) changes after sinceKey, in key order and up to the committed key,
+        which is returned as well; data is None for deletes. Records are read as of the last commit, so later updates and
+        deletes do not hide them. Does not commit, and may be called from another (JVM attached) thread than the one
+        modifying this store, e.g. to serve replication (see replication)."""
+        with self._committedLock:
+            untilKey = self._committedKey
+            records = [(item.key, item.identifier, _toBytes(item.data)) for item in self._luceneStore.itemsSince(sinceKey, untilKey, maxCount)]
+        tombstones = takewhile(lambda tombstone: tombstone[0] <= untilKey, self._tombstones.since(sinceKey))
+        tombstones = [(key, identifier, None) for key, identifier in islice(tombstones, maxCount)]
+        return list(islice(merge(tombstones, records, key=lambda change: change[0]), maxCount)), untilKey
+
+    def pruneTombstones(self, untilKey):
+        """Forgets deletes up to untilKey; only call this when no incremental export since an older key is needed anymore.
+        The tombstones hold every delete until pruned, so call this regularly with the oldest key still needed: the
+        sinceKey of the next incremental export, or the lowest position (importedKey) of the replication followers."""
+        self._tombstones.prune(untilKey)
+
+    def importedKey(self):
+        "The key of the source store up to which exports or replicated changes were imported into this store, or None."
+        value = self._luceneStore.getCommitValue(_IMPORTED_KEY)
+        return None if value is None else int(value)
+
+    def setImportedKey(self, key):
+        "Records the key of the source store up to which changes are imported, as part of the next commit."
+        self._luceneStore.setCommitValue(_IMPORTED_KEY, str(key))
+
+    def flush(self):
+        """Moves the buffered modifications to new segments, without a commit, to free their memory. May be called from
+        another thread than the one modifying this store (see MemoryBudget)."""
+        self._luceneStore.flush()
+        self._reopen()
+
+    def memoryUsage(self):
+        "Bytes used for buffered modifications: the IndexWriter RAM buffer plus (roughly) the pending modifications."
+        return self._luceneStore.ramBytesUsed() + self._pendingBytes
+
     def commit(self):
+        t0 = time()
+        committedKey = self._luceneStore.getNewestKey()
+        self._setCommitValues()
+        self._tombstones.flush()
         self._luceneStore.commit()
+        self._lastCommitDuration = time() - t0
+        self._commitCount += 1
+        self._segments = None
+        if self._journal is not None:
+            self._journal.truncate()
         self._reopen()
+        with self._committedLock:
+            self._luceneStore.keepCommittedReader()
+            self._committedKey = committedKey
+
+    def waitForWarmup(self, timeout=None):
+        if self._warmupThread is not None:
+            self._warmupThread.join(timeout)
+
+    def sync(self):
+        "Forces journalled modifications to disk (only relevant when opened with journal=True)."
+        if self._journal is not None:
+            self._journal.sync()
+
+    def export(self, exportPath, shards=1, sinceKey=None, progress=None):
+        """With sinceKey only the changes after that key are exported (see changesSince), to be imported on top of earlier
+        imports. Returns the newest key exported: the sinceKey for the next incremental export. See Export for progress."""
+        return Export(exportPath).export(self, shards=shards, sinceKey=sinceKey, progress=progress)
+
+    def importFrom(self, importPath, workers=1, bulk=None, progress=None):
+        """Imports a full export, or applies an incremental one on top of the imports before it. The key up to which the
+        source store is imported is kept in the Lucene commit (see importedKey). bulk (by default for a full import into
+        an empty store) loads the records through bulkLoad, in rounds that each end with a commit.
+
+        The number of blocks imported is kept in the Lucene commit as well: an interrupted import of the same export
+        resumes after the blocks committed, in the mode (bulk or not) it was started with. An export up to a key already
+        imported is refused, as applying it again would bring back older data and deleted records. See Export for
+        progress."""
+        export = Export(importPath)
+        header = export.header()
+        sinceKey = header.get('sinceKey')
+        untilKey = header.get('untilKey')
+        importedKey = self.importedKey()
+        if importedKey is not None and untilKey is not None and untilKey <= importedKey:
+            raise ValueError("Export until key %s is already imported (imported key %s)." % (untilKey, importedKey))
+        skipBlocks = 0
+        importProgress = self._luceneStore.getCommitValue(_IMPORT_PROGRESS)
+        if importProgress:
+            importProgress = loads(importProgress)
+            if importProgress['header'] == header:
+                skipBlocks = importProgress['blocks']
+        if sinceKey is not None:
+            if importedKey is None or sinceKey > importedKey:
+                raise ValueError("Incremental export since key %s does not follow the imported key %s." % (sinceKey, importedKey))
+            bulk = False
+        elif bulk is None:
+            bulk = importProgress['bulk'] if skipBlocks else len(self) == 0
+        checkpoint = lambda blocks: self._luceneStore.setCommitValue(_IMPORT_PROGRESS, dumps(dict(header=header, blocks=blocks, bulk=bulk)))
+        export.importInto(self, workers=workers, bulk=bulk, progress=progress, skipBlocks=skipBlocks, checkpoint=checkpoint)
+        self._luceneStore.setCommitValue(_IMPORT_PROGRESS, '')
+        if untilKey is not None:
+            self.setImportedKey(untilKey)
+        self.commit()
 
-    def export(self, exportPath):
-        Export(exportPath).export(self)
+    def bulkLoad(self, items, tmpDirectory=None):
+        """Loads (identifier, data) pairs with unique identifiers that are not in this store yet, e.g. from an export or
+        the iteritems of another store. The records are appended to segments in a temporary directory (inside this store
+        by default, where Lucene leaves it alone and where leftovers of a crash are removed on opening),
+        without delete terms or intermediate commits, which are then attached with Lucene's addIndexes and committed.
+        Unless the store is empty, the identifiers are looked up first; one already in the store, or one occurring twice in
+        items (found in the terms of the temporary segments), raises ValueError and nothing is loaded. Keys continue after
+        the newest key this store has handed out. Returns the number of records loaded."""
+        checkExisting = len(self) != 0
+        tmpDirectory = mkdtemp(prefix=_BULKLOAD_PREFIX, dir=tmpDirectory or self._directory)
+        try:
+            tmpStore = StoreLucene(tmpDirectory)
+            try:
+                tmpStore.setNewestKey(self._luceneStore.getNewestKey())
+                count = 0
+                items = iter(items)
+                while True:
+                    batch = [(self._checkRecord(identifier, data), data) for identifier, data in islice(items, _BULKLOAD_BATCH_SIZE)]
+                    if not batch:
+                        break
+                    if checkExisting:
+                        for (identifier, data), exists in zip(batch, self.existsMany(identifier for identifier, data in batch)):
+                            if exists:
+                                raise ValueError("bulkLoad of identifier '%s', which is already in the store" % identifier)
+                    for identifier, data in batch:
+                        tmpStore.append(identifier, BytesRef(JArray('byte')(data)))
+                    count += len(batch)
+                tmpStore.commit()
+                tmpStore.reopen()
+                duplicate = tmpStore.duplicateIdentifier()
+                if duplicate is not None:
+                    raise ValueError("bulkLoad of identifier '%s' more than once" % duplicate)
+                newestKey = tmpStore.getNewestKey()
+            finally:
+                tmpStore.close()
+            self._luceneStore.addIndexes(tmpDirectory, newestKey)
+        finally:
+            rmtree(tmpDirectory)
+        self.commit()
+        return count
 
-    def importFrom(self, importPath):
-        Export(importPath).importInto(self)
+    def snapshot(self, targetDirectory):
+        """Consistent copy of the store as of now, made while writes continue. Repeated snapshots to the same
+        targetDirectory only transfer the files that are new since the previous one."""
+        if isdir(targetDirectory) and listdir(targetDirectory):
+            assert isfile(join(targetDirectory, "sequentialstorage.version")), "The %s directory is already in use for something other than a SequentialStorage." % targetDirectory
+        self.commit()
+        indexCommit = self._luceneStore.snapshot()
+        try:
+            result = copySnapshot(self._directory, targetDirectory, list(self._luceneStore.snapshotFiles(indexCommit)))
+            _copyTombstones(self._directory, targetDirectory, self._luceneStore.snapshotCommitValue(indexCommit, _NEWEST_KEY))
+        finally:
+            self._luceneStore.releaseSnapshot(indexCommit)
+        with open(join(targetDirectory, "sequentialstorage.version"), 'w') as f:
+            f.write(self.version)
+        return result
 
     def close(self):
         if self._luceneStore is None:
             return
+        if self._ownsReadExecutor and self._readExecutor is not None:
+            self._readExecutor.shutdown(wait=True)
+        self._readExecutor = None
+        if self._memoryBudget is not None:
+            self._memoryBudget.unregister(self)
+        self._tombstones.close()
+        self._setCommitValues()
         self._luceneStore.commit()
         self._luceneStore.close()
         self._luceneStore = None
+        if self._journal is not None:
+            self._journal.truncate()
+            self._journal.close()
+            self._journal = None
 
-    def gc(self, maxNumSegments=1, doWait=False):
-        "Note: to prevent from potentially crashing on 'disk full' during active GC, a client needs to take care of handling (ignoring?) IOException."
-        try:
-            self._luceneStore.forceMerge(maxNumSegments, doWait)
-            if doWait:
-                self.commit()
-        except JavaError as e:
-            original = e.getJavaException()
-            if original.getClass().getName() == 'IOException':
-                raise IOError(original.getMessage())
-            raise
+    def gc(self, maxNumSegments=1, doWait=False, checkDiskSpace=True):
+        """Returns the merge plan (see mergePlan). With checkDiskSpace a merge that does not fit on the volume is replaced
+        by a partial merge of the segments with most deletes that do fit; with doWait such steps are repeated as long as
+        they are possible. Note: when not checking disk space, to prevent from potentially crashing on 'disk full'
+        during active GC, a client needs to take care of handling (ignoring?) IOException."""
+        while True:
+            plan = self.mergePlan(maxNumSegments) if checkDiskSpace else dict(merge='full')
+            if plan['merge'] == 'full':
+                self._merge(self._luceneStore.forceMerge, maxNumSegments, doWait)
+                return plan
+            if plan['merge'] is None:
+                return plan
+            self.gcDeletes(plan['deletesPctAllowed'], doWait)
+            if not doWait:
+                return plan
+
+    def mergePlan(self, maxNumSegments=1):
+        "Estimates temporary space needed and space reclaimed by gc from the committed segments and the free space on the volume."
+        return planMerge(self.segments(), freeBytes=disk_usage(self._directory).free, maxNumSegments=maxNumSegments)
+
+    def gcDeletes(self, deletesPctAllowed=10.0, doWait=False):
+        "Merges only the segments with more than deletesPctAllowed percent deleted records. Same note as for gc applies."
+        self._merge(self._luceneStore.forceMergeDeletes, float(deletesPctAllowed), doWait)
+
+    def segments(self):
+        "Segment metadata of the last commit: name, maxDoc, delCount and sizeInBytes per segment. Read once per commit."
+        commitCount = self._commitCount
+        segments = self._segments
+        if segments is None:
+            segments = _segmentDicts(self._luceneStore.segmentStats())
+            if commitCount == self._commitCount:  # not cached when a commit came in between (e.g. from another thread)
+                self._segments = segments
+        return segments
+
+    def stats(self):
+        """Cheap enough for monitoring: document counts are those of the reader, as of the last reopen (pendingModifications
+        are not counted yet); sizes come from the segment metadata of the last commit."""
+        segments = self.segments()
+        numDocs = self._luceneStore.numDocs()
+        committedDocs = sum(segment['maxDoc'] - segment['delCount'] for segment in segments)
+        sizeInBytes = sum(segment['sizeInBytes'] for segment in segments)
+        mergeScheduler = self._luceneStore.getMergeScheduler()
+        return dict(
+            numDocs=numDocs,
+            deletedDocs=self._luceneStore.maxDoc() - numDocs,
+            segmentCount=len(segments),
+            segments=segments,
+            sizeInBytes=sizeInBytes,
+            bytesPerRecord=sizeInBytes / committedDocs if committedDocs else None,
+            pendingModifications=len(self._latestModifications),
+            pendingBytes=self._pendingBytes,
+            journalEntries=None if self._journal is None else len(self._journal),
+            ramBufferBytes=self._luceneStore.ramBytesUsed(),
+            lastCommitDuration=self._lastCommitDuration,
+            lastReopenDuration=self._lastReopenDuration,
+            mergingSegments=self._luceneStore.mergingSegmentCount(),
+            pendingMerges=self._luceneStore.hasPendingMerges(),
+            mergeCount=mergeScheduler.mergeCount(),
+            mergedBytes=mergeScheduler.mergedBytes(),
+            mergeSeconds=mergeScheduler.mergeSeconds(),
+            mergeIORateLimitMBPerSec=mergeScheduler.getIORateLimitMBPerSec(),
+            readCount=self._readLatency.count,
+            readSeconds=self._readLatency.totalSeconds,
+            readP99Seconds=self._readLatency.percentile(99),
+        )
+
+    def setMergeThrottle(self, maxMergeCount=None, maxThreadCount=None, autoIOThrottle=None, maxMergeMBPerSec=None, forceMergeMBPerSec=None):
+        """Adjusts Lucene's ConcurrentMergeScheduler at runtime; arguments left None are unchanged.
+        maxMergeMBPerSec caps the write rate of every merge, including those started by gc; the auto IO throttle and
+        forceMergeMBPerSec (for merges started by gc) may limit them further."""
+        mergeScheduler = self._luceneStore.getMergeScheduler()
+        if maxMergeCount is not None or maxThreadCount is not None:
+            self._luceneStore.setMaxMergesAndThreads(
+                mergeScheduler.getMaxMergeCount() if maxMergeCount is None else maxMergeCount,
+                mergeScheduler.getMaxThreadCount() if maxThreadCount is None else maxThreadCount)
+        if autoIOThrottle is not None:
+            self._luceneStore.setAutoIOThrottle(autoIOThrottle)
+        if maxMergeMBPerSec is not None:
+            mergeScheduler.setMaxMBPerSec(float(maxMergeMBPerSec))
+        if forceMergeMBPerSec is not None:
+            mergeScheduler.setForceMergeMBPerSec(float(forceMergeMBPerSec))
 
     def getSizeOnDisk(self):
         path = self._directory
         return sum(getsize(join(path, f)) for f in listdir(path) if isfile(join(path, f)))
 
+    def _add(self, identifier, data, part=None):
+        identifier = self._checkRecord(identifier, data)
+        if part is not None and self._journal is not None:
+            raise ValueError('part is not supported with journal')
+        with self._modificationsLock:
+            if part is None:
+                if self._journal is not None:
+                    self._journal.add(identifier, data)
+                self._luceneStore.add(identifier, BytesRef(JArray('byte')(data)))
+            else:
+                self._luceneStore.add(identifier, BytesRef(JArray('byte')(data)), str(part))
+            self._latestModifications[identifier] = data
+            self._pendingBytes += len(identifier) + len(data)
+
+    def _checkRecord(self, identifier, data):
+        if identifier is None:
+            raise ValueError('identifier should not be None')
+        if data is None:
+            raise ValueError('data should not be None')
+        if not isinstance(data, bytes):
+            raise TypeError('data should be bytes')
+        return str(identifier)
+
+    def _delete(self, identifier):
+        with self._modificationsLock:
+            if not self.exists(identifier):
+                return  # no key nor tombstone for a delete that changes nothing
+            if self._journal is not None:
+                self._journal.delete(identifier)
+            self._tombstones.add(self._luceneStore.delete(identifier), identifier)
+            self._latestModifications[identifier] = _DELETED_RECORD
+
+    def _setCommitValues(self):
+        # Deletes take keys too, which are only remembered by the tombstones: once pruned, keys could be handed out again.
+        newestKey = str(self._luceneStore.getNewestKey())
+        if self._luceneStore.getCommitValue(_NEWEST_KEY) != newestKey:
+            self._luceneStore.setCommitValue(_NEWEST_KEY, newestKey)
+        # The journal is truncated after the commit: entries up to this position must not be replayed after a crash in between.
+        if self._journal is not None and len(self._journal) > 0:
+            self._luceneStore.setCommitValue(_JOURNAL_POSITION, '%s:%s' % (self._journal.id(), len(self._journal)))
+
     def _getData(self, identifier):
+        t0 = time()
         byteArray = self._luceneStore.getData(identifier)
+        self._readLatency.record(time() - t0)
         return _toBytes(byteArray)
 
+    def _getDataMultiple(self, identifiers):
+        t0 = time()
+        found = self._luceneStore.getDataMultiple(JArray('string')(identifiers))
+        self._readLatency.record((time() - t0) / len(identifiers))
+        return [_toBytes(data) for data in found]
+
+    def _getReadExecutor(self):
+        if self._readExecutor is None:
+            self._readExecutor = readExecutor(_DEFAULT_READ_THREADS)
+        return self._readExecutor
+
+    def _merge(self, merge, *args):
+        doWait = args[-1]
+        try:
+            merge(*args)
+            if doWait:
+                self.commit()
+        except JavaError as e:
+            original = e.getJavaException()
+            if original.getClass().getName() == 'IOException':
+                raise IOError(original.getMessage())
+            raise
+        finally:
+            self._segments = None
+
     def _maybeCommit(self):
         if len(self._latestModifications) > self._maxModifications:
-            self.commit()
+            if self._journal is None or len(self._journal) > self._maxJournalModifications:
+                self.commit()
+            else:
+                self._reopen()  # modifications are durable through the journal; a Lucene commit can wait
+        if self._memoryBudget is not None:
+            self._memoryBudget.written(self)
+
+    def _openJournal(self, journal):
+        journalFile = join(self._directory, "sequentialstorage.journal")
+        if not (journal or isfile(journalFile)):
+            return
+        self._journal = Journal(journalFile)
+        journalId, committedEntries = (self._luceneStore.getCommitValue(_JOURNAL_POSITION) or ':0').split(':')
+        replayed = False
+        for identifier, data in self._journal.replay(skipEntries=int(committedEntries) if journalId == self._journal.id() else 0):
+            if data is None:
+                self._tombstones.add(self._luceneStore.delete(identifier), identifier)
+            else:
+                self._luceneStore.add(identifier, BytesRef(JArray('byte')(data)))
+            replayed = True
+        if replayed:
+            self._setCommitValues()
+            self._tombstones.flush()
+            self._luceneStore.commit()
+            self._luceneStore.reopen()
+        self._journal.truncate()
+        if not journal:
+            self._journal.close()
+            self._journal = None
+            remove(journalFile)
 
     def _reopen(self):
-        self._luceneStore.reopen()
-        self._latestModifications.clear()
+        t0 = time()
+        with self._modificationsLock:
+            self._luceneStore.reopen()
+            self._latestModifications.clear()
+            self._pendingBytes = 0
+        self._lastReopenDuration = time() - t0
 
     def _versionFormatCheck(self):
         versionFile = join(self._directory, "sequentialstorage.version")
         if isdir(self._directory):
             if isfile(versionFile):
                 with open(versionFile) as fp:
-                    assert fp.read() == self.version, "The SequentialStorage at %s needs to be converted to the current version." % self._directory
+                    assert fp.read() == self.version, "The SequentialStorage at %s needs to be converted to the current version: export it with the release that wrote it and import the export with this one." % self._directory
             else:
                 assert (listdir(self._directory) == []), "The %s directory is already in use for something other than a SequentialStorage." % self._directory
         else:
@@ -182,9 +698,72 @@ class SequentialStorage(object):
             f.write(self.version)
 
 
+class CommittedReader(object):
+    """Read-only view of the last commit of a SequentialStorage directory. Opens no writer (and takes no write lock), so it
+    is only up to date for a storage that is closed."""
+
+    def __init__(self, directory):
+        self._storeReader = StoreReader(directory)
+
+    def existsMany(self, identifiers):
+        return list(self._storeReader.existsMultiple(JArray('string')([str(identifier) for identifier in identifiers])))
+
+    def iteritems(self):
+        return ((item.identifier, _toBytes(item.data)) for item in self._storeReader.iteritems())
+
+    def close(self):
+        self._storeReader.close()
+
+
 _DEFAULT_MAX_MODIFICATIONS = 10000
+_DEFAULT_RAM_BUFFER_MB = 256.0  # as configured in StoreLucene
+_DEFAULT_MAX_JOURNAL_MODIFICATIONS = 100 * _DEFAULT_MAX_MODIFICATIONS
+_DEFAULT_READ_THREADS = 4
+_BULKLOAD_BATCH_SIZE = 1000
+_BULKLOAD_PREFIX = 'bulkload-'
 _DELETED_RECORD = object()
+_DIRECTORY_TYPES = [None, 'mmap', 'nio']
+_IMPORTED_KEY = 'importedKey'
+_IMPORT_PROGRESS = 'importProgress'
+_JOURNAL_POSITION = 'journalPosition'
+_NEWEST_KEY = 'newestKey'
+_SUMMED_STATS = ['numDocs', 'deletedDocs', 'segmentCount', 'sizeInBytes', 'pendingModifications', 'pendingBytes', 'ramBufferBytes', 'mergingSegments', 'mergeCount', 'mergedBytes', 'readCount']  # stats that add up over parts and shards
+
+def _warmup(luceneStore):
+    getVMEnv().attachCurrentThread()
+    luceneStore.warmup()
+
+def committedStats(directory):
+    """The stats of a SequentialStorage directory that its last commit tells, without opening it: numDocs, deletedDocs,
+    segmentCount, segments and sizeInBytes. Only up to date for a storage that is closed."""
+    segments = _segmentDicts(StoreReader.segmentStats(directory))
+    deletedDocs = sum(segment['delCount'] for segment in segments)
+    return dict(
+        numDocs=sum(segment['maxDoc'] for segment in segments) - deletedDocs,
+        deletedDocs=deletedDocs,
+        segmentCount=len(segments),
+        segments=segments,
+        sizeInBytes=sum(segment['sizeInBytes'] for segment in segments),
+    )
+
+def snapshotCommitted(directory, targetDirectory):
+    "Like SequentialStorage.snapshot, for a directory that is not open: a copy of its last commit, made without opening it."
+    result = copySnapshot(directory, targetDirectory, list(StoreReader.commitFiles(directory)))
+    _copyTombstones(directory, targetDirectory, StoreReader.commitValue(directory, _NEWEST_KEY))
+    with open(join(targetDirectory, "sequentialstorage.version"), 'w') as f:
+        f.write(SequentialStorage.version)
+    return result
+
+def _copyTombstones(directory, targetDirectory, newestKey):
+    # Only the deletes up to the newest key of the copied commit: later ones are not part of it.
+    copyTombstones(join(directory, "sequentialstorage.tombstones"), join(targetDirectory, "sequentialstorage.tombstones"), untilKey=None if newestKey is None else int(newestKey))
+
+def readExecutor(threads):
+    "A bounded pool of threads attached to the JVM, for the asynchronous reads of one or more storages."
+    return ThreadPoolExecutor(max_workers=threads, thread_name_prefix='SequentialStorageRead', initializer=_attachCurrentThread)
 
-def _toBytes(bytesRef):
-    return None if bytesRef is None else bytes([i & 0xff for i in bytesRef.bytes])
+def _attachCurrentThread():
+    getVMEnv().attachCurrentThread()
 
+def _segmentDicts(segmentStats):
+    return [dict(name=segment.name, maxDoc=segment.maxDoc, delCount=segment.delCount, sizeInBytes=segment.sizeInBytes) for segment in segmentStats]
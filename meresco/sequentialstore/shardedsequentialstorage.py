@@ -0,0 +1,240 @@
+## begin license ##
+#
+# "Meresco SequentialStore" contains components facilitating efficient sequentially ordered storing and retrieval.
+#
+# Copyright (C) 2026 Seecr (Seek You Too B.V.) https://seecr.nl
+#
+# This file is part of "Meresco SequentialStore"
+#
+# "Meresco SequentialStore" is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# "Meresco SequentialStore" is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with "Meresco SequentialStore"; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+#
+## end license ##
+
+
+from asyncio import gather
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
+from json import dumps, loads
+from os import listdir
+from os.path import isdir, isfile, join
+from zlib import crc32
+
+from .sequentialstorage import SequentialStorage, CommittedReader, _attachCurrentThread, _SUMMED_STATS
+
+
+class ShardedSequentialStorage(object):
+    """The SequentialStorage API over a fixed number of SequentialStorages (shards), one per directory, possibly on
+    different volumes. Identifiers are routed by crc32. Operations on all shards (commit, close, getMany, __len__,
+    stats) run concurrently in threads threads; iteration goes shard by shard (see iteritemsPartitioned).
+
+    Sequence keys are per shard, so changesSince, export and replication work on the shards individually (see shards).
+    Use reshard to change the number of shards."""
+
+    def __init__(self, directories, threads=None, **kwargs):
+        "kwargs are passed on to each SequentialStorage."
+        for i, directory in enumerate(directories):
+            _checkShardFile(directory, i, len(directories))
+        self._shards = [SequentialStorage(directory, **kwargs) for directory in directories]
+        for i, directory in enumerate(directories):
+            with open(join(directory, "sequentialstorage.shard"), 'w') as fp:
+                fp.write(dumps(dict(shard=i, shards=len(directories)), sort_keys=True))
+        self._executor = ThreadPoolExecutor(max_workers=threads or len(directories), initializer=_attachCurrentThread)
+
+    def shards(self):
+        return list(self._shards)
+
+    def add(self, identifier, data):
+        self._shardFor(identifier).add(identifier, data)
+
+    __setitem__ = add
+
+    def addMultiple(self, items):
+        batches = [[] for shard in self._shards]
+        for identifier, data in items:
+            batches[self._shardIndex(identifier)].append((identifier, data))
+        for shard, batch in zip(self._shards, batches):
+            if batch:
+                shard.addMultiple(batch)
+
+    def delete(self, identifier):
+        self._shardFor(identifier).delete(identifier)
+
+    __delitem__ = delete
+
+    def __getitem__(self, identifier):
+        return self._shardFor(identifier)[identifier]
+
+    def __contains__(self, identifier):
+        return identifier in self._shardFor(identifier)
+
+    exists = __contains__
+
+    def existsMany(self, identifiers):
+        return self._perShard(identifiers, lambda shard, identifiers: shard.existsMany(identifiers))
+
+    def get(self, identifier, default=None):
+        return self._shardFor(identifier).get(identifier, default)
+
+    def getMultiple(self, identifiers, ignoreMissing=False):
+        for identifier in identifiers:
+            identifier = str(identifier)
+            try:
+                data = self[identifier]
+            except KeyError:
+                if ignoreMissing:
+                    continue
+                raise
+            yield identifier, data
+
+    def getMany(self, identifiers):
+        "The data for each identifier, None when missing; looked up in one batch per shard, concurrently."
+        return self._perShard(identifiers, lambda shard, identifiers: shard.getMany(identifiers))
+
+    def openRecord(self, identifier):
+        return self._shardFor(identifier).openRecord(identifier)
+
+    async def aget(self, identifier, default=None):
+        return await self._shardFor(identifier).aget(identifier, default)
+
+    def submitGet(self, identifier):
+        return self._shardFor(identifier).submitGet(identifier)
+
+    async def agetMultiple(self, identifiers, ignoreMissing=False):
+        "Like SequentialStorage.agetMultiple, with one batch per shard, concurrently."
+        identifiers = [str(identifier) for identifier in identifiers]
+        batches = [[] for shard in self._shards]
+        for identifier in identifiers:
+            batches[self._shardIndex(identifier)].append(identifier)
+        found = {}
+        for items in await gather(*(shard.agetMultiple(batch, ignoreMissing=True) for shard, batch in zip(self._shards, batches) if batch)):
+            found.update(items)
+        if not ignoreMissing:
+            for identifier in identifiers:
+                if identifier not in found:
+                    raise KeyError(identifier)
+        return [(identifier, found[identifier]) for identifier in identifiers if identifier in found]
+
+    def getRange(self, identifier, offset, length):
+        return self._shardFor(identifier).getRange(identifier, offset, length)
+
+    def __len__(self):
+        return sum(self._forAll(len))
+
+    def iterkeys(self):
+        return chain.from_iterable(shard.iterkeys() for shard in self._shards)
+
+    __iter__ = iterkeys
+
+    def iteritems(self):
+        return chain.from_iterable(shard.iteritems() for shard in self._shards)
+
+    def itervalues(self):
+        return chain.from_iterable(shard.itervalues() for shard in self._shards)
+
+    def iteritemsPartitioned(self, count=None):
+        "Per shard (or count partitions per shard) an iterator, which may be consumed concurrently (from JVM attached threads)."
+        return [items for shard in self._shards for items in shard.iteritemsPartitioned(count or 1)]
+
+    def commit(self):
+        self._forAll(lambda shard: shard.commit())
+
+    def close(self):
+        if self._executor is None:
+            return
+        self._forAll(lambda shard: shard.close())
+        self._executor.shutdown()
+        self._executor = None
+
+    def gc(self, maxNumSegments=1, doWait=False, checkDiskSpace=True):
+        "Returns the merge plan per shard."
+        return self._forAll(lambda shard: shard.gc(maxNumSegments=maxNumSegments, doWait=doWait, checkDiskSpace=checkDiskSpace))
+
+    def stats(self):
+        shards = self._forAll(lambda shard: shard.stats())
+        result = dict((key, sum(stats[key] for stats in shards)) for key in _SUMMED_STATS)
+        result['shards'] = shards
+        return result
+
+    def getSizeOnDisk(self):
+        return sum(shard.getSizeOnDisk() for shard in self._shards)
+
+    def _shardIndex(self, identifier):
+        return shardIndex(identifier, len(self._shards))
+
+    def _shardFor(self, identifier):
+        return self._shards[self._shardIndex(identifier)]
+
+    def _perShard(self, identifiers, lookup):
+        identifiers = [str(identifier) for identifier in identifiers]
+        positions = [[] for shard in self._shards]
+        for i, identifier in enumerate(identifiers):
+            positions[self._shardIndex(identifier)].append(i)
+        result = [None] * len(identifiers)
+        lookups = [(shard, indices) for shard, indices in zip(self._shards, positions) if indices]
+        for indices, values in self._executor.map(lambda item: (item[1], lookup(item[0], [identifiers[i] for i in item[1]])), lookups):
+            for i, value in zip(indices, values):
+                result[i] = value
+        return result
+
+    def _forAll(self, operation):
+        return list(self._executor.map(operation, self._shards))
+
+
+def shardIndex(identifier, shardCount):
+    return crc32(str(identifier).encode()) % shardCount
+
+def reshard(sourceDirectories, targetDirectories, batchSize=1000, progress=None):
+    """Copies the records of the sharded store in sourceDirectories to a new one in targetDirectories, with a different
+    number of shards: one scan per source shard, routed in batches to the batched add of the target shards. The source
+    is only read, as of its last commit (see CommittedReader): close it first, or modifications not committed yet are
+    not copied. The target directories must be empty or not exist yet. progress, if given, is called with the number of records copied after every source shard."""
+    for i, directory in enumerate(sourceDirectories):
+        if not isdir(directory):
+            raise ValueError("Source shard %s does not exist." % directory)
+        _checkShardFile(directory, i, len(sourceDirectories))
+    for directory in targetDirectories:
+        if isdir(directory) and listdir(directory) != []:
+            raise ValueError("Target shard %s is not empty." % directory)
+    target = ShardedSequentialStorage(targetDirectories)
+    try:
+        count = 0
+        for directory in sourceDirectories:
+            shard = CommittedReader(directory)
+            try:
+                batch = []
+                for item in shard.iteritems():
+                    batch.append(item)
+                    if len(batch) >= batchSize:
+                        target.addMultiple(batch)
+                        count += len(batch)
+                        batch = []
+                target.addMultiple(batch)
+                count += len(batch)
+            finally:
+                shard.close()
+            if progress is not None:
+                progress(count)
+        target.commit()
+        return count
+    finally:
+        target.close()
+
+
+def _checkShardFile(directory, shard, shards):
+    shardFile = join(directory, "sequentialstorage.shard")
+    if isfile(shardFile):
+        with open(shardFile) as fp:
+            found = loads(fp.read())
+        assert found == dict(shard=shard, shards=shards), "The SequentialStorage at %s is shard %s of %s, not %s of %s." % (directory, found['shard'], found['shards'], shard, shards)
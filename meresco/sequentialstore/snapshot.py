@@ -0,0 +1,78 @@
+## begin license ##
+#
+# "Meresco SequentialStore" contains components facilitating efficient sequentially ordered storing and retrieval.
+#
+# Copyright (C) 2026 Seecr (Seek You Too B.V.) https://seecr.nl
+#
+# This file is part of "Meresco SequentialStore"
+#
+# "Meresco SequentialStore" is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# "Meresco SequentialStore" is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with "Meresco SequentialStore"; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+#
+## end license ##
+
+from errno import EXDEV
+from io import SEEK_END
+from os import link, listdir, makedirs, remove, rename
+from os.path import join, isdir, isfile, getsize
+from shutil import copyfile
+
+
+def copySnapshot(sourceDirectory, targetDirectory, filenames):
+    """Makes targetDirectory hold exactly filenames from sourceDirectory. Lucene never changes a file once written, so
+    files already present with the same size and the same checksum in the codec footer are kept; others are hard
+    linked, or copied when on another file system.
+    The segments_N file, which makes the new files a valid index, is placed last."""
+    isdir(targetDirectory) or makedirs(targetDirectory)
+    result = dict(linked=0, copied=0, skipped=0, removed=0)
+    for filename in sorted(filenames, key=lambda filename: filename.startswith('segments')):
+        source = join(sourceDirectory, filename)
+        target = join(targetDirectory, filename)
+        if isfile(target) and getsize(target) == getsize(source) and _codecFooter(target) == _codecFooter(source) is not None:
+            result['skipped'] += 1
+            continue
+        result[_linkOrCopy(source, target)] += 1
+    for filename in set(listdir(targetDirectory)) - set(filenames) - set(_KEEP):
+        remove(join(targetDirectory, filename))
+        result['removed'] += 1
+    return result
+
+def _codecFooter(path):
+    "The footer Lucene ends each file with: magic, checksum algorithm and the checksum of the content; None if absent."
+    with open(path, 'rb') as fp:
+        fp.seek(0, SEEK_END)
+        if fp.tell() < _FOOTER_LENGTH:
+            return None
+        fp.seek(-_FOOTER_LENGTH, SEEK_END)
+        footer = fp.read(_FOOTER_LENGTH)
+    return footer if footer.startswith(_FOOTER_MAGIC) else None
+
+def _linkOrCopy(source, target):
+    tmpTarget = target + '.tmp'
+    isfile(tmpTarget) and remove(tmpTarget)
+    try:
+        link(source, tmpTarget)
+        how = 'linked'
+    except OSError as e:
+        if e.errno != EXDEV:
+            raise
+        copyfile(source, tmpTarget)
+        how = 'copied'
+    rename(tmpTarget, target)
+    return how
+
+
+_KEEP = ['sequentialstorage.version', 'sequentialstorage.tombstones']
+_FOOTER_MAGIC = b'\xc0\x28\x93\xe8'  # CodecUtil.FOOTER_MAGIC, big endian
+_FOOTER_LENGTH = 16  # magic, algorithm id (int) and checksum (long)
@@ -28,29 +28,54 @@
 ## end license ##
 
 
-from io import BytesIO
-
 from .adddeletetomultisequential import AddDeleteToMultiSequential
+from .reactorfutures import ReactorFutures
 
 
 class StorageComponentAdapter(AddDeleteToMultiSequential):
-    """Provided for 'backwards' compatibility to allow MultiSequentialStorage to be accessed by older components (in Meresco DNA)."""
+    """Provided for 'backwards' compatibility to allow MultiSequentialStorage to be accessed by older components (in Meresco DNA).
+    With reactor, yieldRecord suspends while the record is looked up on the read threads of MultiSequentialStorage,
+    instead of blocking the reactor on a cold read. See AddDeleteToMultiSequential for batching (kwargs)."""
+
+    def __init__(self, reactor=None, **kwargs):
+        AddDeleteToMultiSequential.__init__(self, reactor=reactor, **kwargs)
+        self._futures = None if reactor is None else ReactorFutures(reactor)
 
     def deletePart(self, identifier, partname):
-        self.call.deleteData(identifier=identifier, name=partname)
+        "Raises KeyError for an unknown part, also when batched (where a part to be created by pending adds is known)."
+        if self._batchSize is None:
+            self.call.deleteData(identifier=identifier, name=partname)
+            return
+        if self.call.hasPart(name=partname):
+            self._pending(partname)[identifier] = None
+        else:
+            changes = self._parts.get(partname)
+            if not changes:
+                raise KeyError(partname)
+            changes.pop(identifier, None)  # nothing to delete downstream yet, only the pending add
+        self._added()
 
     def isAvailable(self, identifier, partname):
-        try:
-            self.call.getData(identifier=identifier, name=partname)
-            return True, True
-        except KeyError:
-            return False, False
+        self._flushPending()
+        available = self.call.hasData(identifier=identifier, name=partname)
+        return available, available
 
     def getStream(self, identifier, partname):
-        return BytesIO(self.call.getData(identifier=identifier, name=partname))
+        self._flushPending()
+        return self.call.openRecord(identifier=identifier, name=partname)
 
     def yieldRecord(self, identifier, partname):
+        self._flushPending()
+        if self._futures is None:
+            try:
+                yield self.call.getData(identifier=identifier, name=partname)
+            except KeyError:
+                pass
+            return
         try:
-            yield self.call.getData(identifier=identifier, name=partname)
+            future = self.call.submitGetData(identifier=identifier, name=partname)
         except KeyError:
-            pass
+            return
+        data = yield self._futures.waitFor(future)
+        if data is not None:
+            yield data
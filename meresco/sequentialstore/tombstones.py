@@ -0,0 +1,156 @@
+## begin license ##
+#
+# "Meresco SequentialStore" contains components facilitating efficient sequentially ordered storing and retrieval.
+#
+# Copyright (C) 2026 Seecr (Seek You Too B.V.) https://seecr.nl
+#
+# This file is part of "Meresco SequentialStore"
+#
+# "Meresco SequentialStore" is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# "Meresco SequentialStore" is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with "Meresco SequentialStore"; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+#
+## end license ##
+
+
+from array import array
+from bisect import bisect_right
+from os import fsync, rename
+from os.path import isfile
+from struct import Struct, error as StructError
+
+
+class Tombstones(object):
+    """Append-only log of deletes as (key, identifier), in key order, so incremental exports can pass deletes on.
+
+    Written through on delete, fsync'ed by flush (on commit). A torn tail (from a crash) is cut off on opening, and so
+    are the deletes after untilKey, the newest key of the last commit: deletes not committed were lost with the crash.
+    The key and file offset of every INDEX_INTERVAL-th delete are kept in memory, so since seeks close to the first
+    delete asked for instead of reading the file from the start.
+
+    The log only shrinks by prune; see SequentialStorage.pruneTombstones."""
+
+    def __init__(self, path, untilKey=None):
+        self._path = path
+        self._newestKey = 0
+        self._count = 0
+        self._length = 0
+        self._indexKeys = array('Q')
+        self._indexOffsets = array('Q')
+        if isfile(path):
+            with open(path, 'rb') as fp:
+                for key, identifier in _readEntries(fp):
+                    if untilKey is not None and key > untilKey:
+                        break
+                    self._indexed(key, self._length)
+                    self._length = fp.tell()
+        self._file = open(path, 'ab')
+        if self._file.tell() != self._length:
+            self._file.truncate(self._length)
+
+    def __len__(self):
+        return self._count
+
+    def newestKey(self):
+        return self._newestKey
+
+    def add(self, key, identifier):
+        bIdentifier = identifier.encode()
+        entry = _HEADER.pack(key, len(bIdentifier)) + bIdentifier
+        self._file.write(entry)
+        self._indexed(key, self._length)
+        self._length += len(entry)
+
+    def since(self, sinceKey):
+        "Yields (key, identifier) for the deletes with a key newer than sinceKey."
+        self._file.flush()
+        position = bisect_right(self._indexKeys, sinceKey) - 1
+        with open(self._path, 'rb') as fp:
+            if position >= 0:
+                fp.seek(self._indexOffsets[position])
+            for key, identifier in _readEntries(fp):
+                if key > sinceKey:
+                    yield key, identifier
+
+    def prune(self, untilKey):
+        "Forgets the deletes up to and including untilKey; incremental exports since an older key are no longer possible."
+        tmpPath = self._path + '.tmp'
+        with open(tmpPath, 'wb') as tmp:
+            for key, identifier in self.since(untilKey):
+                bIdentifier = identifier.encode()
+                tmp.write(_HEADER.pack(key, len(bIdentifier)) + bIdentifier)
+            tmp.flush()
+            fsync(tmp.fileno())
+        self._file.close()
+        rename(tmpPath, self._path)
+        newestKey = self._newestKey
+        self._count = self._length = 0
+        del self._indexKeys[:]
+        del self._indexOffsets[:]
+        with open(self._path, 'rb') as fp:
+            for key, identifier in _readEntries(fp):
+                self._indexed(key, self._length)
+                self._length = fp.tell()
+        self._newestKey = newestKey
+        self._file = open(self._path, 'ab')
+
+    def flush(self):
+        self._file.flush()
+        fsync(self._file.fileno())
+
+    def close(self):
+        if self._file is None:
+            return
+        self.flush()
+        self._file.close()
+        self._file = None
+
+    def _indexed(self, key, offset):
+        if self._count % INDEX_INTERVAL == 0:
+            self._indexKeys.append(key)
+            self._indexOffsets.append(offset)
+        self._newestKey = key
+        self._count += 1
+
+
+def copyTombstones(path, targetPath, untilKey=None):
+    "Copies the deletes up to and including untilKey (all if None) of the tombstones file at path to targetPath."
+    with open(path, 'rb') as fp:
+        length = 0
+        for key, identifier in _readEntries(fp):
+            if untilKey is not None and key > untilKey:
+                break
+            length = fp.tell()
+        fp.seek(0)
+        with open(targetPath, 'wb') as target:
+            while length > 0:
+                chunk = fp.read(min(length, _COPY_CHUNK_SIZE))
+                target.write(chunk)
+                length -= len(chunk)
+
+def _readEntries(fp):
+    while True:
+        header = fp.read(_HEADER.size)
+        try:
+            key, identifierLength = _HEADER.unpack(header)
+        except StructError:
+            return
+        bIdentifier = fp.read(identifierLength)
+        if len(bIdentifier) != identifierLength:
+            return
+        yield key, bIdentifier.decode()
+
+
+INDEX_INTERVAL = 256
+_HEADER = Struct('>QI')
+_COPY_CHUNK_SIZE = 1024 * 1024
@@ -0,0 +1,75 @@
+## begin license ##
+#
+# "Meresco SequentialStore" contains components facilitating efficient sequentially ordered storing and retrieval.
+#
+# Copyright (C) 2026 Seecr (Seek You Too B.V.) https://seecr.nl
+#
+# This file is part of "Meresco SequentialStore"
+#
+# "Meresco SequentialStore" is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# "Meresco SequentialStore" is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with "Meresco SequentialStore"; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+#
+## end license ##
+
+
+from struct import Struct
+from zlib import crc32, decompress, error as ZlibError
+
+# The blocks of export format version 2 (see meresco.sequentialstore.export.Export). Kept outside the package
+# meresco.sequentialstore, which needs a JVM to be imported: the worker processes of an import import only this module.
+
+
+def readBlock(pathOffsetAndChecksum):
+    "Returns (bytes read, records) for the block at offset; raises ValueError for a corrupt block."
+    path, offset, checksum = pathOffsetAndChecksum
+    with open(path, 'rb') as fp:
+        fp.seek(offset)
+        length, count = BLOCK_HEADER.unpack(fp.read(BLOCK_HEADER.size))
+        compressed = fp.read(length)
+        blockBytes = BLOCK_HEADER.size + length
+        if checksum:
+            expected = fp.read(BLOCK_CHECKSUM.size)
+            blockBytes += BLOCK_CHECKSUM.size
+            if len(expected) != BLOCK_CHECKSUM.size or BLOCK_CHECKSUM.unpack(expected)[0] != crc32(compressed):
+                raise ValueError("Checksum mismatch in block at offset %s of %s." % (offset, path))
+    try:
+        records = parseBlock(compressed)
+    except ZlibError:
+        raise ValueError("Corrupt block at offset %s of %s." % (offset, path))
+    if len(records) != count:
+        raise ValueError("Corrupt block at offset %s of %s." % (offset, path))
+    return blockBytes, records
+
+def parseBlock(compressed):
+    "Returns the (type, identifier, data) records of a compressed block."
+    block = decompress(compressed)
+    records = []
+    offset = 0
+    while offset < len(block):
+        recordType, identifierLength, dataLength = RECORD_HEADER.unpack_from(block, offset)
+        offset += RECORD_HEADER.size
+        identifier = block[offset:offset + identifierLength].decode()
+        offset += identifierLength
+        records.append((recordType, identifier, block[offset:offset + dataLength]))
+        offset += dataLength
+    return records
+
+
+RECORD = 0
+TOMBSTONE = 1
+RECORD_HEADER = Struct('>BII')
+BLOCK_HEADER = Struct('>II')
+BLOCK_CHECKSUM = Struct('>I')
+INDEX_ENTRY = Struct('>QI')
+TRAILER = Struct('>QQ')
@@ -0,0 +1,51 @@
+/* begin license *
+ *
+ * "Meresco SequentialStore" contains components facilitating efficient sequentially ordered storing and retrieval.
+ *
+ * Copyright (C) 2026 Seecr (Seek You Too B.V.) https://seecr.nl
+ *
+ * This file is part of "Meresco SequentialStore"
+ *
+ * "Meresco SequentialStore" is free software; you can redistribute it and/or modify
+ * it under the terms of the GNU General Public License as published by
+ * the Free Software Foundation; either version 2 of the License, or
+ * (at your option) any later version.
+ *
+ * "Meresco SequentialStore" is distributed in the hope that it will be useful,
+ * but WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ * GNU General Public License for more details.
+ *
+ * You should have received a copy of the GNU General Public License
+ * along with "Meresco SequentialStore"; if not, write to the Free Software
+ * Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+ *
+ * end license */
+
+package org.meresco.sequentialstore;
+
+import java.util.Arrays;
+
+import org.apache.lucene.util.BytesRef;
+
+
+public class RecordReader {
+    // Holds the data of one record in the JVM (loaded as a whole, like any stored field), so Python can read it in
+    // ranges instead of as a whole.
+    private BytesRef data;
+
+    RecordReader(BytesRef data) {
+        this.data = data;
+    }
+
+    public int length() {
+        return this.data.length;
+    }
+
+    public BytesRef read(long offset, int length) {
+        // A copy of at most length bytes from offset; empty at the end.
+        int start = (int) Math.min(Math.max(offset, 0), this.data.length);
+        int end = (int) Math.min((long) start + Math.max(length, 0), this.data.length);
+        return new BytesRef(Arrays.copyOfRange(this.data.bytes, this.data.offset + start, this.data.offset + end));
+    }
+}
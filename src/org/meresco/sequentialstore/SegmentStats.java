@@ -0,0 +1,40 @@
+/* begin license *
+ *
+ * "Meresco SequentialStore" contains components facilitating efficient sequentially ordered storing and retrieval.
+ *
+ * Copyright (C) 2026 Seecr (Seek You Too B.V.) https://seecr.nl
+ *
+ * This file is part of "Meresco SequentialStore"
+ *
+ * "Meresco SequentialStore" is free software; you can redistribute it and/or modify
+ * it under the terms of the GNU General Public License as published by
+ * the Free Software Foundation; either version 2 of the License, or
+ * (at your option) any later version.
+ *
+ * "Meresco SequentialStore" is distributed in the hope that it will be useful,
+ * but WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ * GNU General Public License for more details.
+ *
+ * You should have received a copy of the GNU General Public License
+ * along with "Meresco SequentialStore"; if not, write to the Free Software
+ * Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+ *
+ * end license */
+
+package org.meresco.sequentialstore;
+
+
+public class SegmentStats {
+    public String name;
+    public int maxDoc;
+    public int delCount;
+    public long sizeInBytes;
+
+    SegmentStats(String name, int maxDoc, int delCount, long sizeInBytes) {
+        this.name = name;
+        this.maxDoc = maxDoc;
+        this.delCount = delCount;
+        this.sizeInBytes = sizeInBytes;
+    }
+}
@@ -26,29 +26,50 @@
 package org.meresco.sequentialstore;
 
 import java.io.IOException;
+import java.nio.file.Path;
 import java.nio.file.Paths;
+import java.util.ArrayList;
 import java.util.Arrays;
 import java.util.Base64;
+import java.util.Collections;
 import java.util.ConcurrentModificationException;
+import java.util.HashMap;
+import java.util.Iterator;
 import java.util.List;
+import java.util.Map;
+import java.util.PriorityQueue;
+import java.util.Set;
+import java.util.TreeSet;
 
-import org.apache.lucene.document.BinaryDocValuesField;
 import org.apache.lucene.document.Document;
 import org.apache.lucene.document.Field;
 import org.apache.lucene.document.FieldType;
 import org.apache.lucene.document.NumericDocValuesField;
-import org.apache.lucene.document.StoredField;
+import org.apache.lucene.document.SortedDocValuesField;
 import org.apache.lucene.document.StringField;
-import org.apache.lucene.index.BinaryDocValues;
 import org.apache.lucene.index.DirectoryReader;
+import org.apache.lucene.index.IndexCommit;
+import org.apache.lucene.index.IndexNotFoundException;
 import org.apache.lucene.index.IndexOptions;
 import org.apache.lucene.index.IndexWriter;
 import org.apache.lucene.index.IndexWriterConfig;
+import org.apache.lucene.index.KeepOnlyLastCommitDeletionPolicy;
+import org.apache.lucene.index.LeafReader;
 import org.apache.lucene.index.LeafReaderContext;
 import org.apache.lucene.index.MultiBits;
+import org.apache.lucene.index.MultiTerms;
+import org.apache.lucene.index.NumericDocValues;
+import org.apache.lucene.index.PostingsEnum;
 import org.apache.lucene.index.ReaderUtil;
+import org.apache.lucene.index.SegmentCommitInfo;
+import org.apache.lucene.index.SegmentInfos;
+import org.apache.lucene.index.SnapshotDeletionPolicy;
+import org.apache.lucene.index.SortedDocValues;
 import org.apache.lucene.index.Term;
+import org.apache.lucene.index.Terms;
+import org.apache.lucene.index.TermsEnum;
 import org.apache.lucene.index.TieredMergePolicy;
+import org.apache.lucene.search.DocIdSetIterator;
 import org.apache.lucene.search.IndexSearcher;
 import org.apache.lucene.search.Sort;
 import org.apache.lucene.search.SortField;
@@ -57,24 +78,30 @@ import org.apache.lucene.search.TopDocs;
 import org.apache.lucene.store.AlreadyClosedException;
 import org.apache.lucene.store.Directory;
 import org.apache.lucene.store.FSDirectory;
+import org.apache.lucene.store.MMapDirectory;
+import org.apache.lucene.store.NIOFSDirectory;
 import org.apache.lucene.util.Bits;
 import org.apache.lucene.util.BytesRef;
 
 
 public class StoreLucene {
-    private DirectoryReader reader;
+    private Directory directory;
+    private ThrottledMergeScheduler mergeScheduler;
+    private SnapshotDeletionPolicy snapshotDeletionPolicy;
+    // The current reader; read paths take a reference to it (acquireReader), reopen replaces it and then releases the old one.
+    private volatile DirectoryReader reader;
+    private volatile DirectoryReader committedReader;
     private IndexWriter writer;
-    private IndexSearcher searcher;
     private long newestKey = 0;
     private LeafReaderContext currentReaderContext;
-    private BinaryDocValues dataBinaryDocValues;
 
     private StringField _identifierField;
-    private BinaryDocValuesField _identifierDocValueField;
-    private StoredField _storedKeyField;
+    private SortedDocValuesField _identifierDocValuesField;
     private NumericDocValuesField _numericKeyField;
     private Field _dataField;
+    private StringField _partField;
     private Document _doc;
+    private Document _partDoc;
 
     private static FieldType UNINDEXED_TYPE = new FieldType();
     {
@@ -83,15 +110,25 @@ public class StoreLucene {
         UNINDEXED_TYPE.setTokenized(false);
     }
 
+    // Schema version 6: the identifier is indexed (for lookups) and kept as sorted docvalues; the key only exists as
+    // numeric docvalues; only the data is stored. Version 5 had the identifier as binary docvalues and the key stored too.
+    // The docvalues copy of the identifier is needed because iteration and the changes since a key go in key (document)
+    // order and need the identifier of each document: the terms dictionary only leads from identifier to document, so it
+    // could only be inverted by holding all identifiers of a segment in memory. Sorted docvalues keep each identifier of
+    // a segment once, prefix compressed, plus an ordinal per document.
     private static String _IDENTIFIER_FIELD = "identifier";
-    private static String _IDENTIFIER_DOC_VALUE_FIELD = "identifier";
-    private static String _KEY_FIELD = "key";
     private static String _NUMERIC_KEY_FIELD = "key";
     private static String _DATA_FIELD = "data";
+    private static String _PART_FIELD = "part";  // optional, indexed only; see MultiSequentialStorage with a shared index
+    private static Set<String> _DATA_ONLY = Collections.singleton(_DATA_FIELD);
 
 
     public StoreLucene(String path) throws IOException {
-        Directory directory = FSDirectory.open(Paths.get(path));
+        this(path, "default", false);
+    }
+
+    public StoreLucene(String path, String directoryType, boolean preload) throws IOException {
+        this.directory = openDirectory(Paths.get(path), directoryType, preload);
         IndexWriterConfig config = new IndexWriterConfig();
         config.setRAMBufferSizeMB(256.0); // faster
         config.setUseCompoundFile(false); // faster, for Lucene 4.4 and later
@@ -103,39 +140,128 @@ public class StoreLucene {
         // tieredMergePolicy.setReclaimDeletesWeight(2.8f);
         // end experiments 2018-09-21 to garbage collect more aggressively
 
+        this.mergeScheduler = new ThrottledMergeScheduler();
+        config.setMergeScheduler(this.mergeScheduler);
+        this.snapshotDeletionPolicy = new SnapshotDeletionPolicy(new KeepOnlyLastCommitDeletionPolicy());
+        config.setIndexDeletionPolicy(this.snapshotDeletionPolicy);
+
         config.setIndexSort(new Sort(new SortField(_NUMERIC_KEY_FIELD, SortField.Type.LONG)));
-        this.writer = new IndexWriter(directory, config);
+        this.writer = new IndexWriter(this.directory, config);
         this.reader = DirectoryReader.open(this.writer, false, false);
-        this.searcher = new IndexSearcher(this.reader);
 
         this.newestKey = newestKeyFromIndex();
 
         this._identifierField = new StringField(_IDENTIFIER_FIELD, "", Field.Store.NO);
-        this._identifierDocValueField = new BinaryDocValuesField(_IDENTIFIER_DOC_VALUE_FIELD, new BytesRef());
-        this._storedKeyField = new StoredField(_KEY_FIELD, 0L);
+        this._identifierDocValuesField = new SortedDocValuesField(_IDENTIFIER_FIELD, new BytesRef());
         this._numericKeyField = new NumericDocValuesField(_NUMERIC_KEY_FIELD, 0L);
         this._dataField = new Field(_DATA_FIELD, new BytesRef(), UNINDEXED_TYPE);
         this._doc = new Document();
         this._doc.add(this._identifierField);
-        this._doc.add(this._identifierDocValueField);
-        this._doc.add(this._storedKeyField);
+        this._doc.add(this._identifierDocValuesField);
         this._doc.add(this._numericKeyField);
         this._doc.add(this._dataField);
+        this._partField = new StringField(_PART_FIELD, "", Field.Store.NO);
+        this._partDoc = new Document();
+        this._partDoc.add(this._identifierField);
+        this._partDoc.add(this._identifierDocValuesField);
+        this._partDoc.add(this._numericKeyField);
+        this._partDoc.add(this._dataField);
+        this._partDoc.add(this._partField);
+    }
+
+    private static Directory openDirectory(Path path, String directoryType, boolean preload) throws IOException {
+        // preload only applies to mmap, which FSDirectory.open chooses on 64 bit platforms
+        FSDirectory directory;
+        switch (directoryType) {
+            case "default":
+                directory = FSDirectory.open(path);
+                break;
+            case "mmap":
+                directory = new MMapDirectory(path);
+                break;
+            case "nio":
+                directory = new NIOFSDirectory(path);
+                break;
+            default:
+                throw new IllegalArgumentException("Unknown directory type: " + directoryType);
+        }
+        if (directory instanceof MMapDirectory) {
+            ((MMapDirectory) directory).setPreload(preload);
+        }
+        return directory;
+    }
+
+    public void warmup() throws IOException {
+        // Touches the identifier terms and key docvalues, so they are in the page cache before the first lookups.
+        DirectoryReader reader = this.reader;
+        if (reader == null || !reader.tryIncRef()) {
+            return;
+        }
+        try {
+            for (LeafReaderContext context : reader.leaves()) {
+                LeafReader leafReader = context.reader();
+                Terms terms = leafReader.terms(_IDENTIFIER_FIELD);
+                if (terms != null) {
+                    TermsEnum termsEnum = terms.iterator();
+                    while (termsEnum.next() != null) {
+                    }
+                }
+                NumericDocValues keys = leafReader.getNumericDocValues(_NUMERIC_KEY_FIELD);
+                if (keys != null) {
+                    while (keys.nextDoc() != DocIdSetIterator.NO_MORE_DOCS) {
+                        keys.longValue();
+                    }
+                }
+            }
+        } finally {
+            reader.decRef();
+        }
     }
 
     public void reopen() throws IOException {
-        DirectoryReader newReader = DirectoryReader.openIfChanged(this.reader, this.writer, true);
+        // The new reader is published before the old one is released; the old one closes when its last user is done.
+        DirectoryReader oldReader = this.reader;
+        DirectoryReader newReader = DirectoryReader.openIfChanged(oldReader, this.writer, true);
         if (newReader != null) {
-            this.reader.close();
             this.reader = newReader;
-            this.searcher = new IndexSearcher(this.reader);
             this.currentReaderContext = null;
-            this.dataBinaryDocValues = null;
+            oldReader.decRef();
         }
     }
 
-    public int numDocs() {
-        return this.writer.getDocStats().numDocs;
+    public int numDocs() throws IOException {
+        // As of the last reopen: the writer's doc stats would count documents whose delete is still buffered.
+        DirectoryReader reader = acquireReader();
+        try {
+            return reader.numDocs();
+        } finally {
+            reader.decRef();
+        }
+    }
+
+    public int maxDoc() throws IOException {
+        return readerMaxDoc();
+    }
+
+    public long ramBytesUsed() {
+        return this.writer.ramBytesUsed();
+    }
+
+    public void setRAMBufferSizeMB(double ramBufferSizeMB) {
+        this.writer.getConfig().setRAMBufferSizeMB(ramBufferSizeMB);
+    }
+
+    public void flush() throws IOException {
+        // Writes the buffered documents and deletes to new segment files, without a commit.
+        this.writer.flush();
+    }
+
+    public int mergingSegmentCount() {
+        return this.writer.getMergingSegments().size();
+    }
+
+    public boolean hasPendingMerges() {
+        return this.writer.hasPendingMerges();
     }
 
     public void commit() throws IOException {
@@ -151,17 +277,68 @@ public class StoreLucene {
                 this.writer = null;
             }
         }
-        if (this.reader != null) {
+        DirectoryReader reader = this.reader;
+        if (reader != null) {
+            this.reader = null;
             try {
-                this.reader.close();
+                reader.decRef();
+            } catch (IOException e) {
+            }
+        }
+        DirectoryReader committedReader = this.committedReader;
+        if (committedReader != null) {
+            this.committedReader = null;
+            try {
+                committedReader.decRef();
             } catch (IOException e) {
-            } finally {
-                this.reader = null;
-                this.searcher = null;
             }
         }
     }
 
+    // Only for tests: simulates a crash, dropping what was not committed. Not part of the SequentialStorage API.
+    public void rollbackForTests() throws IOException {
+        try {
+            this.writer.rollback();
+        } finally {
+            this.writer = null;
+            close();
+        }
+    }
+
+    public ThrottledMergeScheduler getMergeScheduler() {
+        return this.mergeScheduler;
+    }
+
+    public void setMaxMergesAndThreads(int maxMergeCount, int maxThreadCount) {
+        this.mergeScheduler.setMaxMergesAndThreads(maxMergeCount, maxThreadCount);
+    }
+
+    public void setAutoIOThrottle(boolean autoIOThrottle) {
+        if (autoIOThrottle) {
+            this.mergeScheduler.enableAutoIOThrottle();
+        } else {
+            this.mergeScheduler.disableAutoIOThrottle();
+        }
+    }
+
+    public IndexCommit snapshot() throws IOException {
+        // Pins the last commit: its files are not deleted until releaseSnapshot.
+        return this.snapshotDeletionPolicy.snapshot();
+    }
+
+    public String[] snapshotFiles(IndexCommit commit) throws IOException {
+        return commit.getFileNames().toArray(new String[0]);
+    }
+
+    public String snapshotCommitValue(IndexCommit commit, String key) throws IOException {
+        return commit.getUserData().get(key);
+    }
+
+    public void releaseSnapshot(IndexCommit commit) throws IOException {
+        this.snapshotDeletionPolicy.release(commit);
+        this.writer.deleteUnusedFiles();
+    }
+
     public void forceMerge(int maxNumSegments, boolean doWait) throws IOException {
         this.writer.forceMerge(maxNumSegments, doWait);
     }
@@ -170,27 +347,242 @@ public class StoreLucene {
         this.writer.forceMergeDeletes(doWait);
     }
 
+    public void forceMergeDeletes(double deletesPctAllowed, boolean doWait) throws IOException {
+        // only segments with more than deletesPctAllowed percent deleted documents are merged; the merges are selected
+        // before forceMergeDeletes returns (also without doWait), so the policy's own setting is restored right after
+        TieredMergePolicy tieredMergePolicy = (TieredMergePolicy) this.writer.getConfig().getMergePolicy();
+        synchronized (tieredMergePolicy) {
+            double previous = tieredMergePolicy.getForceMergeDeletesPctAllowed();
+            tieredMergePolicy.setForceMergeDeletesPctAllowed(deletesPctAllowed);
+            try {
+                this.writer.forceMergeDeletes(doWait);
+            } finally {
+                tieredMergePolicy.setForceMergeDeletesPctAllowed(previous);
+            }
+        }
+    }
+
+    public SegmentStats[] segmentStats() throws IOException {
+        // From the metadata of the last commit; cheap, and safe to call from another thread.
+        return segmentStats(this.directory);
+    }
+
+    static SegmentStats[] segmentStats(Directory directory) throws IOException {
+        SegmentInfos segmentInfos;
+        try {
+            segmentInfos = SegmentInfos.readLatestCommit(directory);
+        } catch (IndexNotFoundException e) {
+            return new SegmentStats[0];
+        }
+        SegmentStats[] result = new SegmentStats[segmentInfos.size()];
+        int i = 0;
+        for (SegmentCommitInfo info : segmentInfos) {
+            result[i++] = new SegmentStats(info.info.name, info.info.maxDoc(), info.getDelCount(), info.sizeInBytes());
+        }
+        return result;
+    }
+
     public void add(String identifier, BytesRef data) throws IOException {
-        long newKey = newKey();
+        prepareDoc(identifier, data);
+        this.writer.updateDocument(new Term(_IDENTIFIER_FIELD, identifier), this._doc);
+    }
+
+    public void add(String identifier, BytesRef data, String part) throws IOException {
+        prepareDoc(identifier, data);
+        this._partField.setStringValue(part);
+        this.writer.updateDocument(new Term(_IDENTIFIER_FIELD, identifier), this._partDoc);
+    }
+
+    public int partNumDocs(String part) throws IOException {
+        // Requires reopen to be called first.
+        DirectoryReader reader = acquireReader();
+        try {
+            return new IndexSearcher(reader).count(new TermQuery(new Term(_PART_FIELD, part)));
+        } finally {
+            reader.decRef();
+        }
+    }
+
+    public String[] parts() throws IOException {
+        // Requires reopen to be called first. Parts of which all documents are deleted remain until merged away.
+        Set<String> parts = new TreeSet<>();
+        DirectoryReader reader = acquireReader();
+        try {
+            for (LeafReaderContext context : reader.leaves()) {
+                Terms terms = context.reader().terms(_PART_FIELD);
+                if (terms == null) {
+                    continue;
+                }
+                TermsEnum termsEnum = terms.iterator();
+                BytesRef term;
+                while ((term = termsEnum.next()) != null) {
+                    parts.add(term.utf8ToString());
+                }
+            }
+        } finally {
+            reader.decRef();
+        }
+        return parts.toArray(new String[0]);
+    }
+
+    public void append(String identifier, BytesRef data) throws IOException {
+        // Only for identifiers not in the index yet: no delete term is buffered, which makes bulk loading sequential.
+        prepareDoc(identifier, data);
+        this.writer.addDocument(this._doc);
+    }
+
+    public String duplicateIdentifier() throws IOException {
+        // Requires reopen to be called first. After appends (which do not replace), the first identifier held by more
+        // than one document, or null; docFreq counts deleted documents as well, so only meaningful without deletes.
+        DirectoryReader reader = acquireReader();
+        try {
+            Terms terms = MultiTerms.getTerms(reader, _IDENTIFIER_FIELD);
+            if (terms == null) {
+                return null;
+            }
+            TermsEnum termsEnum = terms.iterator();
+            BytesRef term;
+            while ((term = termsEnum.next()) != null) {
+                if (termsEnum.docFreq() > 1) {
+                    return term.utf8ToString();
+                }
+            }
+            return null;
+        } finally {
+            reader.decRef();
+        }
+    }
+
+    public void addIndexes(String path, long newestKey) throws IOException {
+        // Attaches the segments of a closed index with the same schema; its keys must all be newer than ours.
+        try (Directory source = FSDirectory.open(Paths.get(path))) {
+            this.writer.addIndexes(source);
+        }
+        this.newestKey = Math.max(this.newestKey, newestKey);
+    }
+
+    public long getNewestKey() {
+        return this.newestKey;
+    }
+
+    public void setNewestKey(long newestKey) {
+        this.newestKey = newestKey;
+    }
+
+    private void prepareDoc(String identifier, BytesRef data) {
         this._identifierField.setStringValue(identifier);
-        this._identifierDocValueField.setBytesValue(new BytesRef(identifier));
-        this._storedKeyField.setLongValue(newKey);
-        this._numericKeyField.setLongValue(newKey);
+        this._identifierDocValuesField.setBytesValue(new BytesRef(identifier));
+        this._numericKeyField.setLongValue(newKey());
         this._dataField.setBytesValue(data);
-        this.writer.updateDocument(new Term(_IDENTIFIER_FIELD, identifier), this._doc);
     }
 
-    public void delete(String identifier) throws IOException {
+    public long delete(String identifier) throws IOException {
+        // A delete takes a key too, so deletes can be ordered among adds (see tombstones in Python).
         this.writer.deleteDocuments(new Term(_IDENTIFIER_FIELD, identifier));
+        return newKey();
+    }
+
+    public void setCommitValue(String key, String value) {
+        // Stored in the user data of the next commit.
+        Map<String, String> commitData = new HashMap<>();
+        Iterable<Map.Entry<String, String>> liveCommitData = this.writer.getLiveCommitData();
+        if (liveCommitData != null) {
+            for (Map.Entry<String, String> entry : liveCommitData) {
+                commitData.put(entry.getKey(), entry.getValue());
+            }
+        }
+        commitData.put(key, value);
+        this.writer.setLiveCommitData(commitData.entrySet());
+    }
+
+    public String getCommitValue(String key) {
+        Iterable<Map.Entry<String, String>> liveCommitData = this.writer.getLiveCommitData();
+        if (liveCommitData != null) {
+            for (Map.Entry<String, String> entry : liveCommitData) {
+                if (entry.getKey().equals(key)) {
+                    return entry.getValue();
+                }
+            }
+        }
+        return null;
     }
 
     public BytesRef getData(String identifier) throws IOException {
-        TopDocs results = searcher.search(new TermQuery(new Term(_IDENTIFIER_FIELD, identifier)), 1);
-        if (results.totalHits.value == 0) {
-            return null;
+        // Holds a reference to the reader, so it may be called from other threads while committing and reopening.
+        DirectoryReader reader = acquireReader();
+        try {
+            return _getData(new IndexSearcher(reader), identifier);
+        } finally {
+            reader.decRef();
+        }
+    }
+
+    public RecordReader openRecord(String identifier) throws IOException {
+        BytesRef data = getData(identifier);
+        return data == null ? null : new RecordReader(data);
+    }
+
+    public BytesRef[] getDataMultiple(String[] identifiers) throws IOException {
+        // One call for a batch of lookups; null for identifiers not found.
+        DirectoryReader reader = acquireReader();
+        try {
+            IndexSearcher searcher = new IndexSearcher(reader);
+            BytesRef[] result = new BytesRef[identifiers.length];
+            for (int i = 0; i < identifiers.length; i++) {
+                result[i] = _getData(searcher, identifiers[i]);
+            }
+            return result;
+        } finally {
+            reader.decRef();
         }
-        int docId = results.scoreDocs[0].doc;
-        return _getData(docId);
+    }
+
+    public boolean[] existsMultiple(String[] identifiers) throws IOException {
+        // Requires reopen to be called first.
+        boolean[] result = new boolean[identifiers.length];
+        DirectoryReader reader = acquireReader();
+        try {
+            for (int i = 0; i < identifiers.length; i++) {
+                result[i] = exists(reader, identifiers[i]);
+            }
+        } finally {
+            reader.decRef();
+        }
+        return result;
+    }
+
+    public boolean exists(String identifier) throws IOException {
+        // Requires reopen to be called first.
+        DirectoryReader reader = acquireReader();
+        try {
+            return exists(reader, identifier);
+        } finally {
+            reader.decRef();
+        }
+    }
+
+    static boolean exists(DirectoryReader reader, String identifier) throws IOException {
+        // Only consults the identifier terms and postings, no stored fields.
+        BytesRef term = new BytesRef(identifier);
+        for (LeafReaderContext context : reader.leaves()) {
+            Terms terms = context.reader().terms(_IDENTIFIER_FIELD);
+            if (terms == null) {
+                continue;
+            }
+            TermsEnum termsEnum = terms.iterator();
+            if (!termsEnum.seekExact(term)) {
+                continue;
+            }
+            Bits liveDocs = context.reader().getLiveDocs();
+            PostingsEnum postings = termsEnum.postings(null, PostingsEnum.NONE);
+            int docId;
+            while ((docId = postings.nextDoc()) != DocIdSetIterator.NO_MORE_DOCS) {
+                if (liveDocs == null || liveDocs.get(docId)) {
+                    return true;
+                }
+            }
+        }
+        return false;
     }
 
     private long newKey() {
@@ -199,21 +591,30 @@ public class StoreLucene {
     }
 
     private long newestKeyFromIndex() throws IOException {
-        int maxDoc = this.searcher.getIndexReader().maxDoc();
-        if (maxDoc < 1) {
-            return 0;
-        }
-        Document doc = this.searcher.doc(maxDoc - 1);
-        if (doc == null) {
-            return 0;
+        // Segments are sorted on key, so the newest key of a segment is found at its last document.
+        long newestKey = 0;
+        DirectoryReader reader = acquireReader();
+        try {
+            for (LeafReaderContext context : reader.leaves()) {
+                LeafReader leafReader = context.reader();
+                int maxDoc = leafReader.maxDoc();
+                if (maxDoc < 1) {
+                    continue;
+                }
+                NumericDocValues keys = leafReader.getNumericDocValues(_NUMERIC_KEY_FIELD);
+                if (keys != null && keys.advanceExact(maxDoc - 1)) {
+                    newestKey = Math.max(newestKey, keys.longValue());
+                }
+            }
+        } finally {
+            reader.decRef();
         }
-        long newestKey = doc.getField(_KEY_FIELD).numericValue().longValue();
         return newestKey;
     }
 
     public PyIterator<String> iterkeys() throws IOException {
         // Requires reopen to be called first.
-        PyIterator<Item> items = iteritems(true, false);
+        PyIterator<Item> items = iteritems(true, false, 0, Integer.MAX_VALUE);
         return new PyIterator<String>() {
             @Override
             public String next() {
@@ -225,7 +626,7 @@ public class StoreLucene {
 
     public PyIterator<BytesRef> itervalues() throws IOException {
         // Requires reopen to be called first.
-        PyIterator<Item> items = iteritems(false, true);
+        PyIterator<Item> items = iteritems(false, true, 0, Integer.MAX_VALUE);
         return new PyIterator<BytesRef>() {
             @Override
             public BytesRef next() {
@@ -242,7 +643,21 @@ public class StoreLucene {
 
     public ItemIterator iteritems() throws IOException {
         // Requires reopen to be called first.
-        PyIterator<Item> pi = iteritems(true, true);
+        return iteritems(0, Integer.MAX_VALUE);
+    }
+
+    public int readerMaxDoc() throws IOException {
+        DirectoryReader reader = acquireReader();
+        try {
+            return reader.maxDoc();
+        } finally {
+            reader.decRef();
+        }
+    }
+
+    public ItemIterator iteritems(int fromDoc, int toDoc) throws IOException {
+        // Requires reopen to be called first. Iterators over disjoint ranges may be consumed concurrently.
+        PyIterator<Item> pi = iteritems(true, true, fromDoc, toDoc);
         return new ItemIterator() {
             @Override
             public Item next() {
@@ -251,15 +666,203 @@ public class StoreLucene {
         };
     }
 
-    private PyIterator<Item> iteritems(boolean includeIdentifier, boolean includeData) throws IOException {
+    public ItemIterator iteritemsSince(long sinceKey) throws IOException {
+        // Requires reopen to be called first. Only documents with a key newer than sinceKey; in key order per segment.
+        List<PyIterator<Item>> ranges = new ArrayList<>();
+        DirectoryReader reader = acquireReader();
+        try {
+            for (LeafReaderContext context : reader.leaves()) {
+                int maxDoc = context.reader().maxDoc();
+                int fromDoc = firstDocAfter(context.reader(), sinceKey);
+                if (fromDoc < maxDoc) {
+                    ranges.add(iteritems(reader, true, true, context.docBase + fromDoc, context.docBase + maxDoc));
+                }
+            }
+        } finally {
+            reader.decRef();
+        }
+        Iterator<PyIterator<Item>> rangesIterator = ranges.iterator();
+        return new ItemIterator() {
+            PyIterator<Item> current = null;
+
+            @Override
+            public Item next() {
+                while (true) {
+                    if (current == null) {
+                        if (!rangesIterator.hasNext()) {
+                            return null;
+                        }
+                        current = rangesIterator.next();
+                    }
+                    Item item = current.next();
+                    if (item != null) {
+                        return item;
+                    }
+                    current = null;
+                }
+            }
+        };
+    }
+
+    public void keepCommittedReader() throws IOException {
+        // Keeps the current reader for itemsSince; to be called right after a commit and reopen, when it shows the commit.
+        DirectoryReader oldReader = this.committedReader;
+        this.committedReader = acquireReader();
+        if (oldReader != null) {
+            oldReader.decRef();
+        }
+    }
+
+    public Item[] itemsSince(long sinceKey, long untilKey, int max) throws IOException {
+        // Up to max live documents with sinceKey < key <= untilKey, in key order over all segments, as of the reader
+        // kept by keepCommittedReader. Holds a reference to it while reading, so it may be called from another thread
+        // than the one writing.
+        DirectoryReader reader = acquireCommittedReader();
+        try {
+            PriorityQueue<KeyCursor> cursors = new PriorityQueue<>((a, b) -> Long.compare(a.key, b.key));
+            for (LeafReaderContext context : reader.leaves()) {
+                KeyCursor cursor = new KeyCursor(context.reader(), firstDocAfter(context.reader(), sinceKey));
+                if (cursor.next(untilKey)) {
+                    cursors.add(cursor);
+                }
+            }
+            List<Item> items = new ArrayList<>();
+            while (items.size() < max && !cursors.isEmpty()) {
+                KeyCursor cursor = cursors.poll();
+                BytesRef data = cursor.leafReader.document(cursor.doc, _DATA_ONLY).getBinaryValue(_DATA_FIELD);
+                items.add(new Item(cursor.identifier(), data, cursor.key));
+                if (cursor.next(untilKey)) {
+                    cursors.add(cursor);
+                }
+            }
+            return items.toArray(new Item[0]);
+        } finally {
+            reader.decRef();
+        }
+    }
+
+    private DirectoryReader acquireReader() {
+        while (true) {
+            DirectoryReader reader = this.reader;
+            if (reader == null) {
+                throw new AlreadyClosedException("this StoreLucene is closed");
+            }
+            if (reader.tryIncRef()) {
+                return reader;
+            }
+        }
+    }
+
+    private DirectoryReader acquireCommittedReader() {
+        while (true) {
+            DirectoryReader reader = this.committedReader;
+            if (reader == null) {
+                throw new AlreadyClosedException("this StoreLucene is closed");
+            }
+            if (reader.tryIncRef()) {
+                return reader;
+            }
+        }
+    }
+
+    private static class KeyCursor {
+        LeafReader leafReader;
+        Bits liveDocs;
+        NumericDocValues keys;
+        SortedDocValues identifiers;
+        int doc;
+        long key;
+
+        KeyCursor(LeafReader leafReader, int fromDoc) throws IOException {
+            this.leafReader = leafReader;
+            this.liveDocs = leafReader.getLiveDocs();
+            this.keys = leafReader.getNumericDocValues(_NUMERIC_KEY_FIELD);
+            this.identifiers = leafReader.getSortedDocValues(_IDENTIFIER_FIELD);
+            this.doc = fromDoc - 1;
+        }
+
+        String identifier() throws IOException {
+            return identifierOf(this.identifiers, this.doc);
+        }
+
+        boolean next(long untilKey) throws IOException {
+            // Advances to the next live document; false when there is none with a key up to untilKey.
+            while (++this.doc < this.leafReader.maxDoc()) {
+                if (this.liveDocs != null && !this.liveDocs.get(this.doc)) {
+                    continue;
+                }
+                if (this.keys == null || !this.keys.advanceExact(this.doc)) {
+                    continue;
+                }
+                this.key = this.keys.longValue();
+                return this.key <= untilKey;
+            }
+            return false;
+        }
+    }
+
+    private static int firstDocAfter(LeafReader leafReader, long sinceKey) throws IOException {
+        // Segments are sorted on key: binary search, with a fresh docvalues iterator per probe as they only advance.
+        int low = 0;
+        int high = leafReader.maxDoc();
+        while (low < high) {
+            int mid = (low + high) >>> 1;
+            NumericDocValues keys = leafReader.getNumericDocValues(_NUMERIC_KEY_FIELD);
+            if (keys != null && keys.advanceExact(mid) && keys.longValue() > sinceKey) {
+                high = mid;
+            } else {
+                low = mid + 1;
+            }
+        }
+        return low;
+    }
+
+    private PyIterator<Item> iteritems(boolean includeIdentifier, boolean includeData, int fromDoc, int toDoc) throws IOException {
+        DirectoryReader reader = acquireReader();
+        try {
+            return iteritems(reader, includeIdentifier, includeData, fromDoc, toDoc);
+        } finally {
+            reader.decRef();
+        }
+    }
+
+    static PyIterator<Item> iteritems(DirectoryReader reader, boolean includeIdentifier, boolean includeData, int fromDoc, int toDoc) throws IOException {
+        // Identifiers come from the docvalues of the segment at hand; only the data is read from the stored fields.
+        // The caller holds a reference to reader while creating the iterator; the iterator only references it during
+        // each step, so once reopen has replaced it and its other users are done, it fails with a
+        // ConcurrentModificationException.
+        List<LeafReaderContext> leaves = reader.leaves();
         return new PyIterator<Item>() {
-            List<LeafReaderContext> leaves = StoreLucene.this.reader.leaves();
-            Bits liveDocs = MultiBits.getLiveDocs(StoreLucene.this.reader);
-            int maxDoc = StoreLucene.this.reader.maxDoc();
-            int docId = 0;
+            Bits liveDocs = MultiBits.getLiveDocs(reader);
+            int maxDoc = Math.min(toDoc, reader.maxDoc());
+            int docId = fromDoc;
+            LeafReaderContext leaf = null;
+            SortedDocValues identifiers = null;
 
             @Override
             public Item next() {
+                if (docId >= maxDoc) {
+                    return null;
+                }
+                if (!reader.tryIncRef()) {
+                    throw new ConcurrentModificationException(new AlreadyClosedException("this IndexReader is closed"));
+                }
+                try {
+                    return nextItem();
+                } catch (AlreadyClosedException e) {
+                    throw new ConcurrentModificationException(e);
+                } catch (IOException e) {
+                    throw new RuntimeException(e);
+                } finally {
+                    try {
+                        reader.decRef();
+                    } catch (IOException e) {
+                        throw new RuntimeException(e);
+                    }
+                }
+            }
+
+            private Item nextItem() throws IOException {
                 String identifier = null;
                 BytesRef data = null;
                 while (identifier == null && data == null) {
@@ -267,23 +870,16 @@ public class StoreLucene {
                         return null;
                     }
                     if (liveDocs == null || liveDocs.get(docId)) {
-                        LeafReaderContext readerContext = leaves.get(ReaderUtil.subIndex(this.docId, leaves));
-                        try {
-                            if (includeIdentifier) {
-                                BinaryDocValues identifierBinaryDocValues = readerContext.reader().getBinaryDocValues(_IDENTIFIER_DOC_VALUE_FIELD);
-                                if (identifierBinaryDocValues.advanceExact(docId - readerContext.docBase)) {
-                                    identifier = identifierBinaryDocValues.binaryValue().utf8ToString();
-                                }
-
-                                //identifier = identifierBinaryDocValues.get(docId - readerContext.docBase).utf8ToString();
-                            }
-                            if (includeData) {
-                                data = _getData(docId);
-                            }
-                        } catch (AlreadyClosedException e) {
-                            throw new ConcurrentModificationException(e);
-                        } catch (IOException e) {
-                            throw new RuntimeException(e);
+                        // docvalues only advance, so a fresh instance per segment; documents are visited in order
+                        if (leaf == null || docId >= leaf.docBase + leaf.reader().maxDoc()) {
+                            leaf = leaves.get(ReaderUtil.subIndex(docId, leaves));
+                            identifiers = leaf.reader().getSortedDocValues(_IDENTIFIER_FIELD);
+                        }
+                        if (includeIdentifier) {
+                            identifier = identifierOf(identifiers, docId - leaf.docBase);
+                        }
+                        if (includeData) {
+                            data = leaf.reader().document(docId - leaf.docBase, _DATA_ONLY).getBinaryValue(_DATA_FIELD);
                         }
                     }
                     docId++;
@@ -293,8 +889,20 @@ public class StoreLucene {
         };
     }
 
-    private BytesRef _getData(int docId) throws IOException {
-        BytesRef bytesRef = this.searcher.doc(docId).getField(_DATA_FIELD).binaryValue();
+    private static String identifierOf(SortedDocValues identifiers, int doc) throws IOException {
+        if (identifiers == null || !identifiers.advanceExact(doc)) {
+            return null;
+        }
+        return identifiers.lookupOrd(identifiers.ordValue()).utf8ToString();
+    }
+
+    private static BytesRef _getData(IndexSearcher searcher, String identifier) throws IOException {
+        TopDocs results = searcher.search(new TermQuery(new Term(_IDENTIFIER_FIELD, identifier)), 1);
+        if (results.totalHits.value == 0) {
+            return null;
+        }
+        int docId = results.scoreDocs[0].doc;
+        BytesRef bytesRef = searcher.doc(docId).getField(_DATA_FIELD).binaryValue();
         return bytesRef;
 /*
         byte[] bytes = bytesRef.bytes;
@@ -309,13 +917,19 @@ public class StoreLucene {
         public T next();
     }
 
-    public class Item {
+    public static class Item {
         public String identifier;
         public BytesRef data;
+        public long key;
 
         Item(String identifier, BytesRef data) {
+            this(identifier, data, 0);
+        }
+
+        Item(String identifier, BytesRef data, long key) {
             this.identifier = identifier;
             this.data = data;
+            this.key = key;
         }
     }
 }
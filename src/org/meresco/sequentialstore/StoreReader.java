@@ -0,0 +1,105 @@
+/* begin license *
+ *
+ * "Meresco SequentialStore" contains components facilitating efficient sequentially ordered storing and retrieval.
+ *
+ * Copyright (C) 2026 Seecr (Seek You Too B.V.) https://seecr.nl
+ *
+ * This file is part of "Meresco SequentialStore"
+ *
+ * "Meresco SequentialStore" is free software; you can redistribute it and/or modify
+ * it under the terms of the GNU General Public License as published by
+ * the Free Software Foundation; either version 2 of the License, or
+ * (at your option) any later version.
+ *
+ * "Meresco SequentialStore" is distributed in the hope that it will be useful,
+ * but WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ * GNU General Public License for more details.
+ *
+ * You should have received a copy of the GNU General Public License
+ * along with "Meresco SequentialStore"; if not, write to the Free Software
+ * Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+ *
+ * end license */
+
+package org.meresco.sequentialstore;
+
+import java.io.IOException;
+import java.nio.file.Paths;
+
+import org.apache.lucene.index.DirectoryReader;
+import org.apache.lucene.index.IndexNotFoundException;
+import org.apache.lucene.index.SegmentInfos;
+import org.apache.lucene.store.Directory;
+import org.apache.lucene.store.FSDirectory;
+
+
+public class StoreReader {
+    // Read-only view of the last commit of a store directory, without an IndexWriter (so without its write lock).
+    private Directory directory;
+    private DirectoryReader reader;
+
+    public StoreReader(String path) throws IOException {
+        this.directory = FSDirectory.open(Paths.get(path));
+        try {
+            this.reader = DirectoryReader.open(this.directory);
+        } catch (IndexNotFoundException e) {
+            this.reader = null;
+        }
+    }
+
+    public boolean[] existsMultiple(String[] identifiers) throws IOException {
+        boolean[] result = new boolean[identifiers.length];
+        if (this.reader == null) {
+            return result;
+        }
+        for (int i = 0; i < identifiers.length; i++) {
+            result[i] = StoreLucene.exists(this.reader, identifiers[i]);
+        }
+        return result;
+    }
+
+    public StoreLucene.ItemIterator iteritems() throws IOException {
+        // The records of the last commit, in document order.
+        StoreLucene.PyIterator<StoreLucene.Item> items = this.reader == null ? null : StoreLucene.iteritems(this.reader, true, true, 0, Integer.MAX_VALUE);
+        return new StoreLucene.ItemIterator() {
+            @Override
+            public StoreLucene.Item next() {
+                return items == null ? null : items.next();
+            }
+        };
+    }
+
+    public static String[] commitFiles(String path) throws IOException {
+        // The files of the last commit, its segments_N file included; none without a commit.
+        try (Directory directory = FSDirectory.open(Paths.get(path))) {
+            return SegmentInfos.readLatestCommit(directory).files(true).toArray(new String[0]);
+        } catch (IndexNotFoundException e) {
+            return new String[0];
+        }
+    }
+
+    public static String commitValue(String path, String key) throws IOException {
+        // From the user data of the last commit, like StoreLucene.getCommitValue; null without a commit.
+        try (Directory directory = FSDirectory.open(Paths.get(path))) {
+            return SegmentInfos.readLatestCommit(directory).getUserData().get(key);
+        } catch (IndexNotFoundException e) {
+            return null;
+        }
+    }
+
+    public static SegmentStats[] segmentStats(String path) throws IOException {
+        // Of the last commit, like StoreLucene.segmentStats; opens no reader.
+        try (Directory directory = FSDirectory.open(Paths.get(path))) {
+            return StoreLucene.segmentStats(directory);
+        }
+    }
+
+    public void close() throws IOException {
+        if (this.reader != null) {
+            this.reader.close();
+            this.reader = null;
+        }
+        this.directory.close();
+    }
+}
@@ -0,0 +1,115 @@
+/* begin license *
+ *
+ * "Meresco SequentialStore" contains components facilitating efficient sequentially ordered storing and retrieval.
+ *
+ * Copyright (C) 2026 Seecr (Seek You Too B.V.) https://seecr.nl
+ *
+ * This file is part of "Meresco SequentialStore"
+ *
+ * "Meresco SequentialStore" is free software; you can redistribute it and/or modify
+ * it under the terms of the GNU General Public License as published by
+ * the Free Software Foundation; either version 2 of the License, or
+ * (at your option) any later version.
+ *
+ * "Meresco SequentialStore" is distributed in the hope that it will be useful,
+ * but WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ * GNU General Public License for more details.
+ *
+ * You should have received a copy of the GNU General Public License
+ * along with "Meresco SequentialStore"; if not, write to the Free Software
+ * Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+ *
+ * end license */
+
+package org.meresco.sequentialstore;
+
+import java.io.IOException;
+import java.util.Map;
+import java.util.concurrent.ConcurrentHashMap;
+import java.util.concurrent.atomic.AtomicLong;
+
+import org.apache.lucene.index.ConcurrentMergeScheduler;
+import org.apache.lucene.index.MergePolicy;
+import org.apache.lucene.index.MergeRateLimiter;
+import org.apache.lucene.index.MergeScheduler;
+import org.apache.lucene.store.Directory;
+import org.apache.lucene.store.FilterDirectory;
+import org.apache.lucene.store.IOContext;
+import org.apache.lucene.store.IndexOutput;
+import org.apache.lucene.store.RateLimitedIndexOutput;
+
+
+public class ThrottledMergeScheduler extends ConcurrentMergeScheduler {
+    private double maxMBPerSec = Double.POSITIVE_INFINITY;
+    private AtomicLong mergeCount = new AtomicLong();
+    private AtomicLong mergedBytes = new AtomicLong();
+    private AtomicLong mergeNanos = new AtomicLong();
+    // Per running merge, on top of the rate limiter of ConcurrentMergeScheduler, which leaves small and forced merges
+    // (and all merges without the auto IO throttle) unlimited.
+    private Map<MergePolicy.OneMerge, MergeRateLimiter> rateLimiters = new ConcurrentHashMap<>();
+
+    public synchronized void setMaxMBPerSec(double mbPerSec) {
+        // Caps the write rate of every merge, forced ones included, and the rate the auto IO throttle may choose; <= 0
+        // removes the cap. Applies to running merges too.
+        this.maxMBPerSec = mbPerSec > 0 ? mbPerSec : Double.POSITIVE_INFINITY;
+        for (MergeRateLimiter rateLimiter : this.rateLimiters.values()) {
+            rateLimiter.setMBPerSec(this.maxMBPerSec);
+        }
+        updateMergeThreads();
+    }
+
+    public synchronized double getMaxMBPerSec() {
+        return this.maxMBPerSec;
+    }
+
+    public long mergeCount() {
+        return this.mergeCount.get();
+    }
+
+    public long mergedBytes() {
+        return this.mergedBytes.get();
+    }
+
+    public double mergeSeconds() {
+        return this.mergeNanos.get() / 1e9;
+    }
+
+    @Override
+    protected synchronized void updateMergeThreads() {
+        if (this.targetMBPerSec > this.maxMBPerSec) {
+            this.targetMBPerSec = this.maxMBPerSec;
+        }
+        super.updateMergeThreads();
+    }
+
+    @Override
+    public Directory wrapForMerge(MergePolicy.OneMerge merge, Directory in) {
+        Directory wrapped = super.wrapForMerge(merge, in);
+        MergeRateLimiter rateLimiter = new MergeRateLimiter(merge.getMergeProgress());
+        synchronized (this) {
+            rateLimiter.setMBPerSec(this.maxMBPerSec);
+            this.rateLimiters.put(merge, rateLimiter);
+        }
+        return new FilterDirectory(wrapped) {
+            @Override
+            public IndexOutput createOutput(String name, IOContext context) throws IOException {
+                ensureOpen();
+                return new RateLimitedIndexOutput(rateLimiter, wrapped.createOutput(name, context));
+            }
+        };
+    }
+
+    @Override
+    protected void doMerge(MergeScheduler.MergeSource mergeSource, MergePolicy.OneMerge merge) throws IOException {
+        long t0 = System.nanoTime();
+        try {
+            super.doMerge(mergeSource, merge);
+        } finally {
+            this.rateLimiters.remove(merge);
+        }
+        this.mergeNanos.addAndGet(System.nanoTime() - t0);
+        this.mergedBytes.addAndGet(merge.totalBytesSize());
+        this.mergeCount.incrementAndGet();
+    }
+}
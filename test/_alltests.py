@@ -48,6 +48,15 @@ from adddeletetomultisequentialtest import AddDeleteToMultiSequentialTest
 from sequentialstoragetest import SequentialStorageTest
 from multisequentialstoragetest import MultiSequentialStorageTest
 from storagecomponentadaptertest import StorageComponentAdapterTest
+from garbagecollectortest import GarbageCollectorTest
+from memorybudgettest import MemoryBudgetTest
+from mergeplantest import MergePlanTest
+from journaltest import JournalTest
+from metricstest import MetricsTest
+from reactorfuturestest import ReactorFuturesTest
+from replicationtest import ReplicationTest
+from shardedsequentialstoragetest import ShardedSequentialStorageTest
+from tombstonestest import TombstonesTest
 from export.exporttest import ExportTest
 
 if __name__ == '__main__':
@@ -27,7 +27,9 @@
 #
 ## end license ##
 
-from seecr.test import SeecrTestCase
+from seecr.test import SeecrTestCase, CallTrace
+
+from time import sleep
 
 from weightless.core import be, consume
 from meresco.core import Observable
@@ -61,3 +63,85 @@ class AddDeleteToMultiSequentialTest(SeecrTestCase):
         consume(self.top.all.add(identifier="x", partname="part", data=b"<data/>"))
         consume(self.top.all.delete(identifier="x"))
         self.assertRaises(KeyError, lambda: self.multiSequentialStorage.getData(identifier='x', name='part'))
+
+    def testBatchedAddAndDelete(self):
+        multiSequentialStorage = MultiSequentialStorage(self.tempdir + '/batched')
+        top = be(
+            (Observable(),
+                (AddDeleteToMultiSequential(batchSize=5),
+                    (multiSequentialStorage,)
+                )
+            )
+        )
+        consume(top.all.add(identifier="x", partname="part1", data=b"<x1/>"))
+        consume(top.all.add(identifier="y", partname="part1", data="<y1/>"))
+        consume(top.all.delete(identifier="x"))
+        consume(top.all.add(identifier="x", partname="part2", data=b"<x2/>"))
+        self.assertRaises(KeyError, lambda: multiSequentialStorage.getData(identifier='y', name='part1'))
+        consume(top.all.add(identifier="y", partname="part1", data=b"<y2/>"))
+        self.assertEqual(b'<y2/>', multiSequentialStorage.getData(identifier='y', name='part1'))
+        self.assertEqual(b'<x2/>', multiSequentialStorage.getData(identifier='x', name='part2'))
+        self.assertFalse(multiSequentialStorage.hasData(identifier='x', name='part1'))
+
+    def testBatchedMessagesAreFlushedBeforeOtherMessages(self):
+        multiSequentialStorage = MultiSequentialStorage(self.tempdir + '/batched')
+        top = be(
+            (Observable(),
+                (AddDeleteToMultiSequential(batchSize=1000),
+                    (multiSequentialStorage,)
+                )
+            )
+        )
+        consume(top.all.add(identifier="x", partname="part", data=b"<data/>"))
+        self.assertEqual(b'<data/>', top.call.getData(identifier='x', name='part'))
+        consume(top.all.delete(identifier="x"))
+        self.assertFalse(top.call.hasData(identifier='x', name='part'))
+        consume(top.all.add(identifier="y", partname="part", data=b"<data/>"))
+        top.call.commit()
+        self.assertTrue(multiSequentialStorage.hasData(identifier='y', name='part'))
+
+    def testBatchedMessagesAreFlushedAfterMaxDelay(self):
+        multiSequentialStorage = MultiSequentialStorage(self.tempdir + '/batched')
+        addDeleteToMultiSequential = AddDeleteToMultiSequential(batchSize=1000, maxDelay=0.1)
+        top = be(
+            (Observable(),
+                (addDeleteToMultiSequential,
+                    (multiSequentialStorage,)
+                )
+            )
+        )
+        consume(top.all.add(identifier="x", partname="part", data=b"<data/>"))
+        self.assertFalse(multiSequentialStorage.hasData(identifier='x', name='part'))
+        sleep(0.15)
+        consume(top.all.add(identifier="y", partname="part", data=b"<data/>"))
+        self.assertTrue(multiSequentialStorage.hasData(identifier='x', name='part'))
+        self.assertTrue(multiSequentialStorage.hasData(identifier='y', name='part'))
+        consume(top.all.delete(identifier="x"))
+        addDeleteToMultiSequential.flush()
+        self.assertFalse(multiSequentialStorage.hasData(identifier='x', name='part'))
+
+    def testPendingMessagesAreKeptWhenFlushFails(self):
+        added = []
+        failures = [IOError('disk full')]
+        def addMultipleData(name, items):
+            if failures:
+                raise failures.pop()
+            added.append((name, items))
+        storage = CallTrace('storage', methods=dict(addMultipleData=addMultipleData))
+        addDeleteToMultiSequential = AddDeleteToMultiSequential(batchSize=1000)
+        top = be(
+            (Observable(),
+                (addDeleteToMultiSequential,
+                    (storage,)
+                )
+            )
+        )
+        consume(top.all.add(identifier="x", partname="part", data=b"<data/>"))
+        consume(top.all.delete(identifier="y"))
+        self.assertRaises(IOError, addDeleteToMultiSequential.flush)
+        self.assertEqual([], added)
+        addDeleteToMultiSequential.flush()
+        self.assertEqual([('part', [('x', b'<data/>')])], added)
+        self.assertEqual(['deleteMultipleData', 'addMultipleData', 'addMultipleData'], storage.calledMethodNames())
+        addDeleteToMultiSequential.flush()
+        self.assertEqual(3, len(storage.calledMethods))
@@ -92,6 +92,86 @@ class DiskSpaceTest(SeecrTestCase):
             print('close took %s' % (time() - t))
             f.write("%s, %s\n" % (i, getSimpleDirSize(storeDir)))
 
+            # compare with earlier store versions (schema 5: 'identifier' and 'key' were both stored twice)
+            bytesPerRecord = getSimpleDirSize(storeDir) / N
+            print('store version %s: %s bytes per record' % (SequentialStorage.version, bytesPerRecord))
+            f.write("version %s, bytes per record %s\n" % (SequentialStorage.version, bytesPerRecord))
+
+
+    def testCompareWithStoreVersion5(self):
+        """Disk usage and identifier iteration of this store version against the layout of version 5 (identifier indexed
+        and as binary docvalues, key both stored and as docvalues, data stored), for the same records."""
+        N = 20000
+        records = lambda: (("http://example.org/identifier/%s" % i, (RECORD % i).encode()) for i in range(N))
+
+        storeDir = join(self.tempdir, 'v%s' % SequentialStorage.version)
+        store = SequentialStorage(storeDir)
+        store.addMultiple(records())
+        store.commit()
+        t0 = time()
+        identifiers = list(store.iterkeys())
+        currentSeconds = time() - t0
+        store.close()
+        self.assertEqual(N, len(identifiers))
+        currentSize = getSimpleDirSize(storeDir)
+
+        version5Dir = join(self.tempdir, 'v5')
+        writeVersion5(version5Dir, records())
+        t0 = time()
+        version5Identifiers = iterVersion5Identifiers(version5Dir)
+        version5Seconds = time() - t0
+        self.assertEqual(N, len(version5Identifiers))
+        version5Size = getSimpleDirSize(version5Dir)
+
+        with open(join(self.tempdir, 'diskspace-versions.log'), 'w') as f:
+            for version, size, seconds in [('5', version5Size, version5Seconds), (SequentialStorage.version, currentSize, currentSeconds)]:
+                line = "version %s: %s bytes per record, iterating identifiers %.3f seconds" % (version, size / N, seconds)
+                print(line)
+                f.write(line + "\n")
+        self.assertTrue(currentSize < version5Size, (currentSize, version5Size))
+
+
+def writeVersion5(directory, records):
+    from java.nio.file import Paths
+    from org.apache.lucene.document import Document, Field, FieldType, StringField, BinaryDocValuesField, StoredField, NumericDocValuesField
+    from org.apache.lucene.index import IndexWriter, IndexWriterConfig, IndexOptions
+    from org.apache.lucene.search import Sort, SortField
+    from org.apache.lucene.store import FSDirectory
+    from org.apache.lucene.util import BytesRef
+    from lucene import JArray
+    config = IndexWriterConfig()
+    config.setRAMBufferSizeMB(256.0)
+    config.setUseCompoundFile(False)
+    config.setIndexSort(Sort(SortField("key", SortField.Type.LONG)))
+    writer = IndexWriter(FSDirectory.open(Paths.get(directory)), config)
+    dataType = FieldType()
+    dataType.setIndexOptions(IndexOptions.NONE)
+    dataType.setStored(True)
+    dataType.setTokenized(False)
+    for key, (identifier, data) in enumerate(records, start=1):
+        doc = Document()
+        doc.add(StringField("identifier", identifier, Field.Store.NO))
+        doc.add(BinaryDocValuesField("identifier", BytesRef(identifier)))
+        doc.add(StoredField("key", key))
+        doc.add(NumericDocValuesField("key", key))
+        doc.add(Field("data", BytesRef(JArray('byte')(data)), dataType))
+        writer.addDocument(doc)
+    writer.commit()
+    writer.close()
+
+def iterVersion5Identifiers(directory):
+    from java.nio.file import Paths
+    from org.apache.lucene.index import DirectoryReader, LeafReaderContext
+    from org.apache.lucene.search import DocIdSetIterator
+    from org.apache.lucene.store import FSDirectory
+    reader = DirectoryReader.open(FSDirectory.open(Paths.get(directory)))
+    identifiers = []
+    for context in reader.leaves():
+        values = LeafReaderContext.cast_(context).reader().getBinaryDocValues("identifier")
+        while values.nextDoc() != DocIdSetIterator.NO_MORE_DOCS:
+            identifiers.append(values.binaryValue().utf8ToString())
+    reader.close()
+    return identifiers
 
 
 def getSimpleDirSize(path):
@@ -29,10 +29,17 @@
 from seecr.test import SeecrTestCase
 from seecr.test.io import stdout_replaced
 
-from os.path import join, isfile
+from os import environ, listdir
+from os.path import abspath, dirname, join, isfile
+from subprocess import check_output
+from sys import executable
+from zlib import compressobj
 
 from meresco.sequentialstore import SequentialStorage
 from meresco.sequentialstore.export import Export
+from meresco.sequentialstore.export import export as exportModule
+from meresco.sequentialstore.export.export import parseBlock, BLOCK_HEADER, BOUNDARY_SENTINEL, RECORD
+from meresco.sequentialstoreexport import blocks
 
 
 class ExportTest(SeecrTestCase):
@@ -86,4 +93,183 @@ class ExportTest(SeecrTestCase):
             finally:
                 ex.close()
         except AssertionError as e:
-            self.assertEqual("The SequentialStore export file does not match the expected version 1 ('Export format version: 0\\n').", str(e))
+            self.assertEqual("The SequentialStore export file does not match the expected version 2 ('Export format version: 0\\n').", str(e))
+
+    def testImportFormatVersion1(self):
+        records = [('identifier%s' % i, bytes((j % 255) for j in range(i * 100))) for i in range(50)]
+        compress = compressobj()
+        with open(join(self.tempdir, 'export'), 'wb') as f:
+            f.write(b'Export format version: 1\n')
+            f.write(b'50\n')
+            for identifier, data in records:
+                f.write(compress.compress(identifier.encode() + b'\n' + data + BOUNDARY_SENTINEL))
+            f.write(compress.flush())
+        with stdout_replaced():
+            s = SequentialStorage(join(self.tempdir, 'store'))
+            s.importFrom(join(self.tempdir, 'export'))
+        self.assertEqual(records, list(s.iteritems()))
+
+    def testBlocksAndBlockIndex(self):
+        with stdout_replaced():
+            s = SequentialStorage(join(self.tempdir, 'store'))
+            for i in range(100):
+                s.add("identifier%s" % i, b'x' * 100)
+            export = Export(join(self.tempdir, 'export'), blockSize=1000)
+            export.export(s)
+        self.assertEqual(dict(size=100, untilKey=100, checksum='crc32'), export.header())
+        blocks = export.blocks()
+        self.assertEqual(12, len(blocks))
+        self.assertEqual([9] * 11 + [1], [count for offset, count in blocks])
+        with open(join(self.tempdir, 'export'), 'rb') as f:
+            f.seek(blocks[1][0])
+            length, count = BLOCK_HEADER.unpack(f.read(BLOCK_HEADER.size))
+            records = parseBlock(f.read(length))
+        self.assertEqual(9, len(records))
+        self.assertEqual((RECORD, 'identifier9', b'x' * 100), records[0])
+
+    def testShardedExportAndParallelImport(self):
+        with stdout_replaced():
+            N = 1023
+            s = SequentialStorage(join(self.tempdir, 'store'))
+            for i in range(N):
+                s.add("identifier%s" % i, bytes((j % 255) for j in range(i)))
+            s.export(join(self.tempdir, 'export'), shards=3)
+            self.assertFalse(isfile(join(self.tempdir, 'export')))
+            self.assertEqual([join(self.tempdir, 'export.%s' % i) for i in range(3)], Export(join(self.tempdir, 'export')).shardPaths())
+            self.assertEqual(dict(size=N, untilKey=N, shard=1, shards=3, checksum='crc32'), Export(join(self.tempdir, 'export.1')).header())
+
+            s2 = SequentialStorage(join(self.tempdir, 'store2'))
+            s2.importFrom(join(self.tempdir, 'export'), workers=2)
+            self.assertEqual(list(s.iteritems()), list(s2.iteritems()))
+
+    def testIncrementalExportAndImport(self):
+        with stdout_replaced():
+            s = SequentialStorage(join(self.tempdir, 'store'))
+            for i in range(10):
+                s.add('identifier%s' % i, b'data%i' % i)
+            self.assertEqual(10, s.export(join(self.tempdir, 'full')))
+            s2 = SequentialStorage(join(self.tempdir, 'store2'))
+            s2.importFrom(join(self.tempdir, 'full'))
+            self.assertEqual(10, s2.importedKey())
+
+            s.delete('identifier3')
+            s.add('identifier4', b'changed')
+            s.add('identifier10', b'new')
+            s.delete('identifier10')
+            s.add('identifier10', b'new again')
+            self.assertEqual(15, s.export(join(self.tempdir, 'delta'), sinceKey=10))
+            self.assertEqual(dict(sinceKey=10, untilKey=15, checksum='crc32'), Export(join(self.tempdir, 'delta')).header())
+
+            s2.importFrom(join(self.tempdir, 'delta'))
+            self.assertEqual(15, s2.importedKey())
+            self.assertEqual(sorted(s.iteritems()), sorted(s2.iteritems()))
+
+    def testIncrementalImportMustFollowImportedKey(self):
+        with stdout_replaced():
+            s = SequentialStorage(join(self.tempdir, 'store'))
+            for i in range(10):
+                s.add('identifier%s' % i, b'data%i' % i)
+            s.export(join(self.tempdir, 'delta'), sinceKey=5)
+            s2 = SequentialStorage(join(self.tempdir, 'store2'))
+            try:
+                s2.importFrom(join(self.tempdir, 'delta'))
+                self.fail()
+            except ValueError as e:
+                self.assertEqual('Incremental export since key 5 does not follow the imported key None.', str(e))
+
+    def testExportAlreadyImportedIsRefused(self):
+        with stdout_replaced():
+            s = SequentialStorage(join(self.tempdir, 'store'))
+            for i in range(10):
+                s.add('identifier%s' % i, b'data%i' % i)
+            s.export(join(self.tempdir, 'full'))
+            s.delete('identifier3')
+            s.export(join(self.tempdir, 'delta'), sinceKey=10)
+            s2 = SequentialStorage(join(self.tempdir, 'store2'))
+            s2.importFrom(join(self.tempdir, 'full'))
+            s2.importFrom(join(self.tempdir, 'delta'))
+            self.assertEqual(11, s2.importedKey())
+            for path, untilKey in [('delta', 11), ('full', 10)]:
+                try:
+                    s2.importFrom(join(self.tempdir, path))
+                    self.fail()
+                except ValueError as e:
+                    self.assertEqual('Export until key %s is already imported (imported key 11).' % untilKey, str(e))
+            self.assertEqual(None, s2.get('identifier3'))
+            self.assertEqual(9, len(s2))
+
+    def testCorruptBlockIsDetected(self):
+        s = SequentialStorage(join(self.tempdir, 'store'))
+        for i in range(100):
+            s.add("identifier%s" % i, b'x' * 100)
+        export = Export(join(self.tempdir, 'export'), blockSize=1000)
+        export.export(s)
+        with open(join(self.tempdir, 'export'), 'r+b') as f:
+            f.seek(export.blocks()[3][0] + BLOCK_HEADER.size + 5)
+            f.write(b'!')
+        try:
+            SequentialStorage(join(self.tempdir, 'store2')).importFrom(join(self.tempdir, 'export'))
+            self.fail()
+        except ValueError as e:
+            self.assertEqual("Checksum mismatch in block at offset %s of %s." % (export.blocks()[3][0], join(self.tempdir, 'export')), str(e))
+
+    def testBlockCodecImportsNoJvm(self):
+        root = dirname(dirname(dirname(abspath(blocks.__file__))))
+        script = "import sys, meresco.sequentialstoreexport.blocks; print(sorted(m for m in sys.modules if m in ('lucene', 'meresco.sequentialstore')))"
+        self.assertEqual(b'[]\n', check_output([executable, '-c', script], env=dict(environ, PYTHONPATH=root)))
+
+    def testTruncatedExportIsDetected(self):
+        s = SequentialStorage(join(self.tempdir, 'store'))
+        s.add("identifier", b'x' * 100)
+        s.export(join(self.tempdir, 'export'))
+        with open(join(self.tempdir, 'export'), 'r+b') as f:
+            f.truncate(100)
+        self.assertRaises(ValueError, lambda: SequentialStorage(join(self.tempdir, 'store2')).importFrom(join(self.tempdir, 'export')))
+
+    def testResumeInterruptedImport(self):
+        s = SequentialStorage(join(self.tempdir, 'store'))
+        for i in range(100):
+            s.add("identifier%s" % i, b'x' * 100)
+        Export(join(self.tempdir, 'export'), blockSize=1000).export(s)
+
+        def interrupt(stats):
+            if stats['blocks'] == 5:
+                raise KeyboardInterrupt()
+        s2 = SequentialStorage(join(self.tempdir, 'store2'), maxModifications=10)
+        self.assertRaises(KeyboardInterrupt, lambda: s2.importFrom(join(self.tempdir, 'export'), bulk=False, progress=interrupt))
+        s2.close()
+
+        progress = []
+        s2 = SequentialStorage(join(self.tempdir, 'store2'))
+        s2.importFrom(join(self.tempdir, 'export'), progress=progress.append)
+        self.assertEqual(100 - 5 * 9, progress[-1]['records'])
+        self.assertEqual((12, 12), (progress[-1]['blocks'], progress[-1]['totalBlocks']))
+        self.assertEqual(['records', 'bytes', 'blocks', 'totalBlocks', 'seconds', 'recordsPerSecond', 'bytesPerSecond'], list(progress[-1].keys()))
+        self.assertEqual(list(s.iteritems()), list(s2.iteritems()))
+
+    def testResumeInterruptedBulkImport(self):
+        s = SequentialStorage(join(self.tempdir, 'store'))
+        for i in range(100):
+            s.add("identifier%s" % i, b'x' * 100)
+        Export(join(self.tempdir, 'export'), blockSize=1000).export(s)
+
+        def interrupt(stats):
+            if stats['blocks'] == 5:
+                raise KeyboardInterrupt()
+        bulkRoundBlocks = exportModule.BULK_ROUND_BLOCKS
+        exportModule.BULK_ROUND_BLOCKS = 2
+        try:
+            s2 = SequentialStorage(join(self.tempdir, 'store2'))
+            self.assertRaises(KeyboardInterrupt, lambda: s2.importFrom(join(self.tempdir, 'export'), progress=interrupt))
+            self.assertEqual(4 * 9, len(s2))
+            s2.close()
+
+            progress = []
+            s2 = SequentialStorage(join(self.tempdir, 'store2'))
+            s2.importFrom(join(self.tempdir, 'export'), progress=progress.append)
+        finally:
+            exportModule.BULK_ROUND_BLOCKS = bulkRoundBlocks
+        self.assertEqual(100 - 4 * 9, progress[-1]['records'])
+        self.assertEqual((12, 12), (progress[-1]['blocks'], progress[-1]['totalBlocks']))
+        self.assertEqual(list(s.iteritems()), list(s2.iteritems()))
+        self.assertEqual([], [f for f in listdir(join(self.tempdir, 'store2')) if f.startswith('bulkload-')])
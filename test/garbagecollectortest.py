@@ -0,0 +1,73 @@
+## begin license ##
+#
+# "Meresco SequentialStore" contains components facilitating efficient sequentially ordered storing and retrieval.
+#
+# Copyright (C) 2026 Seecr (Seek You Too B.V.) https://seecr.nl
+#
+# This file is part of "Meresco SequentialStore"
+#
+# "Meresco SequentialStore" is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# "Meresco SequentialStore" is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with "Meresco SequentialStore"; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+#
+## end license ##
+
+from time import mktime
+
+from seecr.test import SeecrTestCase, CallTrace
+
+from meresco.sequentialstore import GarbageCollector, SequentialStorage
+
+
+class GarbageCollectorTest(SeecrTestCase):
+    def testReclaimsDeletes(self):
+        s = SequentialStorage(self.tempdir)
+        for i in range(9999):
+            s.add('identifier%s' % i, b'data%i' % i)
+        s.commit()
+        for i in range(0, 9999, 2):
+            s.delete('identifier%s' % i)
+        s.commit()
+        self.assertTrue(sum(segment['delCount'] for segment in s.segments()) > 0)
+
+        gc = GarbageCollector(s, deletesPctThreshold=10.0)
+        self.assertEqual(10.0, gc.collect())
+        s.gcDeletes(doWait=True)
+        self.assertEqual(0, sum(segment['delCount'] for segment in s.segments()))
+        self.assertEqual(None, gc.collect())
+        self.assertEqual(b'data1', s['identifier1'])
+        self.assertEqual(4999, len(s))
+        s.close()
+
+    def testMostDeletesFirstWithinMaxBytesPerRun(self):
+        storage = CallTrace(returnValues=dict(segments=[
+            dict(name='_0', maxDoc=100, delCount=30, sizeInBytes=1000),
+            dict(name='_1', maxDoc=100, delCount=80, sizeInBytes=1000),
+            dict(name='_2', maxDoc=100, delCount=50, sizeInBytes=1000),
+            dict(name='_3', maxDoc=100, delCount=5, sizeInBytes=1000),
+        ]))
+        gc = GarbageCollector(storage, deletesPctThreshold=20.0, maxBytesPerRun=2000)
+        self.assertEqual(30.0, gc.collect())
+        self.assertEqual(['segments', 'gcDeletes'], storage.calledMethodNames())
+        self.assertEqual(dict(deletesPctAllowed=30.0, doWait=False), storage.calledMethods[-1].kwargs)
+
+        gc = GarbageCollector(storage, deletesPctThreshold=20.0, minReclaimBytes=2000)
+        self.assertEqual(None, gc.collect())
+
+    def testQuietHours(self):
+        storage = CallTrace(returnValues=dict(segments=[dict(name='_0', maxDoc=100, delCount=50, sizeInBytes=1000)]))
+        gc = GarbageCollector(storage, quietHours=(22, 6))
+        self.assertEqual(None, gc.collect(now=mktime((2026, 1, 1, 23, 0, 0, 0, 0, -1))))
+        self.assertEqual(None, gc.collect(now=mktime((2026, 1, 1, 5, 59, 0, 0, 0, -1))))
+        self.assertEqual([], storage.calledMethodNames())
+        self.assertEqual(20.0, gc.collect(now=mktime((2026, 1, 1, 6, 0, 0, 0, 0, -1))))
@@ -0,0 +1,110 @@
+## begin license ##
+#
+# "Meresco SequentialStore" contains components facilitating efficient sequentially ordered storing and retrieval.
+#
+# Copyright (C) 2026 Seecr (Seek You Too B.V.) https://seecr.nl
+#
+# This file is part of "Meresco SequentialStore"
+#
+# "Meresco SequentialStore" is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# "Meresco SequentialStore" is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with "Meresco SequentialStore"; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+#
+## end license ##
+
+
+from os.path import join, getsize
+from time import sleep
+
+from seecr.test import SeecrTestCase
+
+from meresco.sequentialstore import journal
+from meresco.sequentialstore.journal import Journal
+
+
+class JournalTest(SeecrTestCase):
+    def setUp(self):
+        SeecrTestCase.setUp(self)
+        self.synced = []
+        self._fsync = journal.fsync
+        journal.fsync = lambda fd: self.synced.append(fd)
+
+    def tearDown(self):
+        journal.fsync = self._fsync
+        SeecrTestCase.tearDown(self)
+
+    def testEntriesAreWrittenImmediately(self):
+        j = Journal(join(self.tempdir, 'journal'), syncCount=100, syncInterval=60)
+        self.assertEqual(1, len(self.synced))  # the id
+        j.add('id:1', b'data')
+        self.assertTrue(getsize(join(self.tempdir, 'journal')) > 16)
+        reader = Journal(join(self.tempdir, 'journal'))
+        self.assertEqual(j.id(), reader.id())
+        self.assertEqual([('id:1', b'data')], list(reader.replay()))
+        reader.close()
+        self.assertEqual(1, len(self.synced))
+        j.close()
+        self.assertEqual(2, len(self.synced))
+
+    def testSyncAfterSyncCount(self):
+        j = Journal(join(self.tempdir, 'journal'), syncCount=3, syncInterval=60)
+        for i in range(7):
+            j.add('id:%s' % i, b'data')
+        self.assertEqual(1 + 2, len(self.synced))
+        j.close()
+
+    def testIdleTailIsSyncedAfterSyncInterval(self):
+        j = Journal(join(self.tempdir, 'journal'), syncCount=100, syncInterval=0.05)
+        del self.synced[:]
+        j.add('id:1', b'data')
+        j.delete('id:2')
+        self.assertEqual([], self.synced)
+        sleep(0.2)
+        self.assertEqual(1, len(self.synced))
+        j.add('id:3', b'data')
+        sleep(0.2)
+        self.assertEqual(2, len(self.synced))
+        j.close()
+        self.assertEqual(2, len(self.synced))
+
+    def testTruncateCancelsPendingSync(self):
+        j = Journal(join(self.tempdir, 'journal'), syncCount=100, syncInterval=0.05)
+        j.add('id:1', b'data')
+        del self.synced[:]
+        j.truncate()
+        self.assertEqual(1, len(self.synced))  # the new id
+        sleep(0.2)
+        self.assertEqual(1, len(self.synced))
+        self.assertEqual(16, getsize(join(self.tempdir, 'journal')))
+        j.close()
+
+    def testTruncateRenewsId(self):
+        j = Journal(join(self.tempdir, 'journal'))
+        journalId = j.id()
+        j.add('id:1', b'data')
+        j.truncate()
+        self.assertNotEqual(journalId, j.id())
+        self.assertEqual(0, len(j))
+        j.close()
+        self.assertEqual(j.id(), Journal(join(self.tempdir, 'journal')).id())
+
+    def testReplaySkipsEntries(self):
+        j = Journal(join(self.tempdir, 'journal'))
+        j.add('id:1', b'data')
+        j.delete('id:2')
+        j.add('id:3', b'data')
+        j.close()
+        reader = Journal(join(self.tempdir, 'journal'))
+        self.assertEqual([('id:3', b'data')], list(reader.replay(skipEntries=2)))
+        self.assertEqual(3, len(reader))
+        reader.close()
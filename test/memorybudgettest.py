@@ -0,0 +1,71 @@
+## begin license ##
+#
+# "Meresco SequentialStore" contains components facilitating efficient sequentially ordered storing and retrieval.
+#
+# Copyright (C) 2026 Seecr (Seek You Too B.V.) https://seecr.nl
+#
+# This file is part of "Meresco SequentialStore"
+#
+# "Meresco SequentialStore" is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# "Meresco SequentialStore" is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with "Meresco SequentialStore"; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+#
+## end license ##
+
+
+from seecr.test import SeecrTestCase, CallTrace
+
+from meresco.sequentialstore import MemoryBudget
+
+
+class MemoryBudgetTest(SeecrTestCase):
+    def testLargestAreFlushedUntilWithinBudget(self):
+        budget = MemoryBudget(maxBytes=1000, checkInterval=3)
+        usages = [300, 600, 400]
+        storages = [CallTrace('storage%s' % i, methods=dict(memoryUsage=lambda i=i: usages[i], flush=lambda i=i: usages.__setitem__(i, 0))) for i in range(3)]
+        for storage in storages:
+            budget.register(storage)
+        budget.written(storages[0])
+        budget.written(storages[0])
+        self.assertEqual([[], [], []], [storage.calledMethodNames() for storage in storages])
+        budget.written(storages[0])
+        self.assertEqual([['memoryUsage', 'memoryUsage'], ['memoryUsage', 'flush', 'memoryUsage'], ['memoryUsage', 'memoryUsage']], [storage.calledMethodNames() for storage in storages])
+        self.assertEqual(dict(maxBytes=1000, usedBytes=700, storages=3, flushCount=1, flushedBytes=600, flushing=0), budget.stats())
+
+    def testUsedBytesAreMeasured(self):
+        budget = MemoryBudget(maxBytes=1000)
+        storage = CallTrace(returnValues=dict(memoryUsage=2000))
+        budget.register(storage)
+        self.assertEqual(2000, budget.check())
+        self.assertEqual(['memoryUsage', 'flush', 'memoryUsage'], storage.calledMethodNames())
+        self.assertEqual(dict(maxBytes=1000, usedBytes=2000, storages=1, flushCount=1, flushedBytes=2000, flushing=0), budget.stats())
+
+    def testStorageIsNotFlushedTwiceAtOnce(self):
+        budget = MemoryBudget(maxBytes=1000)
+        def flush():
+            self.assertEqual(1, budget.stats()['flushing'])
+            self.assertEqual(2000, budget.check())
+        storage = CallTrace(returnValues=dict(memoryUsage=2000), methods=dict(flush=flush))
+        budget.register(storage)
+        budget.check()
+        self.assertEqual(['memoryUsage', 'flush', 'memoryUsage', 'memoryUsage'], storage.calledMethodNames())
+        self.assertEqual(0, budget.stats()['flushing'])
+
+    def testWithinBudget(self):
+        budget = MemoryBudget(maxBytes=1000)
+        storage = CallTrace(returnValues=dict(memoryUsage=1000))
+        budget.register(storage)
+        self.assertEqual(1000, budget.check())
+        self.assertEqual(['memoryUsage'], storage.calledMethodNames())
+        budget.unregister(storage)
+        self.assertEqual(0, budget.check())
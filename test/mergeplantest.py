@@ -0,0 +1,64 @@
+## begin license ##
+#
+# "Meresco SequentialStore" contains components facilitating efficient sequentially ordered storing and retrieval.
+#
+# Copyright (C) 2026 Seecr (Seek You Too B.V.) https://seecr.nl
+#
+# This file is part of "Meresco SequentialStore"
+#
+# "Meresco SequentialStore" is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# "Meresco SequentialStore" is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with "Meresco SequentialStore"; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+#
+## end license ##
+
+from seecr.test import SeecrTestCase
+
+from meresco.sequentialstore.mergeplan import planMerge, selectByDeletes
+
+
+class MergePlanTest(SeecrTestCase):
+    def testFullMergeFits(self):
+        plan = planMerge(SEGMENTS, freeBytes=10000)
+        self.assertEqual(dict(freeBytes=10000, requiredBytes=2400, reclaimableBytes=1600, merge='full', deletesPctAllowed=None), plan)
+
+    def testPartialMergeWhenFullMergeDoesNotFit(self):
+        plan = planMerge(SEGMENTS, freeBytes=1000)
+        self.assertEqual(dict(freeBytes=1000, requiredBytes=700, reclaimableBytes=1300, merge='partial', deletesPctAllowed=30.0), plan)
+
+    def testNoMergeWhenNothingFits(self):
+        plan = planMerge(SEGMENTS, freeBytes=100)
+        self.assertEqual(dict(freeBytes=100, requiredBytes=2400, reclaimableBytes=1600, merge=None, deletesPctAllowed=None), plan)
+
+    def testNothingToDo(self):
+        plan = planMerge([dict(name='_0', maxDoc=100, delCount=0, sizeInBytes=1000)], freeBytes=10000)
+        self.assertEqual(None, plan['merge'])
+        self.assertEqual('full', planMerge([dict(name='_0', maxDoc=100, delCount=0, sizeInBytes=1000)] * 2, freeBytes=10000)['merge'])
+
+    def testSelectByDeletesMatchesDeletesPctAllowed(self):
+        selected, deletesPctAllowed = selectByDeletes(SEGMENTS, maxBytes=1000)
+        self.assertEqual(['_1'], [segment['name'] for segment in selected])
+        self.assertEqual(50.0, deletesPctAllowed)
+        selected, deletesPctAllowed = selectByDeletes(SEGMENTS, maxBytes=10, atLeastOne=True)
+        self.assertEqual(['_1'], [segment['name'] for segment in selected])
+        selected, deletesPctAllowed = selectByDeletes(SEGMENTS, maxBytes=10)
+        self.assertEqual([], selected)
+        self.assertEqual(80.0, deletesPctAllowed)
+
+
+SEGMENTS = [
+    dict(name='_0', maxDoc=100, delCount=30, sizeInBytes=1000),
+    dict(name='_1', maxDoc=100, delCount=80, sizeInBytes=1000),
+    dict(name='_2', maxDoc=100, delCount=50, sizeInBytes=1000),
+    dict(name='_3', maxDoc=100, delCount=0, sizeInBytes=1000),
+]
@@ -0,0 +1,57 @@
+## begin license ##
+#
+# "Meresco SequentialStore" contains components facilitating efficient sequentially ordered storing and retrieval.
+#
+# Copyright (C) 2026 Seecr (Seek You Too B.V.) https://seecr.nl
+#
+# This file is part of "Meresco SequentialStore"
+#
+# "Meresco SequentialStore" is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# "Meresco SequentialStore" is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with "Meresco SequentialStore"; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+#
+## end license ##
+
+from seecr.test import SeecrTestCase
+
+from threading import Thread
+
+from meresco.sequentialstore.metrics import LatencyHistogram
+
+
+class MetricsTest(SeecrTestCase):
+    def testLatencyHistogram(self):
+        histogram = LatencyHistogram()
+        self.assertEqual(None, histogram.percentile(99))
+        for i in range(98):
+            histogram.record(0.000003)
+        histogram.record(0.0001)
+        histogram.record(0.5)
+        self.assertEqual(100, histogram.count)
+        self.assertAlmostEqual(0.500394, histogram.totalSeconds)
+        self.assertEqual(0.000004, histogram.percentile(50))
+        self.assertEqual(0.000128, histogram.percentile(99))
+        self.assertEqual(0.524288, histogram.percentile(100))
+
+    def testRecordFromThreads(self):
+        histogram = LatencyHistogram()
+        def record():
+            for i in range(10000):
+                histogram.record(0.000003)
+        threads = [Thread(target=record) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(40000, histogram.count)
+        self.assertEqual(40000, sum(histogram._buckets))
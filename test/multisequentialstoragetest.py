@@ -30,9 +30,10 @@
 
 from seecr.test import SeecrTestCase
 
-from os.path import join, isdir
+from asyncio import run
+from os.path import join, isdir, isfile
 
-from meresco.sequentialstore import MultiSequentialStorage, SequentialStorage
+from meresco.sequentialstore import MemoryBudget, MultiSequentialStorage, SequentialStorage
 
 
 class MultiSequentialStorageTest(SeecrTestCase):
@@ -151,3 +152,231 @@ class MultiSequentialStorageTest(SeecrTestCase):
         s.commit()
         self.assertEqual({}, s._storage['part1']._latestModifications)
         self.assertEqual(b'data1', s.getData('2', 'part1'))
+
+    def testStats(self):
+        s = MultiSequentialStorage(self.tempdir, maxOpenParts=1)
+        s.addData('1', "part1", b"data1")
+        s.addData('2', "part1", b"data2")
+        s.addData('1', "part2", b"data1")
+        self.assertEqual(['part2'], list(s._storage.keys()))
+        stats = s.stats()
+        self.assertEqual(2, stats['numDocs'])
+        self.assertEqual(1, stats['pendingModifications'])
+        self.assertEqual(['part1', 'part2'], sorted(stats['parts'].keys()))
+        self.assertEqual(['numDocs', 'deletedDocs', 'segmentCount', 'segments', 'sizeInBytes'], list(stats['parts']['part1'].keys()))
+        self.assertEqual(2, stats['parts']['part1']['numDocs'])
+        self.assertEqual(0, stats['parts']['part2']['numDocs'])
+        s.commit()
+        self.assertEqual(3, s.stats()['numDocs'])
+        s.close()
+
+    def testPartsOpenedOnFirstUse(self):
+        s = MultiSequentialStorage(self.tempdir)
+        s.addData('1', "part1", b"data1")
+        s.addData('1', "part2", b"data2")
+        s.close()
+        s = MultiSequentialStorage(self.tempdir)
+        self.assertEqual([], list(s._storage.keys()))
+        self.assertEqual(b'data2', s.getData('1', 'part2'))
+        self.assertEqual(['part2'], list(s._storage.keys()))
+        s.deleteData('1')
+        self.assertRaises(KeyError, lambda: s.getData('1', 'part1'))
+        self.assertRaises(KeyError, lambda: s.getData('1', 'part3'))
+
+    def testMaxOpenParts(self):
+        s = MultiSequentialStorage(self.tempdir, maxOpenParts=2)
+        s.addData('1', "part1", b"data1")
+        s.addData('1', "part2", b"data2")
+        s.getData('1', 'part1')
+        s.addData('1', "part3", b"data3")
+        self.assertEqual(['part1', 'part3'], list(s._storage.keys()))
+        self.assertEqual(b'data2', s.getData('1', 'part2'))
+        self.assertEqual(['part3', 'part2'], list(s._storage.keys()))
+        result = s.getMultipleData('part1', ['1'])
+        s.getData('1', 'part3')
+        self.assertEqual([('1', b'data1')], list(result))
+        s.close()
+        self.assertEqual([], list(s._storage.keys()))
+
+    def testSnapshot(self):
+        s = MultiSequentialStorage(join(self.tempdir, 'store'))
+        s.addData('1', "part1", b"data1")
+        s.addData('1', "ma/am", b"data2")
+        s.snapshot(join(self.tempdir, 'snapshot'))
+        s.close()
+        snapshot = MultiSequentialStorage(join(self.tempdir, 'snapshot'))
+        self.assertEqual(b'data1', snapshot.getData('1', 'part1'))
+        self.assertEqual(b'data2', snapshot.getData('1', 'ma/am'))
+
+    def testSnapshotLeavesClosedPartsClosed(self):
+        s = MultiSequentialStorage(join(self.tempdir, 'store'), maxOpenParts=1)
+        s.addData('1', "part1", b"data1")
+        s.addData('1', "part2", b"data2")
+        s.snapshot(join(self.tempdir, 'snapshot'))
+        self.assertEqual(['part2'], list(s._storage.keys()))
+        s.close()
+        snapshot = MultiSequentialStorage(join(self.tempdir, 'snapshot'))
+        self.assertEqual(b'data1', snapshot.getData('1', 'part1'))
+        self.assertEqual(b'data2', snapshot.getData('1', 'part2'))
+        snapshot.close()
+
+    def testCommittedReadersAreBounded(self):
+        s = MultiSequentialStorage(self.tempdir)
+        for name in ['part1', 'part2', 'part3']:
+            s.addData('1', name, b"data")
+        s.close()
+        s = MultiSequentialStorage(self.tempdir, maxOpenReaders=2)
+        s.deleteData('2')
+        self.assertEqual(['part2', 'part3'], list(s._readers.keys()))
+        self.assertEqual([], list(s._storage.keys()))
+        s.close()
+
+    def testSharedIndex(self):
+        s = MultiSequentialStorage(self.tempdir, sharedIndex=True)
+        s.addData('1', "oai_dc", b"<data/>")
+        s.addData('1', "rdf", b"<rdf/>")
+        s.addData('2', "rdf", b"<rdf>2</rdf>")
+        s.deleteData('2')
+        self.assertEqual(b'<data/>', s.getData('1', 'oai_dc'))
+        self.assertEqual([('1', b'<rdf/>')], list(s.getMultipleData('rdf', ['1', '2'], ignoreMissing=True)))
+        self.assertRaises(KeyError, lambda: s.getData('2', 'rdf'))
+        s.close()
+        self.assertTrue(isfile(join(self.tempdir, 'sequentialstorage.version')))
+
+        s = MultiSequentialStorage(self.tempdir)
+        self.assertEqual(b'<rdf/>', s.getData('1', 'rdf'))
+        self.assertRaises(KeyError, lambda: s.getData('1', 'unknown'))
+        stats = s.stats()
+        self.assertEqual(2, stats['numDocs'])
+        self.assertEqual({'oai_dc': {'numDocs': 1}, 'rdf': {'numDocs': 1}}, stats['parts'])
+        self.assertEqual(['oai_dc\x1f1', 'rdf\x1f1'], sorted(s._shared.iterkeys()))
+        s.close()
+
+    def testSharedIndexIsNotOpenedAsDirectories(self):
+        MultiSequentialStorage(self.tempdir, sharedIndex=True).close()
+        try:
+            MultiSequentialStorage(self.tempdir, sharedIndex=False)
+            self.fail()
+        except AssertionError as e:
+            self.assertEqual("The %s directory holds a shared index." % self.tempdir, str(e))
+
+    def testDeleteDataWithoutNameOnlyTouchesPartsHoldingIdentifier(self):
+        for sharedIndex in [False, True]:
+            s = MultiSequentialStorage(join(self.tempdir, str(sharedIndex)), sharedIndex=sharedIndex)
+            s.addData('1', "oai_dc", b"<data/>")
+            s.addData('2', "rdf", b"<rdf/>")
+            s.commit()
+            s.deleteData('1')
+            self.assertRaises(KeyError, lambda: s.getData('1', 'oai_dc'))
+            self.assertEqual(b'<rdf/>', s.getData('2', 'rdf'))
+            if not sharedIndex:
+                self.assertEqual(1, s._getStorage('oai_dc').stats()['pendingModifications'])
+                self.assertEqual(0, s._getStorage('rdf').stats()['pendingModifications'])
+            s.close()
+
+    def testDeleteDataWithoutNameDoesNotOpenOtherParts(self):
+        s = MultiSequentialStorage(self.tempdir, maxOpenParts=2)
+        s.addData('1', "part1", b"data1")
+        s.addData('2', "part2", b"data2")
+        s.addData('3', "part3", b"data3")
+        self.assertEqual(['part2', 'part3'], list(s._storage.keys()))
+        s.deleteData('2')
+        s.deleteMultipleData(['3', '4'])
+        self.assertEqual(['part2', 'part3'], list(s._storage.keys()))
+        s.deleteData('1')
+        self.assertEqual(['part3', 'part1'], list(s._storage.keys()))
+        self.assertEqual([], list(s._readers.keys()))
+        self.assertRaises(KeyError, lambda: s.getData('1', 'part1'))
+        self.assertRaises(KeyError, lambda: s.getData('2', 'part2'))
+        self.assertRaises(KeyError, lambda: s.getData('3', 'part3'))
+        s.close()
+
+    def testGetParts(self):
+        for kwargs in [dict(), dict(threads=3), dict(sharedIndex=True)]:
+            s = MultiSequentialStorage(join(self.tempdir, repr(kwargs)), **kwargs)
+            s.addData('1', 'metadata', b'<meta>1</meta>')
+            s.addData('2', 'metadata', b'<meta>2</meta>')
+            s.addData('1', 'holdings', b'<holdings>1</holdings>')
+            s.addData('2', 'enrichment', b'<enrichment>2</enrichment>')
+            s.commit()
+            self.assertEqual([
+                    ('1', {'metadata': b'<meta>1</meta>', 'holdings': b'<holdings>1</holdings>'}),
+                    ('2', {'metadata': b'<meta>2</meta>', 'enrichment': b'<enrichment>2</enrichment>'}),
+                    ('3', {}),
+                ], s.getParts(['1', '2', 3], ['metadata', 'holdings', 'enrichment', 'unknown']))
+            s.close()
+
+    def testParallelCommitAndClose(self):
+        s = MultiSequentialStorage(self.tempdir, threads=3)
+        for name in ['a', 'b', 'c', 'd']:
+            s.addData('1', name, name.encode())
+        result = s.commit()
+        self.assertEqual(['a', 'b', 'c', 'd'], sorted(result['parts']))
+        self.assertTrue(result['seconds'] >= max(result['parts'].values()))
+        for name in ['a', 'b', 'c', 'd']:
+            self.assertEqual(0, s._getStorage(name).stats()['pendingModifications'])
+        s.addData('2', 'a', b'2')
+        self.assertEqual(['a', 'b', 'c', 'd'], sorted(s.close()['parts']))
+        s = MultiSequentialStorage(self.tempdir)
+        self.assertEqual(b'2', s.getData('2', 'a'))
+        self.assertEqual(b'd', s.getData('1', 'd'))
+
+    def testMemoryBudget(self):
+        budget = MemoryBudget(maxBytes=1, checkInterval=1)
+        s = MultiSequentialStorage(self.tempdir, memoryBudget=budget)
+        s.addData('1', "part1", b"data1")
+        s.addData('1', "part2", b"data2")
+        stats = s.stats()
+        self.assertEqual(0, stats['pendingModifications'])
+        self.assertEqual(2, stats['memoryBudget']['storages'])
+        self.assertTrue(stats['memoryBudget']['flushCount'] >= 2, stats)
+        self.assertEqual(b'data1', s.getData('1', 'part1'))
+        s.close()
+        self.assertEqual(0, budget.stats()['storages'])
+
+    def testOpenRecord(self):
+        s = MultiSequentialStorage(self.tempdir)
+        s.addData('1', "part1", b"data1")
+        s.commit()
+        stream = s.openRecord('1', 'part1')
+        stream.seek(2)
+        self.assertEqual(b"ta1", stream.read())
+        self.assertRaises(KeyError, lambda: s.openRecord('2', 'part1'))
+        self.assertRaises(KeyError, lambda: s.openRecord('1', 'unknown'))
+
+    def testAgetData(self):
+        s = MultiSequentialStorage(self.tempdir, readThreads=2)
+        s.addData('1', "part1", b"data1")
+        s.commit()
+        s.addData('2', "part1", b"data2")
+        self.assertEqual(b"data1", run(s.agetData('1', 'part1')))
+        self.assertEqual(b"data2", run(s.agetData('2', 'part1')))
+        self.assertRaises(KeyError, lambda: run(s.agetData('3', 'part1')))
+        self.assertRaises(KeyError, lambda: run(s.agetData('1', 'unknown')))
+        self.assertEqual(b"data1", s.submitGetData('1', 'part1').result())
+        s.close()
+
+    def testAddAndDeleteMultipleData(self):
+        s = MultiSequentialStorage(self.tempdir)
+        s.addMultipleData('part1', [('1', b"data1"), ('2', b"data2")])
+        s.addMultipleData('part2', [('1', b"data1")])
+        s.commit()
+        self.assertEqual(b"data2", s.getData('2', 'part1'))
+        s.deleteMultipleData(['2'], name='part1')
+        self.assertRaises(KeyError, lambda: s.deleteMultipleData(['1'], name='unknown'))
+        self.assertFalse(s.hasData('2', 'part1'))
+        self.assertTrue(s.hasData('1', 'part1'))
+        s.deleteMultipleData(['1', '3'])
+        self.assertFalse(s.hasData('1', 'part1'))
+        self.assertFalse(s.hasData('1', 'part2'))
+        self.assertFalse(isdir(join(self.tempdir, 'unknown')))
+
+    def testHasData(self):
+        s = MultiSequentialStorage(self.tempdir)
+        s.addData('1', "part1", b"data1")
+        s.commit()
+        self.assertTrue(s.hasData('1', 'part1'))
+        self.assertFalse(s.hasData('2', 'part1'))
+        self.assertFalse(s.hasData('1', 'unknown'))
+        s.deleteData('1', 'part1')
+        self.assertFalse(s.hasData('1', 'part1'))
@@ -0,0 +1,68 @@
+## begin license ##
+#
+# "Meresco SequentialStore" contains components facilitating efficient sequentially ordered storing and retrieval.
+#
+# Copyright (C) 2026 Seecr (Seek You Too B.V.) https://seecr.nl
+#
+# This file is part of "Meresco SequentialStore"
+#
+# "Meresco SequentialStore" is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# "Meresco SequentialStore" is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with "Meresco SequentialStore"; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+#
+## end license ##
+
+
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from seecr.test import SeecrTestCase, CallTrace
+
+from weightless.io import reactor
+from weightless.io.utils import asProcess
+
+from meresco.sequentialstore import ReactorFutures
+
+
+class ReactorFuturesTest(SeecrTestCase):
+    def testWaitForResult(self):
+        executor = ThreadPoolExecutor(max_workers=1)
+        def process():
+            futures = ReactorFutures(reactor())
+            self.assertEqual(1, (yield futures.waitFor(executor.submit(lambda: 1))))
+            self.assertEqual(2, (yield futures.waitFor(executor.submit(lambda: 2))))
+            try:
+                yield futures.waitFor(executor.submit(lambda: 1 / 0))
+                self.fail()
+            except ZeroDivisionError:
+                pass
+            futures.close()
+        asProcess(process())
+        executor.shutdown()
+
+    def testProcessWaitingAgainWhenResumedKeepsOneReader(self):
+        reactor = CallTrace('reactor')
+        futures = ReactorFutures(reactor)
+        first, second = Future(), Future()
+        secondSuspend = CallTrace('suspend')
+        firstSuspend = CallTrace('suspend', methods=dict(resume=lambda value: futures._startWaiting(secondSuspend, second)))
+        futures._startWaiting(firstSuspend, first)
+        first.set_result('first')
+        futures._resumeDone()
+        self.assertEqual(['addReader'], reactor.calledMethodNames())
+        self.assertEqual(('first',), firstSuspend.calledMethods[0].args)
+        second.set_result('second')
+        futures._resumeDone()
+        self.assertEqual(['addReader', 'removeReader'], reactor.calledMethodNames())
+        self.assertEqual(('second',), secondSuspend.calledMethods[0].args)
+        futures.close()
+        self.assertEqual(['addReader', 'removeReader'], reactor.calledMethodNames())
@@ -0,0 +1,120 @@
+## begin license ##
+#
+# "Meresco SequentialStore" contains components facilitating efficient sequentially ordered storing and retrieval.
+#
+# Copyright (C) 2026 Seecr (Seek You Too B.V.) https://seecr.nl
+#
+# This file is part of "Meresco SequentialStore"
+#
+# "Meresco SequentialStore" is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# "Meresco SequentialStore" is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with "Meresco SequentialStore"; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+#
+## end license ##
+
+
+from os.path import join
+
+from seecr.test import SeecrTestCase
+
+from meresco.sequentialstore import ReplicationFollower, ReplicationLeader, SequentialStorage
+
+
+class ReplicationTest(SeecrTestCase):
+    def setUp(self):
+        SeecrTestCase.setUp(self)
+        self.leaderStorage = SequentialStorage(join(self.tempdir, 'leader'))
+        self.followerStorage = SequentialStorage(join(self.tempdir, 'follower'))
+
+    def tearDown(self):
+        self.leaderStorage.close()
+        self.followerStorage.close()
+        SeecrTestCase.tearDown(self)
+
+    def testCommittedChanges(self):
+        s = self.leaderStorage
+        s.add('abc', b'1')
+        s.add('def', b'2')
+        s.commit()
+        s.delete('abc')
+        s.add('def', b'3')
+        self.assertEqual(([(1, 'abc', b'1'), (2, 'def', b'2')], 2), s.committedChanges(0))
+        s.commit()
+        self.assertEqual(([(3, 'abc', None), (4, 'def', b'3')], 4), s.committedChanges(0))
+        self.assertEqual(([(3, 'abc', None)], 4), s.committedChanges(0, maxCount=1))
+        self.assertEqual(([], 4), s.committedChanges(4))
+
+    def testCommittedChangesAreReadFromTheLastCommit(self):
+        s = self.leaderStorage
+        s.add('abc', b'1')
+        s.add('def', b'2')
+        s.commit()
+        s.add('abc', b'3')
+        s.delete('def')
+        s.flush()  # reopens, without a commit
+        self.assertEqual(([(1, 'abc', b'1'), (2, 'def', b'2')], 2), s.committedChanges(0))
+        s.commit()
+        self.assertEqual(([(3, 'abc', b'3'), (4, 'def', None)], 4), s.committedChanges(0))
+
+    def testFollowerAppliesCommittedChanges(self):
+        for i in range(25):
+            self.leaderStorage.add('identifier%s' % i, b'data%i' % i)
+        self.leaderStorage.delete('identifier3')
+        self.leaderStorage.commit()
+        self.leaderStorage.add('identifier4', b'uncommitted')
+
+        leader = ReplicationLeader(self.leaderStorage, ('127.0.0.1', 0))
+        leader.start()
+        try:
+            follower = ReplicationFollower(self.followerStorage, leader.address, batchSize=10)
+            self.assertEqual(None, follower.lag())
+            self.assertEqual(10, follower.poll())
+            self.assertEqual(11, follower.position())
+            self.assertEqual(15, follower.lag())
+            self.assertEqual(15, follower.catchUp())
+            self.assertEqual(0, follower.lag())
+            self.assertEqual(26, self.followerStorage.importedKey())
+            self.assertEqual(24, len(self.followerStorage))
+            self.assertEqual(None, self.followerStorage.get('identifier3'))
+            self.assertEqual(b'data4', self.followerStorage['identifier4'])
+
+            self.leaderStorage.commit()
+            self.assertEqual(1, follower.catchUp())
+            self.assertEqual(b'uncommitted', self.followerStorage['identifier4'])
+            follower.close()
+        finally:
+            leader.stop()
+
+    def testFollowerResumesFromStoredPosition(self):
+        for i in range(5):
+            self.leaderStorage.add('identifier%s' % i, b'data%i' % i)
+        self.leaderStorage.commit()
+        address = join(self.tempdir, 'leader.socket')
+        leader = ReplicationLeader(self.leaderStorage, address)
+        leader.start()
+        try:
+            follower = ReplicationFollower(self.followerStorage, address)
+            self.assertEqual(5, follower.catchUp())
+            follower.close()
+            self.followerStorage.close()
+
+            self.leaderStorage.delete('identifier0')
+            self.leaderStorage.commit()
+            self.followerStorage = SequentialStorage(join(self.tempdir, 'follower'))
+            follower = ReplicationFollower(self.followerStorage, address)
+            self.assertEqual(5, follower.position())
+            self.assertEqual(1, follower.catchUp())
+            self.assertEqual(['identifier1', 'identifier2', 'identifier3', 'identifier4'], list(self.followerStorage.iterkeys()))
+            follower.close()
+        finally:
+            leader.stop()
@@ -28,7 +28,10 @@
 #
 ## end license ##
 
-from os.path import join, isfile
+from asyncio import run
+from io import SEEK_END
+from os import listdir, makedirs, remove, urandom
+from os.path import join, isdir, isfile, getsize
 from shutil import rmtree
 from subprocess import Popen, PIPE
 
@@ -36,6 +39,7 @@ from seecr.test import SeecrTestCase
 from seecr.test.utils import sleepWheel
 
 from meresco.sequentialstore import SequentialStorage
+from meresco.sequentialstore import sequentialstorage
 from time import time
 
 
@@ -158,6 +162,30 @@ class SequentialStorageTest(SeecrTestCase):
         sequentialStorage.delete(identifier='abc')
         self.assertRaises(KeyError, lambda: sequentialStorage['abc'])
 
+    def testDeleteOfUnknownIdentifierTakesNoKey(self):
+        s = SequentialStorage(self.tempdir)
+        s.add(identifier='def', data=b"2")
+        s.delete(identifier='abc')
+        s.add(identifier='def', data=b"3")
+        s.delete(identifier='def')
+        s.delete(identifier='def')
+        self.assertEqual(3, s.newestKey())
+        self.assertEqual([('def', None)], list(s.changesSince(0)))
+
+    def testUncommittedTombstonesAreCutOffAfterCrash(self):
+        s = SequentialStorage(self.tempdir)
+        s.add(identifier='abc', data=b"1")
+        s.commit()
+        s.delete(identifier='abc')
+        s._tombstones.flush()
+        s._luceneStore.rollbackForTests()  # simulate crash: uncommitted Lucene changes are lost
+
+        s = SequentialStorage(self.tempdir)
+        self.assertEqual(b'1', s['abc'])
+        self.assertEqual(1, s.newestKey())
+        self.assertEqual([('abc', b'1')], list(s.changesSince(0)))
+        s.close()
+
     def testDeletePersisted(self):
         sequentialStorage = SequentialStorage(self.tempdir)
         sequentialStorage.add(identifier='abc', data=b"1")
@@ -180,6 +208,68 @@ class SequentialStorageTest(SeecrTestCase):
         self.assertEqual(b'', stdout.strip())
         self.assertRaises(AttributeError, lambda: sequentialStorage.add('def', data=b'2'))
 
+    def testJournalReplayedAfterCrash(self):
+        sequentialStorage = SequentialStorage(self.tempdir, journal=True)
+        sequentialStorage.add(identifier='abc', data=b"1")
+        sequentialStorage.commit()
+        sequentialStorage.add(identifier='def', data=b"2")
+        sequentialStorage.delete(identifier='abc')
+        sequentialStorage.sync()
+        sequentialStorage._luceneStore.rollbackForTests()  # simulate crash: uncommitted Lucene changes are lost
+
+        sequentialStorage = SequentialStorage(self.tempdir, journal=True)
+        self.assertEqual(b'2', sequentialStorage['def'])
+        self.assertRaises(KeyError, lambda: sequentialStorage['abc'])
+        self.assertEqual(0, len(sequentialStorage._journal))
+
+    def testJournalNotReplayedAfterCrashBetweenCommitAndTruncate(self):
+        sequentialStorage = SequentialStorage(self.tempdir, journal=True)
+        sequentialStorage.add(identifier='abc', data=b"1")
+        sequentialStorage.add(identifier='def', data=b"2")
+        def crash():
+            raise IOError('crash')
+        sequentialStorage._journal.truncate = crash
+        self.assertRaises(IOError, sequentialStorage.commit)
+        sequentialStorage._luceneStore.rollbackForTests()
+        self.assertEqual(2, len(sequentialStorage._journal))
+
+        sequentialStorage = SequentialStorage(self.tempdir, journal=True)
+        self.assertEqual(2, sequentialStorage.newestKey())
+        self.assertEqual([('abc', b'1'), ('def', b'2')], list(sequentialStorage.changesSince(0)))
+        sequentialStorage.add(identifier='ghi', data=b"3")
+        sequentialStorage._luceneStore.rollbackForTests()
+
+        sequentialStorage = SequentialStorage(self.tempdir, journal=True)
+        self.assertEqual(b'3', sequentialStorage['ghi'])
+        self.assertEqual(3, sequentialStorage.newestKey())
+        sequentialStorage.close()
+
+    def testJournalIgnoresTornTail(self):
+        sequentialStorage = SequentialStorage(self.tempdir, journal=True)
+        sequentialStorage.add(identifier='abc', data=b"1")
+        sequentialStorage.add(identifier='def', data=b"2")
+        sequentialStorage.sync()
+        sequentialStorage._luceneStore.rollbackForTests()
+        journalFile = join(self.tempdir, 'sequentialstorage.journal')
+        with open(journalFile, 'r+b') as fp:
+            fp.truncate(getsize(journalFile) - 1)
+
+        sequentialStorage = SequentialStorage(self.tempdir)
+        self.assertEqual(b'1', sequentialStorage['abc'])
+        self.assertRaises(KeyError, lambda: sequentialStorage['def'])
+        self.assertFalse(isfile(journalFile))
+
+    def testJournalDefersLuceneCommit(self):
+        sequentialStorage = SequentialStorage(self.tempdir, maxModifications=1, journal=True)
+        sequentialStorage.add(identifier='abc', data=b"1")
+        sequentialStorage.add(identifier='def', data=b"2")
+        sequentialStorage.add(identifier='ghi', data=b"3")
+        self.assertEqual({'ghi': b'3'}, sequentialStorage._latestModifications)
+        self.assertEqual(3, len(sequentialStorage._journal))
+        self.assertEqual(b'1', sequentialStorage['abc'])
+        sequentialStorage.commit()
+        self.assertEqual(0, len(sequentialStorage._journal))
+
     def testGet(self):
         sequentialStorage = SequentialStorage(self.tempdir)
         self.assertEqual(None, sequentialStorage.get('abc'))
@@ -190,7 +280,7 @@ class SequentialStorageTest(SeecrTestCase):
         SequentialStorage(self.tempdir)
         with open(join(self.tempdir, "sequentialstorage.version")) as fp:
             version = fp.read()
-        self.assertEqual('5', version)
+        self.assertEqual('6', version)
 
     def testRefuseInitInNonEmptyDirWithNoVersionFile(self):
         with open(join(self.tempdir, 'x'), 'w') as fp:
@@ -208,7 +298,7 @@ class SequentialStorageTest(SeecrTestCase):
             SequentialStorage(self.tempdir)
             self.fail()
         except AssertionError as e:
-            self.assertEqual('The SequentialStorage at %s needs to be converted to the current version.' % self.tempdir, str(e))
+            self.assertEqual('The SequentialStorage at %s needs to be converted to the current version: export it with the release that wrote it and import the export with this one.' % self.tempdir, str(e))
 
     def testRefuseInitWithDirectoryPathThatExistsAsFile(self):
         filePath = join(self.tempdir, 'x')
@@ -310,3 +400,399 @@ class SequentialStorageTest(SeecrTestCase):
             finally:
                 s.close()
                 rmtree(directory)
+
+    def testGcReportsMergePlan(self):
+        s = SequentialStorage(self.tempdir)
+        self.assertEqual(None, s.gc()['merge'])
+        for i in range(999):
+            s.add('identifier%s' % i, b'data%i' % i)
+        s.commit()
+        for i in range(0, 999, 3):
+            s.delete('identifier%s' % i)
+        s.commit()
+        plan = s.mergePlan()
+        self.assertEqual('full', plan['merge'])
+        self.assertTrue(0 < plan['reclaimableBytes'] < s.getSizeOnDisk(), plan)
+        self.assertTrue(plan['requiredBytes'] < plan['freeBytes'], plan)
+        self.assertEqual(plan, s.gc(doWait=True))
+        self.assertEqual(0, s.mergePlan()['reclaimableBytes'])
+        s.close()
+
+    def testStats(self):
+        s = SequentialStorage(self.tempdir)
+        stats = s.stats()
+        self.assertEqual(0, stats['numDocs'])
+        self.assertEqual(0, stats['segmentCount'])
+        self.assertEqual(None, stats['bytesPerRecord'])
+        for i in range(100):
+            s.add('identifier%s' % i, b'data%i' % i)
+        s.delete('identifier0')
+        stats = s.stats()
+        self.assertEqual(0, stats['numDocs'])
+        self.assertEqual(100, stats['pendingModifications'])
+        self.assertTrue(stats['ramBufferBytes'] > 0, stats)
+        self.assertEqual(None, stats['lastCommitDuration'])
+        s.flush()
+        stats = s.stats()
+        self.assertEqual(99, stats['numDocs'])
+        self.assertEqual(0, stats['pendingModifications'])
+        self.assertEqual(None, stats['lastCommitDuration'])
+        s.commit()
+        stats = s.stats()
+        self.assertEqual(99, stats['numDocs'])
+        self.assertEqual(0, stats['pendingModifications'])
+        self.assertEqual(1, stats['segmentCount'])
+        self.assertEqual(['name', 'maxDoc', 'delCount', 'sizeInBytes'], list(stats['segments'][0].keys()))
+        self.assertEqual(sum(segment['sizeInBytes'] for segment in stats['segments']), stats['sizeInBytes'])
+        self.assertTrue(stats['bytesPerRecord'] > 0, stats)
+        self.assertTrue(stats['lastCommitDuration'] >= 0, stats)
+        self.assertTrue(stats['lastReopenDuration'] >= 0, stats)
+        self.assertEqual(0, stats['mergingSegments'])
+        s.close()
+
+    def testMergeThrottle(self):
+        s = SequentialStorage(self.tempdir)
+        s.setMergeThrottle(maxMergeCount=4, maxThreadCount=1, autoIOThrottle=True, maxMergeMBPerSec=10, forceMergeMBPerSec=5)
+        mergeScheduler = s._luceneStore.getMergeScheduler()
+        self.assertEqual(4, mergeScheduler.getMaxMergeCount())
+        self.assertEqual(1, mergeScheduler.getMaxThreadCount())
+        self.assertEqual(10.0, mergeScheduler.getMaxMBPerSec())
+        self.assertEqual(5.0, mergeScheduler.getForceMergeMBPerSec())
+        self.assertTrue(s.stats()['mergeIORateLimitMBPerSec'] <= 10.0)
+        s.setMergeThrottle(maxThreadCount=2)
+        self.assertEqual(4, mergeScheduler.getMaxMergeCount())
+        self.assertEqual(2, mergeScheduler.getMaxThreadCount())
+
+        for i in range(999):
+            s.add('identifier%s' % i, b'data%i' % i)
+        s.commit()
+        self.assertEqual(b'data1', s['identifier1'])
+        stats = s.stats()
+        self.assertEqual(1, stats['readCount'])
+        self.assertTrue(stats['readP99Seconds'] > 0, stats)
+        s.close()
+
+    def testMaxMergeMBPerSecLimitsForcedMerges(self):
+        s = SequentialStorage(self.tempdir)
+        s.setMergeThrottle(maxMergeMBPerSec=1)
+        for i in range(4):
+            for j in range(8):
+                s.add('identifier%s.%s' % (i, j), urandom(64 * 1024))
+            s.commit()
+        self.assertEqual(4, s.stats()['segmentCount'])
+        t0 = time()
+        s.gc(doWait=True)
+        stats = s.stats()
+        self.assertEqual(1, stats['segmentCount'])
+        self.assertTrue(stats['mergedBytes'] >= 2 * 1024 * 1024, stats)
+        self.assertTrue(time() - t0 >= 1.0, time() - t0)
+        s.close()
+
+    def testDirectoryTypes(self):
+        for directoryType in ['mmap', 'nio']:
+            directory = join(self.tempdir, directoryType)
+            s = SequentialStorage(directory, directoryType=directoryType, preload=True)
+            s.add('abc', b'1')
+            s.close()
+            s = SequentialStorage(directory, directoryType=directoryType)
+            self.assertEqual(b'1', s['abc'])
+            s.close()
+        try:
+            SequentialStorage(self.tempdir, directoryType='ram')
+            self.fail()
+        except ValueError as e:
+            self.assertEqual("directoryType should be one of None, 'mmap', 'nio'", str(e))
+
+    def testWarmup(self):
+        s = SequentialStorage(self.tempdir)
+        for i in range(999):
+            s.add('identifier%s' % i, b'data%i' % i)
+        s.close()
+        s = SequentialStorage(self.tempdir, warmup=True)
+        s.waitForWarmup()
+        self.assertFalse(s._warmupThread.is_alive())
+        self.assertEqual(b'data1', s['identifier1'])
+        s.close()
+
+    def testSnapshot(self):
+        s = SequentialStorage(join(self.tempdir, 'store'))
+        for i in range(100):
+            s.add('identifier%s' % i, b'data%i' % i)
+        result = s.snapshot(join(self.tempdir, 'snapshot'))
+        self.assertEqual(0, result['skipped'])
+        self.assertTrue(result['linked'] > 0, result)
+        s.add('identifier100', b'data100')
+        s.delete('identifier0')
+        result = s.snapshot(join(self.tempdir, 'snapshot'))
+        self.assertTrue(result['skipped'] > 0, result)
+        s.add('identifier101', b'data101')
+        s.close()
+
+        snapshot = SequentialStorage(join(self.tempdir, 'snapshot'))
+        self.assertEqual(100, len(snapshot))
+        self.assertEqual(b'data100', snapshot['identifier100'])
+        self.assertEqual(None, snapshot.get('identifier0'))
+        self.assertEqual(None, snapshot.get('identifier101'))
+        snapshot.close()
+
+    def testSnapshotHoldsTheDeletesOfItsCommitOnly(self):
+        s = SequentialStorage(join(self.tempdir, 'store'))
+        s.add('identifier1', b'data1')
+        s.add('identifier2', b'data2')
+        s.delete('identifier1')
+        def copySnapshot(*args):
+            try:
+                return originalCopySnapshot(*args)
+            finally:
+                s.delete('identifier2')  # while the snapshot is being made
+                s._tombstones.flush()
+        originalCopySnapshot = sequentialstorage.copySnapshot
+        sequentialstorage.copySnapshot = copySnapshot
+        try:
+            s.snapshot(join(self.tempdir, 'snapshot'))
+        finally:
+            sequentialstorage.copySnapshot = originalCopySnapshot
+        s.close()
+        self.assertEqual(2 * getsize(join(self.tempdir, 'snapshot', 'sequentialstorage.tombstones')), getsize(join(self.tempdir, 'store', 'sequentialstorage.tombstones')))
+        snapshot = SequentialStorage(join(self.tempdir, 'snapshot'))
+        self.assertEqual([('identifier1', None), ('identifier2', b'data2')], list(snapshot.changesSince(0)))
+        snapshot.close()
+
+    def testSnapshotReplacesDifferentFileOfSameSize(self):
+        s = SequentialStorage(join(self.tempdir, 'store'))
+        for i in range(100):
+            s.add('identifier%s' % i, b'data%i' % i)
+        s.snapshot(join(self.tempdir, 'snapshot'))
+        indexFiles = [f for f in listdir(join(self.tempdir, 'snapshot')) if not f.startswith('s')]
+        for filename in indexFiles:
+            path = join(self.tempdir, 'snapshot', filename)
+            size = getsize(path)
+            remove(path)  # not overwritten in place: it is a hard link to the file of the store
+            with open(path, 'wb') as fp:
+                fp.write(b'\0' * size)
+        result = s.snapshot(join(self.tempdir, 'snapshot'))
+        self.assertEqual(len(indexFiles), result['linked'] + result['copied'])
+        s.close()
+
+        snapshot = SequentialStorage(join(self.tempdir, 'snapshot'))
+        self.assertEqual(100, len(snapshot))
+        self.assertEqual(b'data99', snapshot['identifier99'])
+        snapshot.close()
+
+    def testSnapshotRefusesOtherDirectory(self):
+        s = SequentialStorage(join(self.tempdir, 'store'))
+        with open(join(self.tempdir, 'x'), 'w') as fp:
+            pass
+        self.assertRaises(AssertionError, lambda: s.snapshot(self.tempdir))
+        s.close()
+
+    def testAddMultiple(self):
+        s = SequentialStorage(self.tempdir, maxModifications=2)
+        s.addMultiple([('abc', b'1'), ('def', b'2'), ('ghi', b'3')])
+        self.assertEqual({}, s._latestModifications)
+        self.assertEqual([('abc', b'1'), ('def', b'2'), ('ghi', b'3')], list(s.iteritems()))
+
+    def testIteritemsPartitioned(self):
+        s = SequentialStorage(self.tempdir)
+        for i in range(100):
+            s.add('identifier%s' % i, b'data%i' % i)
+        s.delete('identifier50')
+        partitions = s.iteritemsPartitioned(3)
+        self.assertEqual(3, len(partitions))
+        self.assertEqual(list(s.iteritems()), [item for partition in partitions for item in partition])
+
+    def testBulkLoad(self):
+        source = SequentialStorage(join(self.tempdir, 'source'))
+        for i in range(100):
+            source.add('identifier%s' % i, b'data%i' % i)
+        s = SequentialStorage(join(self.tempdir, 'store'))
+        s.add('removed', b'data')
+        s.delete('removed')
+        self.assertEqual(100, s.bulkLoad(source.iteritems()))
+        self.assertEqual(['source', 'store'], sorted(listdir(self.tempdir)))
+        self.assertEqual(100, len(s))
+        self.assertEqual(b'data42', s['identifier42'])
+        s.add('identifier0', b'newer')
+        self.assertEqual(('identifier99', b'data99'), list(s.iteritems())[-2])
+        self.assertEqual(('identifier0', b'newer'), list(s.iteritems())[-1])
+        s.close()
+        s = SequentialStorage(join(self.tempdir, 'store'))
+        s.add('identifier1', b'newest')
+        self.assertEqual(('identifier1', b'newest'), list(s.iteritems())[-1])
+
+    def testBulkLoadLeftoversAreRemovedOnOpening(self):
+        s = SequentialStorage(join(self.tempdir, 'store'))
+        s.close()
+        makedirs(join(self.tempdir, 'store', 'bulkload-crashed'))
+        with open(join(self.tempdir, 'store', 'bulkload-crashed', '_0.fdt'), 'wb') as fp:
+            fp.write(b'partial')
+        s = SequentialStorage(join(self.tempdir, 'store'))
+        self.assertFalse(isdir(join(self.tempdir, 'store', 'bulkload-crashed')))
+        self.assertEqual(1, s.bulkLoad([('abc', b'1')]))
+        self.assertEqual([], [f for f in listdir(join(self.tempdir, 'store')) if f.startswith('bulkload-')])
+        s.close()
+
+    def testBulkLoadRefusesIdentifiersInStore(self):
+        s = SequentialStorage(self.tempdir)
+        s.add('abc', b'1')
+        try:
+            s.bulkLoad([('def', b'2'), ('abc', b'3')])
+            self.fail()
+        except ValueError as e:
+            self.assertEqual("bulkLoad of identifier 'abc', which is already in the store", str(e))
+        self.assertEqual(['abc'], list(s.iterkeys()))
+        self.assertEqual(1, s.bulkLoad([('def', b'2')]))
+        self.assertEqual([('abc', b'1'), ('def', b'2')], list(s.iteritems()))
+
+    def testBulkLoadRefusesDuplicates(self):
+        s = SequentialStorage(self.tempdir)
+        try:
+            s.bulkLoad([('abc', b'1'), ('def', b'2'), ('abc', b'3')])
+            self.fail()
+        except ValueError as e:
+            self.assertEqual("bulkLoad of identifier 'abc' more than once", str(e))
+        self.assertEqual(0, len(s))
+        self.assertEqual([], [f for f in listdir(self.tempdir) if f.startswith('bulkload-')])
+
+    def testChangesSince(self):
+        s = SequentialStorage(self.tempdir)
+        for i in range(5):
+            s.add('identifier%s' % i, b'data%i' % i)
+        s.delete('identifier1')
+        s.add('identifier2', b'changed')
+        self.assertEqual(7, s.newestKey())
+        self.assertEqual([('identifier1', None), ('identifier3', b'data3'), ('identifier4', b'data4'), ('identifier2', b'changed')], list(s.changesSince(2)))
+        self.assertEqual([('identifier2', b'changed')], list(s.changesSince(6)))
+        self.assertEqual([], list(s.changesSince(7)))
+        s.pruneTombstones(6)
+        self.assertEqual([('identifier3', b'data3'), ('identifier4', b'data4'), ('identifier2', b'changed')], list(s.changesSince(2)))
+
+    def testKeysAreNotReusedAfterPruningTombstones(self):
+        s = SequentialStorage(self.tempdir)
+        s.add('identifier1', b'data')
+        s.add('identifier2', b'data')
+        s.delete('identifier2')
+        s.delete('identifier1')
+        self.assertEqual(4, s.newestKey())
+        s.pruneTombstones(4)
+        s.close()
+        s = SequentialStorage(self.tempdir)
+        self.assertEqual(4, s.newestKey())
+        s.add('identifier3', b'data')
+        self.assertEqual(5, s.newestKey())
+        s.close()
+
+    def testNewestKeyIncludesDeletesAfterReopen(self):
+        s = SequentialStorage(self.tempdir)
+        s.add('abc', b'1')
+        s.delete('abc')
+        s.close()
+        s = SequentialStorage(self.tempdir)
+        self.assertEqual(2, s.newestKey())
+        s.add('def', b'2')
+        self.assertEqual([('def', b'2')], list(s.changesSince(2)))
+
+    def testContains(self):
+        s = SequentialStorage(self.tempdir)
+        s.add('abc', b'1')
+        s.add('def', b'2')
+        self.assertTrue('abc' in s)
+        s.commit()
+        self.assertTrue('abc' in s)
+        self.assertFalse('ghi' in s)
+        s.delete('abc')
+        self.assertFalse('abc' in s)
+        s.commit()
+        self.assertFalse('abc' in s)
+        self.assertTrue('def' in s)
+
+    def testGetMany(self):
+        s = SequentialStorage(self.tempdir)
+        s.add('abc', b'1')
+        s.add('def', b'2')
+        s.commit()
+        s.add('ghi', b'3')
+        s.delete('def')
+        self.assertEqual([b'3', None, b'1', None], s.getMany(['ghi', 'def', 'abc', 'xyz']))
+        self.assertEqual([], s.getMany([]))
+
+    def testOpenRecord(self):
+        s = SequentialStorage(self.tempdir)
+        s.add('abc', b'0123456789')
+        s.commit()
+        with s.openRecord('abc') as stream:
+            self.assertEqual(10, stream.size)
+            self.assertTrue(stream.seekable())
+            self.assertEqual(b'012', stream.read(3))
+            self.assertEqual(3, stream.tell())
+            self.assertEqual(7, stream.seek(-3, SEEK_END))
+            self.assertEqual(b'789', stream.read())
+            self.assertEqual(b'', stream.read(5))
+            stream.seek(2)
+            buffer = bytearray(4)
+            self.assertEqual(4, stream.readinto(buffer))
+            self.assertEqual(b'2345', bytes(buffer))
+            stream.seek(0)
+            self.assertEqual(b'0123456789', stream.read())
+        self.assertRaises(ValueError, lambda: stream.read(1))
+
+    def testOpenRecordOfPendingAndMissingRecords(self):
+        s = SequentialStorage(self.tempdir)
+        s.add('abc', b'0123456789')
+        s.commit()
+        s.add('def', b'pending')
+        s.delete('abc')
+        self.assertEqual(b'pending', s.openRecord('def').read())
+        self.assertRaises(KeyError, lambda: s.openRecord('abc'))
+        self.assertRaises(KeyError, lambda: s.openRecord('xyz'))
+
+    def testGetRange(self):
+        s = SequentialStorage(self.tempdir)
+        s.add('abc', b'0123456789')
+        s.commit()
+        self.assertEqual(b'345', s.getRange('abc', 3, 3))
+        self.assertEqual(b'89', s.getRange('abc', 8, 100))
+        self.assertEqual(b'', s.getRange('abc', 20, 3))
+        self.assertRaises(KeyError, lambda: s.getRange('xyz', 0, 3))
+
+    def testAget(self):
+        s = SequentialStorage(self.tempdir)
+        s.add('abc', b'1')
+        s.add('def', b'2')
+        s.commit()
+        s.add('ghi', b'3')
+        s.delete('def')
+        async def get():
+            return [await s.aget('abc'), await s.aget('ghi'), await s.aget('def'), await s.aget('xyz', b'default')]
+        self.assertEqual([b'1', b'3', None, b'default'], run(get()))
+
+    def testAgetMultiple(self):
+        s = SequentialStorage(self.tempdir)
+        s.add('abc', b'1')
+        s.add('def', b'2')
+        s.commit()
+        s.add('ghi', b'3')
+        s.delete('def')
+        self.assertEqual([('ghi', b'3'), ('abc', b'1')], run(s.agetMultiple(['ghi', 'def', 'abc', 'xyz'], ignoreMissing=True)))
+        self.assertRaises(KeyError, lambda: run(s.agetMultiple(['abc', 'xyz'])))
+        self.assertEqual([], run(s.agetMultiple([])))
+
+    def testSubmitGet(self):
+        s = SequentialStorage(self.tempdir)
+        s.add('abc', b'1')
+        s.commit()
+        s.add('def', b'2')
+        self.assertEqual(b'1', s.submitGet('abc').result())
+        self.assertEqual(b'2', s.submitGet('def').result())
+        self.assertEqual(None, s.submitGet('xyz').result())
+        s.close()
+
+    def testExistsMany(self):
+        s = SequentialStorage(self.tempdir)
+        s.add('abc', b'1')
+        s.add('def', b'2')
+        s.commit()
+        s.delete('def')
+        s.add('ghi', b'3')
+        self.assertTrue(s.exists('abc'))
+        self.assertEqual([True, False, True, False], s.existsMany(['abc', 'def', 'ghi', 'xyz']))
@@ -0,0 +1,112 @@
+## begin license ##
+#
+# "Meresco SequentialStore" contains components facilitating efficient sequentially ordered storing and retrieval.
+#
+# Copyright (C) 2026 Seecr (Seek You Too B.V.) https://seecr.nl
+#
+# This file is part of "Meresco SequentialStore"
+#
+# "Meresco SequentialStore" is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# "Meresco SequentialStore" is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with "Meresco SequentialStore"; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+#
+## end license ##
+
+
+from os.path import join
+
+from seecr.test import SeecrTestCase
+
+from meresco.sequentialstore import SequentialStorage, ShardedSequentialStorage
+from meresco.sequentialstore.shardedsequentialstorage import reshard, shardIndex
+
+
+class ShardedSequentialStorageTest(SeecrTestCase):
+    def directories(self, name, count):
+        return [join(self.tempdir, name, str(i)) for i in range(count)]
+
+    def testRoutesByHash(self):
+        s = ShardedSequentialStorage(self.directories('store', 3))
+        for i in range(30):
+            s.add('identifier%s' % i, b'data%i' % i)
+        s.delete('identifier7')
+        self.assertEqual(29, len(s))
+        self.assertEqual(b'data3', s['identifier3'])
+        self.assertRaises(KeyError, lambda: s['identifier7'])
+        self.assertTrue('identifier3' in s)
+        self.assertFalse('identifier7' in s)
+        self.assertEqual([b'data1', None, b'data2'], s.getMany(['identifier1', 'identifier7', 'identifier2']))
+        self.assertEqual(sorted('identifier%s' % i for i in range(30) if i != 7), sorted(s.iterkeys()))
+        s.close()
+
+        for i, directory in enumerate(self.directories('store', 3)):
+            shard = SequentialStorage(directory)
+            self.assertTrue(all(shardIndex(identifier, 3) == i for identifier in shard.iterkeys()))
+            shard.close()
+
+    def testAddMultipleCommitAndStats(self):
+        s = ShardedSequentialStorage(self.directories('store', 2))
+        s.addMultiple(('identifier%s' % i, b'data') for i in range(10))
+        s.commit()
+        stats = s.stats()
+        self.assertEqual(10, stats['numDocs'])
+        self.assertEqual(2, len(stats['shards']))
+        self.assertEqual(10, sum(len(list(items)) for items in s.iteritemsPartitioned()))
+        s.close()
+
+    def testShardCountIsChecked(self):
+        ShardedSequentialStorage(self.directories('store', 2)).close()
+        try:
+            ShardedSequentialStorage(self.directories('store', 3))
+            self.fail()
+        except AssertionError as e:
+            self.assertEqual("The SequentialStorage at %s is shard 0 of 2, not 0 of 3." % join(self.tempdir, 'store', '0'), str(e))
+
+    def testReshard(self):
+        s = ShardedSequentialStorage(self.directories('store', 2))
+        for i in range(100):
+            s.add('identifier%s' % i, b'data%i' % i)
+        s.close()
+        progress = []
+        self.assertEqual(100, reshard(self.directories('store', 2), self.directories('resharded', 3), batchSize=7, progress=progress.append))
+        self.assertEqual(100, progress[-1])
+        s = ShardedSequentialStorage(self.directories('resharded', 3))
+        self.assertEqual(100, len(s))
+        self.assertEqual(b'data42', s['identifier42'])
+        s.close()
+
+    def testReshardReadsTheLastCommitOfTheSource(self):
+        s = ShardedSequentialStorage(self.directories('store', 2))
+        for i in range(10):
+            s.add('identifier%s' % i, b'data%i' % i)
+        s.commit()
+        s.add('identifier10', b'data10')
+        self.assertEqual(10, reshard(self.directories('store', 2), self.directories('resharded', 3)))  # takes no write lock
+        s.close()
+        s = ShardedSequentialStorage(self.directories('resharded', 3))
+        self.assertEqual(10, len(s))
+        s.close()
+
+    def testReshardRefusesNonEmptyTarget(self):
+        s = ShardedSequentialStorage(self.directories('store', 2))
+        s.add('identifier1', b'data1')
+        s.close()
+        reshard(self.directories('store', 2), self.directories('resharded', 3))
+        try:
+            reshard(self.directories('store', 2), self.directories('resharded', 3))
+            self.fail()
+        except ValueError as e:
+            self.assertEqual("Target shard %s is not empty." % join(self.tempdir, 'resharded', '0'), str(e))
+        s = ShardedSequentialStorage(self.directories('resharded', 3))
+        self.assertEqual(1, len(s))
+        s.close()
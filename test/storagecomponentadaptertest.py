@@ -29,8 +29,10 @@
 
 from seecr.test import SeecrTestCase
 
-from weightless.core import be, consume
+from weightless.core import be, compose, consume
 from weightless.core.utils import asBytes
+from weightless.io import Suspend, reactor
+from weightless.io.utils import asProcess
 from meresco.core import Observable
 
 from meresco.sequentialstore import StorageComponentAdapter, MultiSequentialStorage
@@ -73,3 +75,61 @@ class StorageComponentAdapterTest(SeecrTestCase):
         consume(self.top.all.add(identifier="x", partname="part1", data=b"<data/>"))
         self.assertEqual(b"<data/>", asBytes(self.top.all.yieldRecord(identifier="x", partname="part1")))
         self.assertEqual(b"", asBytes(self.top.all.yieldRecord(identifier="y", partname="part1")))
+
+    def testBatchedDeletePart(self):
+        top = be(
+            (Observable(),
+                (StorageComponentAdapter(batchSize=100),
+                    (MultiSequentialStorage(self.tempdir + '/batched'),)
+                )
+            )
+        )
+        consume(top.all.add(identifier="x", partname="part1", data=b"<data/>"))
+        consume(top.all.add(identifier="x", partname="part2", data=b"<data/>"))
+        top.call.deletePart(identifier="x", partname="part1")
+        self.assertEqual((False, False), top.call.isAvailable(identifier="x", partname="part1"))
+        self.assertEqual(b"<data/>", top.call.getStream(identifier="x", partname="part2").read())
+
+    def testDeleteFromUnknownPart(self):
+        self.assertRaises(KeyError, lambda: self.top.call.deletePart(identifier="x", partname="unknown"))
+        multiSequentialStorage = MultiSequentialStorage(self.tempdir + '/batched')
+        adapter = StorageComponentAdapter(batchSize=100)
+        top = be(
+            (Observable(),
+                (adapter,
+                    (multiSequentialStorage,)
+                )
+            )
+        )
+        self.assertRaises(KeyError, lambda: top.call.deletePart(identifier="x", partname="unknown"))
+        consume(top.all.add(identifier="x", partname="new", data=b"<data/>"))
+        top.call.deletePart(identifier="y", partname="new")
+        adapter.flush()
+        self.assertEqual((True, True), top.call.isAvailable(identifier="x", partname="new"))
+        self.assertRaises(KeyError, lambda: multiSequentialStorage.deleteMultipleData(['x'], name='unknown'))
+
+    def testYieldRecordSuspendsWithReactor(self):
+        multiSequentialStorage = MultiSequentialStorage(self.tempdir)
+        def process():
+            top = be(
+                (Observable(),
+                    (StorageComponentAdapter(reactor=reactor()),
+                        (multiSequentialStorage,)
+                    )
+                )
+            )
+            consume(top.all.add(identifier="x", partname="part1", data=b"<data/>"))
+            multiSequentialStorage.commit()
+            for identifier, expected in [("x", [b"<data/>"]), ("y", []), ("x", [b"<data/>"])]:
+                suspended, records = [], []
+                for value in compose(top.all.yieldRecord(identifier=identifier, partname="part1")):
+                    if isinstance(value, Suspend):
+                        suspended.append(value)
+                        yield value
+                    else:
+                        records.append(value)
+                self.assertEqual(1, len(suspended))
+                self.assertEqual(expected, records)
+            self.assertEqual([], list(compose(top.all.yieldRecord(identifier="x", partname="unknown"))))
+        asProcess(process())
+        multiSequentialStorage.close()
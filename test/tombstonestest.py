@@ -0,0 +1,99 @@
+## begin license ##
+#
+# "Meresco SequentialStore" contains components facilitating efficient sequentially ordered storing and retrieval.
+#
+# Copyright (C) 2026 Seecr (Seek You Too B.V.) https://seecr.nl
+#
+# This file is part of "Meresco SequentialStore"
+#
+# "Meresco SequentialStore" is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# "Meresco SequentialStore" is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with "Meresco SequentialStore"; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+#
+## end license ##
+
+
+from os.path import join
+
+from seecr.test import SeecrTestCase
+
+from meresco.sequentialstore import tombstones
+from meresco.sequentialstore.tombstones import Tombstones, copyTombstones
+
+
+class TombstonesTest(SeecrTestCase):
+    def setUp(self):
+        SeecrTestCase.setUp(self)
+        self._indexInterval = tombstones.INDEX_INTERVAL
+        tombstones.INDEX_INTERVAL = 3
+
+    def tearDown(self):
+        tombstones.INDEX_INTERVAL = self._indexInterval
+        SeecrTestCase.tearDown(self)
+
+    def testSinceSeeksThroughIndex(self):
+        t = Tombstones(join(self.tempdir, 'tombstones'))
+        expected = [(key, 'identifier%s' % key) for key in range(2, 40, 2)]
+        for key, identifier in expected:
+            t.add(key, identifier)
+        for sinceKey in range(0, 42):
+            self.assertEqual([entry for entry in expected if entry[0] > sinceKey], list(t.since(sinceKey)))
+        t.close()
+
+        t = Tombstones(join(self.tempdir, 'tombstones'))
+        self.assertEqual(19, len(t))
+        self.assertEqual(38, t.newestKey())
+        self.assertEqual(expected[-4:], list(t.since(30)))
+        t.close()
+
+    def testPruneRebuildsIndex(self):
+        t = Tombstones(join(self.tempdir, 'tombstones'))
+        for key in range(1, 20):
+            t.add(key, 'identifier%s' % key)
+        t.prune(10)
+        self.assertEqual(9, len(t))
+        self.assertEqual(19, t.newestKey())
+        t.add(25, 'identifier25')
+        self.assertEqual([(key, 'identifier%s' % key) for key in [18, 19, 25]], list(t.since(17)))
+        self.assertEqual(10, len(list(t.since(0))))
+        t.close()
+
+    def testDeletesAfterUntilKeyAreCutOffOnOpening(self):
+        t = Tombstones(join(self.tempdir, 'tombstones'))
+        for key in range(1, 10):
+            t.add(key, 'identifier%s' % key)
+        t.close()
+        t = Tombstones(join(self.tempdir, 'tombstones'), untilKey=6)
+        self.assertEqual(6, len(t))
+        self.assertEqual(6, t.newestKey())
+        t.add(7, 'other7')
+        self.assertEqual([(6, 'identifier6'), (7, 'other7')], list(t.since(5)))
+        t.close()
+        t = Tombstones(join(self.tempdir, 'tombstones'))
+        self.assertEqual(7, len(t))
+        t.close()
+
+    def testCopyUntilKey(self):
+        t = Tombstones(join(self.tempdir, 'tombstones'))
+        for key in range(1, 10):
+            t.add(key, 'identifier%s' % key)
+        t.flush()
+        copyTombstones(join(self.tempdir, 'tombstones'), join(self.tempdir, 'copy'), untilKey=6)
+        copyTombstones(join(self.tempdir, 'tombstones'), join(self.tempdir, 'all'))
+        t.close()
+        copy = Tombstones(join(self.tempdir, 'copy'))
+        self.assertEqual([(key, 'identifier%s' % key) for key in range(1, 7)], list(copy.since(0)))
+        copy.close()
+        copy = Tombstones(join(self.tempdir, 'all'))
+        self.assertEqual(9, len(copy))
+        copy.close()